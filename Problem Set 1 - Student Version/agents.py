@@ -1,6 +1,11 @@
 from abc import ABC, abstractmethod
 from typing import Callable, Dict, Generic, List
 from problem import HeuristicFunction, Problem, S, A, Solution
+from incremental_search import DStarLite
+from search import AStarSearch
+from search_stats import SearchStats
+from solution_cache import SolutionCache
+import time
 
 # This is an abstract class for all goal based agents
 class GoalBasedAgent(ABC, Generic[S, A]):
@@ -22,17 +27,28 @@ class HumanAgent(GoalBasedAgent[S, A]):
         return self.user_input_fn(problem, state)
 
 # This agent applies an uninformed search algorithm to find the solution to goal for the given state
+# If a SearchStats object is given, it is passed to every search and accumulates the statistics of all the searches
+# If a SolutionCache is given (see "solution_cache.py"), the saved solution is used instead of searching when there is one
+# and every new solution is saved into it
 class UninformedSearchAgent(GoalBasedAgent[S, A]):
-    def __init__(self, search_fn: Callable[[Problem[S, A], S], Solution]) -> None:
+    def __init__(self, search_fn: Callable[[Problem[S, A], S], Solution], stats: SearchStats = None,
+                 solution_cache: SolutionCache = None) -> None:
         super().__init__()
         self.search_fn = search_fn
+        self.stats = stats
+        self.solution_cache = solution_cache
         # The policy will store the action to do for each state so as not to search again after each observation
         self.policy: Dict[S, A] = {}
     
     def act(self, problem: Problem[S, A], state: S) -> A:
         # This state is not stored in the policy, we need to search for a solution 
         if state not in self.policy:
-            solution = self.search_fn(problem, state)
+            cache = self.solution_cache
+            found, solution = (False, None) if cache is None else cache.lookup(problem, state, self.search_fn)
+            if not found:
+                options = {} if self.stats is None else {"stats": self.stats}
+                solution = self.search_fn(problem, state, **options)
+                if cache is not None: cache.store(problem, state, self.search_fn, solution)
             # if no solution was found, we return None
             if solution is None:
                 self.policy[state] = None
@@ -45,18 +61,28 @@ class UninformedSearchAgent(GoalBasedAgent[S, A]):
         return self.policy.get(state)
 
 # This agent applies an informed search algorithm to find the solution to goal for the given state
+# If a SearchStats object is given, it is passed to every search and accumulates the statistics of all the searches
+# If a SolutionCache is given, it is used as in UninformedSearchAgent (the solutions are also kept by heuristic)
 class InformedSearchAgent(GoalBasedAgent[S, A]):
-    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction) -> None:
+    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction,
+                 stats: SearchStats = None, solution_cache: SolutionCache = None) -> None:
         super().__init__()
         self.search_fn = search_fn
         self.heuristic = heuristic
+        self.stats = stats
+        self.solution_cache = solution_cache
         # The policy will store the action to do for each state so as not to search again after each observation
         self.policy: Dict[S, A] = {}
     
     def act(self, problem: Problem[S, A], state: S) -> A:
         # This state is not stored in the policy, we need to search for a solution 
         if state not in self.policy:
-            solution = self.search_fn(problem, state, self.heuristic)
+            cache = self.solution_cache
+            found, solution = (False, None) if cache is None else cache.lookup(problem, state, self.search_fn, self.heuristic)
+            if not found:
+                options = {} if self.stats is None else {"stats": self.stats}
+                solution = self.search_fn(problem, state, self.heuristic, **options)
+                if cache is not None: cache.store(problem, state, self.search_fn, solution, self.heuristic)
             # if no solution was found, we return None
             if solution is None:
                 self.policy[state] = None
@@ -66,4 +92,71 @@ class InformedSearchAgent(GoalBasedAgent[S, A]):
             for action in solution:
                 self.policy[current] = action
                 current = problem.get_successor(current, action)
-        return self.policy.get(state)
\ No newline at end of file
+        return self.policy.get(state)
+
+# This agent applies an anytime search algorithm which receives a deadline and returns the best solution it found by then
+# (for example AnytimeAStarSearch). Every search gets a deadline of time_budget seconds from the moment it starts,
+# so the agent answers within (roughly) the time budget even if the optimal plan takes much longer to find.
+# The search function is called with the keyword arguments "deadline" and "on_improve" (if on_improve is given)
+class AnytimeSearchAgent(InformedSearchAgent[S, A]):
+    def __init__(self, search_fn: Callable[..., Solution], heuristic: HeuristicFunction, time_budget: float,
+                 on_improve: Callable[[Solution, float, float], None] = None, stats: SearchStats = None) -> None:
+        super().__init__(self._search, heuristic, stats)
+        self.anytime_search_fn = search_fn
+        self.time_budget = time_budget
+        self.on_improve = on_improve
+
+    def _search(self, problem: Problem[S, A], state: S, heuristic: HeuristicFunction, **options) -> Solution:
+        options["deadline"] = time.time() + self.time_budget
+        if self.on_improve is not None: options["on_improve"] = self.on_improve
+        return self.anytime_search_fn(problem, state, heuristic, **options)
+
+# This agent uses an incremental search (D* Lite, see "incremental_search.py") instead of a policy.
+# The search effort is kept between the calls, so if the agent finds itself in a state that it did not plan for,
+# only the part of the search affected by the new start is repaired instead of searching again from scratch.
+# The heuristic estimates the cost between two states (see PairHeuristicFunction in "incremental_search.py")
+# Repairing the search only pays off if it costs less than searching again. So if a fallback heuristic is given,
+# the agent first runs A* with it from the initial state and the number of states it expanded becomes the budget
+# of every D* Lite computation (including the first one). If D* Lite needs more, the agent drops it for this problem
+# and uses A* instead: like InformedSearchAgent, it follows the A* plan and searches again from any state not in the plan.
+class IncrementalSearchAgent(GoalBasedAgent[S, A]):
+    def __init__(self, heuristic: Callable[[Problem[S, A], S, S], float] = None, fallback_heuristic: HeuristicFunction = None) -> None:
+        super().__init__()
+        self.heuristic = heuristic
+        self.fallback_heuristic = fallback_heuristic
+        self.problem: Problem[S, A] = None
+        self.planner: DStarLite[S, A] = None
+        self.budget: int = None
+        # The policy of the A* plans (only used if a fallback heuristic is given)
+        self.policy: Dict[S, A] = {}
+
+    def act(self, problem: Problem[S, A], state: S) -> A:
+        # The search is restarted only if the agent is given a different problem
+        if problem is not self.problem:
+            self.problem = problem
+            self.planner = DStarLite(problem, self.heuristic)
+            self.policy, self.budget = {}, None
+            if self.fallback_heuristic is not None:
+                self.budget = self._search(problem, state)
+        if self.planner is not None:
+            if self.planner.repair(state, self.budget):
+                return self.planner.next_action(state)
+            # D* Lite costs more than a fresh A* search, so the agent uses A* for the rest of this problem
+            self.planner = None
+        if state not in self.policy:
+            self._search(problem, state)
+        return self.policy.get(state)
+
+    # Runs A* with the fallback heuristic from the given state, stores the plan in the policy
+    # and returns the number of states expanded by the search
+    def _search(self, problem: Problem[S, A], state: S) -> int:
+        stats = SearchStats()
+        solution = AStarSearch(problem, state, self.fallback_heuristic, stats=stats)
+        if solution is None:
+            self.policy[state] = None
+        else:
+            current = state
+            for action in solution:
+                self.policy[current] = action
+                current = problem.get_successor(current, action)
+        return max(stats.expanded, 1)
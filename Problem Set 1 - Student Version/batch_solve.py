@@ -0,0 +1,190 @@
+from collections import deque
+from queue import Empty
+from typing import Any, Dict, List
+import argparse, glob, json, multiprocessing, os, signal, time
+
+from helpers.utils import load_function
+
+# This script solves many dungeon and graph files with the same search function and writes a report
+# where each line is a JSON object describing the result of one file:
+#   file, search, heuristic, status ("solved", "unsolvable", "timeout" or "error"),
+#   solution_length, path_cost, explored_nodes, wall_time (the search time in seconds)
+#   and stats (the statistics collected by the search, see "search_stats.py")
+# Every file is solved in its own process and up to "--workers" processes run at the same time,
+# so a file that exceeds the timeout can be stopped without affecting the other ones.
+#
+# Usage: python batch_solve.py dungeons graphs/*.json -a astar [-w 4] [-t 60] [-o batch_report.jsonl]
+
+# The search functions that can be selected and whether each of them needs a heuristic
+SEARCH_FUNCTIONS = {
+    "bfs": ("search.BreadthFirstSearch", False),
+    "dfs": ("search.DepthFirstSearch", False),
+    "ucs": ("search.UniformCostSearch", False),
+    "astar": ("search.AStarSearch", True),
+    "lazyastar": ("search.LazyAStarSearch", True),
+    "pea": ("search.PartialExpansionAStarSearch", True),
+    "gbfs": ("search.BestFirstSearch", True),
+    "ida": ("search.IterativeDeepeningAStar", True),
+    "hda": ("parallel_search.HashDistributedAStarSearch", True),
+    "tsp": ("dungeon_solver.solve_dungeon_tsp", False),
+    "biucs": ("bidirectional_search.BidirectionalUniformCostSearch", False),
+    "biastar": ("bidirectional_search.BidirectionalAStarSearch", True),
+}
+
+# The heuristics that can be selected for each problem type
+DUNGEON_HEURISTICS = {
+    "zero": None,
+    "weak": "dungeon_heuristic.weak_heuristic",
+    "strong": "dungeon_heuristic.strong_heuristic",
+}
+GRAPH_HEURISTICS = {
+    "zero": None,
+    "euclidean": "graph.graphrouting_heuristic",
+}
+
+# Returns the dungeon and graph files given as files, directories or glob patterns (sorted and without duplicates)
+# The figures of the graphs ("*_fig.txt" next to the graph files) are not dungeons so they are skipped
+def collect_files(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, "*.txt")) + glob.glob(os.path.join(path, "*.json"))
+        else:
+            matches = glob.glob(path)
+        files += sorted(match for match in matches if match.endswith((".txt", ".json")) and not match.endswith("_fig.txt"))
+    return list(dict.fromkeys(files))
+
+# Loads the problem of the file, runs the search on it and returns the report record
+def solve_file(path: str, search: str, heuristic: str) -> Dict[str, Any]:
+    from search_stats import SearchStats
+    search_path, informed = SEARCH_FUNCTIONS[search]
+    search_fn = load_function(search_path)
+    if path.endswith(".json"):
+        from graph import GraphRoutingProblem
+        problem = GraphRoutingProblem.from_file(path)
+        heuristic_path = GRAPH_HEURISTICS[heuristic]
+    else:
+        from dungeon import DungeonProblem
+        problem = DungeonProblem.from_file(path)
+        heuristic_path = DUNGEON_HEURISTICS[heuristic]
+    arguments = [problem, problem.get_initial_state()]
+    if informed:
+        arguments.append(load_function(heuristic_path) if heuristic_path else (lambda *_: 0))
+    stats = SearchStats()
+    start = time.time()
+    solution = search_fn(*arguments, stats=stats)
+    wall_time = time.time() - start
+    record = {"status": "unsolvable" if solution is None else "solved", "solution_length": None, "path_cost": None}
+    if solution is not None:
+        path_cost, state = 0, problem.get_initial_state()
+        for action in solution:
+            path_cost += problem.get_cost(state, action)
+            state = problem.get_successor(state, action)
+        record.update(solution_length=len(solution), path_cost=path_cost)
+    record.update(explored_nodes=stats.expanded, wall_time=wall_time, stats=stats.as_dict())
+    return record
+
+# The entry point of the process that solves a single file
+# It starts a new process group (where possible) so that the processes started by the search are stopped with it
+def _solve_process(path: str, search: str, heuristic: str, results) -> None:
+    if hasattr(os, "setpgrp"): os.setpgrp()
+    try:
+        record = solve_file(path, search, heuristic)
+    except Exception as error:
+        record = {"status": "error", "error": f"{type(error).__name__}: {error}"}
+    results.put((path, record))
+
+# Stops a solving process and the processes it started
+def _stop(process: multiprocessing.Process) -> None:
+    try:
+        if hasattr(os, "killpg"): os.killpg(process.pid, signal.SIGKILL)
+    except OSError:
+        pass
+    process.terminate()
+
+# Solves the files with up to "workers" processes at the same time and calls on_result(record) for each finished file
+# A process that runs for more than "timeout" seconds (if given) is stopped and its file is reported as "timeout"
+def solve_files(files: List[str], search: str, heuristic: Dict[str, str], workers: int, timeout: float = None, on_result=None) -> List[Dict[str, Any]]:
+    results = multiprocessing.Queue()
+    pending = deque(files)
+    running: Dict[str, tuple] = {}  # The process and the start time of each file being solved
+    records = []
+
+    def finish(path: str, record: Dict[str, Any]) -> None:
+        kind = "graph" if path.endswith(".json") else "dungeon"
+        record = {"file": path, "search": search, "heuristic": heuristic[kind], **record}
+        records.append(record)
+        if on_result is not None: on_result(record)
+
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                path = pending.popleft()
+                kind = "graph" if path.endswith(".json") else "dungeon"
+                # The processes are not daemons since a search may start its own worker processes (such as HDA*)
+                process = multiprocessing.Process(target=_solve_process, args=(path, search, heuristic[kind], results))
+                process.start()
+                running[path] = (process, time.time())
+            try:
+                path, record = results.get(timeout=0.05)
+                # The result of a file that has just been stopped for exceeding the timeout is ignored
+                if path in running:
+                    process, _ = running.pop(path)
+                    process.join()
+                    finish(path, record)
+            except Empty:
+                pass
+            now = time.time()
+            for path, (process, start) in list(running.items()):
+                if timeout is not None and now - start > timeout:
+                    _stop(process)
+                    process.join()
+                    del running[path]
+                    finish(path, {"status": "timeout", "solution_length": None, "path_cost": None, "explored_nodes": None, "wall_time": now - start})
+                elif not process.is_alive() and process.exitcode != 0:
+                    # The process crashed before sending its result
+                    del running[path]
+                    finish(path, {"status": "error", "error": f"The process exited with code {process.exitcode}"})
+    finally:
+        for process, _ in running.values():
+            _stop(process)
+    return records
+
+def main(args: argparse.Namespace) -> None:
+    files = collect_files(args.paths)
+    if not files:
+        print("No dungeon (.txt) or graph (.json) files were found")
+        exit(-1)
+    if args.agent == "tsp" and any(path.endswith(".json") for path in files):
+        print("The 'tsp' solver only works on dungeons")
+        exit(-1)
+    heuristic = {"dungeon": args.dungeon_heuristic, "graph": args.graph_heuristic}
+    with open(args.output, 'w') as report:
+        def on_result(record: Dict[str, Any]) -> None:
+            report.write(json.dumps(record) + "\n")
+            report.flush()
+            if record["status"] == "solved":
+                print(f"{record['file']}: solved (length {record['solution_length']}, cost {record['path_cost']}, explored {record['explored_nodes']}, {record['wall_time']:.3f}s)")
+            else:
+                print(f"{record['file']}: {record['status']} {record.get('error', '')}")
+        start = time.time()
+        records = solve_files(files, args.agent, heuristic, args.workers, args.timeout, on_result)
+    solved = sum(record["status"] == "solved" for record in records)
+    print(f"Solved {solved} of {len(records)} files in {time.time() - start:.3f} seconds, the report was written to {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve many dungeon and graph files in parallel and write a JSONL report")
+    parser.add_argument("paths", nargs="+", help="the dungeon (.txt) and graph (.json) files, directories or glob patterns to solve")
+    parser.add_argument("--agent", "-a", default="astar", choices=list(SEARCH_FUNCTIONS),
+                        help="the search function used to solve every file")
+    parser.add_argument("--dungeon-heuristic", "-dh", default="strong", choices=list(DUNGEON_HEURISTICS),
+                        help="the heuristic used by the informed searches on the dungeons")
+    parser.add_argument("--graph-heuristic", "-gh", default="euclidean", choices=list(GRAPH_HEURISTICS),
+                        help="the heuristic used by the informed searches on the graphs")
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count() or 1,
+                        help="the number of files solved at the same time")
+    parser.add_argument("--timeout", "-t", type=float, default=None,
+                        help="the number of seconds after which the search on a file is stopped")
+    parser.add_argument("--output", "-o", default="batch_report.jsonl",
+                        help="the path of the JSONL report")
+    main(parser.parse_args())
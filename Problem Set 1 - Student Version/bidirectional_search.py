@@ -0,0 +1,95 @@
+from graph import GraphRoutingProblem, GraphNode
+from frontier import HeapFrontier
+from problem import HeuristicFunction, Solution
+from search_stats import SearchStats, search_statistics
+
+# This file contains bidirectional versions of Uniform Cost Search and A* for the graph routing problem
+# A forward search grows from the initial state and a backward search grows from the goal over the reversed edges
+# (see GraphRoutingProblem.get_reversed). Every time one search reaches a node that was already reached by the other,
+# the two partial paths are joined and the best complete path found so far is kept.
+#
+# To use a heuristic in both directions, we use the average potential function:
+#   p(n) = (h_forward(n) - h_backward(n)) / 2
+# where h_forward estimates the cost to the goal and h_backward estimates the cost from the initial state.
+# The forward frontier is ordered by g_forward(n) + p(n) and the backward frontier by g_backward(n) - p(n).
+# If both heuristics are consistent, both searches behave like Uniform Cost Search over the same reduced edge costs,
+# so the search can stop as soon as the sum of the least keys in the two frontiers reaches the cost of the best path.
+# With a zero heuristic, p(n) = 0 and this is the classic bidirectional Dijkstra.
+
+@search_statistics
+def BidirectionalUniformCostSearch(problem: GraphRoutingProblem, initial_state: GraphNode, stats: SearchStats = None) -> Solution:
+    return _bidirectional_search(problem, initial_state, lambda *_: 0, stats)
+
+@search_statistics
+def BidirectionalAStarSearch(problem: GraphRoutingProblem, initial_state: GraphNode, heuristic: HeuristicFunction, stats: SearchStats = None) -> Solution:
+    return _bidirectional_search(problem, initial_state, heuristic, stats)
+
+# The stats count the expansions and the generated nodes of both directions, the peak frontier size is the size of both frontiers
+def _bidirectional_search(problem: GraphRoutingProblem, initial_state: GraphNode, heuristic: HeuristicFunction, stats: SearchStats) -> Solution:
+    backward_problem = problem.get_reversed(initial_state)
+    goal = backward_problem.get_initial_state()
+
+    potentials = {}
+    def potential(state: GraphNode) -> float:
+        value = potentials.get(state)
+        if value is None:
+            value = (heuristic(problem, state) - heuristic(backward_problem, state)) / 2
+            potentials[state] = value
+        return value
+
+    # Each direction has its own frontier, path costs, search nodes (state, parent_node, action) and explored set
+    # The direction sign is +1 for the forward search and -1 for the backward search (it is multiplied by the potential)
+    forward = (problem, HeapFrontier(), {initial_state: 0}, {initial_state: (initial_state, None, None)}, set(), 1)
+    backward = (backward_problem, HeapFrontier(), {goal: 0}, {goal: (goal, None, None)}, set(), -1)
+    forward[1].push(initial_state, potential(initial_state))
+    backward[1].push(goal, -potential(goal))
+
+    best_cost, meeting_state = (0, initial_state) if initial_state == goal else (float('inf'), None)
+
+    while forward[1] and backward[1]:
+        # Stop when no path through the unexplored nodes can be cheaper than the best path found so far
+        if forward[1].peek_priority() + backward[1].peek_priority() >= best_cost: break
+        # Expand the direction with the smaller frontier to keep the two searches balanced
+        side, other = (forward, backward) if len(forward[1]) <= len(backward[1]) else (backward, forward)
+        side_problem, frontier, cost, nodes, explored, sign = side
+        other_cost = other[2]
+
+        state = frontier.pop()
+        if stats is not None: stats.expand(state, len(forward[1]) + len(backward[1]) + 1)
+        # The goal check is only used to track the traversal order; the search stops on the frontier keys
+        side_problem.is_goal(state)
+        explored.add(state)
+        node = nodes[state]
+
+        for action, successor, action_cost in side_problem.expand(state):
+            if stats is not None: stats.generated += 1
+            if successor in explored:
+                if stats is not None: stats.duplicates += 1
+                continue
+            new_cost = cost[state] + action_cost
+            if successor not in cost or new_cost < cost[successor]:
+                cost[successor] = new_cost
+                nodes[successor] = (successor, node, action)
+                frontier.push(successor, new_cost + sign * potential(successor))
+                # If the other search already reached this node, we found a complete path through it
+                if successor in other_cost:
+                    total_cost = new_cost + other_cost[successor]
+                    if total_cost < best_cost:
+                        best_cost, meeting_state = total_cost, successor
+
+    if meeting_state is None:
+        return None
+    # The forward half is rebuilt from the parent pointers as usual
+    path = []
+    _, parent, action = forward[3][meeting_state]
+    while parent is not None:
+        path.append(action)
+        _, parent, action = parent
+    path.reverse()
+    # In the backward half, the parent of each node is the next node on the path toward the goal
+    # and since the action in the graph routing problem is the next node, we append the parent states
+    _, parent, _ = backward[3][meeting_state]
+    while parent is not None:
+        path.append(parent[0])
+        parent = parent[1]
+    return path
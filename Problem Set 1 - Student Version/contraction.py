@@ -0,0 +1,332 @@
+from array import array
+from typing import Dict, List, Tuple
+import argparse, hashlib, heapq, json, math, os, struct
+
+from graph import GraphRoutingProblem, GraphNode
+from problem import Solution
+from search_stats import SearchStats, search_statistics
+
+# This file implements Contraction Hierarchies (CH) to answer many routing queries on the same graph
+#
+# Preprocessing (done once per graph):
+#   The nodes are contracted one by one in order of importance (least important first).
+#   Contracting a node v removes it from the remaining graph, and for every pair of remaining neighbors u -> v -> w
+#   we add a shortcut edge u -> w (with cost c(u, v) + c(v, w) and middle node v) unless a "witness" path from u to w
+#   that avoids v and is not longer already exists. The rank of a node is its position in the contraction order.
+#
+# Query:
+#   Any shortest path in the graph can be replaced by a path (with shortcuts) that goes upward in rank then downward.
+#   So we run a bidirectional Dijkstra where the forward search from the source only follows edges to higher ranked nodes
+#   and the backward search from the target only follows reversed edges from higher ranked nodes.
+#   Finally, the shortcuts on the best path are unpacked recursively using their middle nodes.
+
+# The hierarchy is saved as a length-prefixed JSON header followed by raw arrays (like the CSR graph files in "graph_csr.py")
+# so loading a file placed next to a graph can not run any code. The arrays are checked before the hierarchy is used.
+# The file format version, it should be increased whenever the saved content changes
+_FILE_MAGIC = b"CHIE"
+_FILE_VERSION = 2
+
+# Converts the edge lists of every node into flat arrays: the edges of node i are at the indexes offsets[i] to offsets[i + 1] - 1
+def _flatten_edges(edges: List[List[Tuple[int, float]]]) -> Tuple[array, array, array]:
+    offsets, targets, costs = array('q', [0]), array('q'), array('d')
+    for node_edges in edges:
+        for target, cost in node_edges:
+            targets.append(target)
+            costs.append(cost)
+        offsets.append(len(targets))
+    return offsets, targets, costs
+
+# Converts the flat arrays back into the edge lists, returns None if the arrays do not describe valid edges for count nodes
+def _unflatten_edges(offsets: array, targets: array, costs: array, count: int) -> List[List[Tuple[int, float]]]:
+    if offsets[0] != 0 or offsets[-1] != len(targets): return None
+    if any(offsets[i] > offsets[i + 1] for i in range(count)): return None
+    if any(not 0 <= target < count for target in targets): return None
+    return [list(zip(targets[offsets[i]:offsets[i + 1]], costs[offsets[i]:offsets[i + 1]])) for i in range(count)]
+
+# The maximum number of nodes settled by a single witness search when contracting a node
+# If the limit is reached, the shortcut is added anyway which is always safe (it only makes the hierarchy larger)
+WITNESS_SETTLE_LIMIT = 100
+# A smaller limit used when the shortcuts are only counted to estimate the importance of a node
+ESTIMATE_SETTLE_LIMIT = 20
+
+# This class holds the contracted graph
+#   names[i] is the name of the i-th node
+#   upward[i] is a list of (node, cost) for the edges i -> node where node has a higher rank than i
+#   downward[i] is a list of (node, cost) for the edges node -> i where node has a higher rank than i
+#   middles maps an edge (u, w) to the middle node of the shortcut or -1 for an original edge
+class ContractionHierarchy:
+    def __init__(self, names: List[str], upward: List[List[Tuple[int, float]]], downward: List[List[Tuple[int, float]]],
+                 middles: Dict[Tuple[int, int], int], graph_hash: str = "") -> None:
+        self.names = names
+        self.index: Dict[str, int] = {name: index for index, name in enumerate(names)}
+        self.upward = upward
+        self.downward = downward
+        self.middles = middles
+        self.graph_hash = graph_hash
+
+    @staticmethod
+    def build(problem: GraphRoutingProblem, graph_hash: str = "") -> 'ContractionHierarchy':
+        nodes: List[GraphNode] = sorted(problem.adjacency, key=lambda node: node.name)
+        index = {node: i for i, node in enumerate(nodes)}
+        count = len(nodes)
+        # The remaining (not contracted yet) graph in both directions: outgoing[u][w] = incoming[w][u] = cost of u -> w
+        outgoing: List[Dict[int, float]] = [{} for _ in range(count)]
+        incoming: List[Dict[int, float]] = [{} for _ in range(count)]
+        # Every edge ever added (original or shortcut) with its cost and middle node
+        edges: Dict[Tuple[int, int], Tuple[float, int]] = {}
+
+        def add_edge(u: int, w: int, cost: float, middle: int) -> None:
+            if u == w: return
+            current = edges.get((u, w))
+            if current is not None and current[0] <= cost: return
+            edges[(u, w)] = (cost, middle)
+            outgoing[u][w] = cost
+            incoming[w][u] = cost
+
+        for node in nodes:
+            for next_node in problem.get_actions(node):
+                add_edge(index[node], index[next_node], problem.get_cost(node, next_node), -1)
+
+        contracted_neighbors = [0] * count
+
+        # Returns the shortest distances from the source to the targets in the remaining graph without the excluded node
+        # The search stops when all the targets are settled, the distance exceeds the limit or too many nodes are settled
+        def witness_search(source: int, excluded: int, targets: Dict[int, float], limit: float, settle_limit: int) -> Dict[int, float]:
+            distances = {source: 0}
+            queue = [(0, source)]
+            settled, remaining = 0, len(targets)
+            while queue and remaining and settled < settle_limit:
+                distance, node = heapq.heappop(queue)
+                if distance > distances[node]: continue
+                if distance > limit: break
+                settled += 1
+                if node in targets: remaining -= 1
+                for neighbor, cost in outgoing[node].items():
+                    if neighbor == excluded: continue
+                    new_distance = distance + cost
+                    if new_distance < distances.get(neighbor, math.inf):
+                        distances[neighbor] = new_distance
+                        heapq.heappush(queue, (new_distance, neighbor))
+            return distances
+
+        # Returns the shortcuts (u, w, cost) needed to contract the node
+        def find_shortcuts(node: int, settle_limit: int = WITNESS_SETTLE_LIMIT) -> List[Tuple[int, int, float]]:
+            shortcuts = []
+            targets = outgoing[node]
+            if not targets: return shortcuts
+            max_out = max(targets.values())
+            for source, in_cost in incoming[node].items():
+                distances = witness_search(source, node, targets, in_cost + max_out, settle_limit)
+                for target, out_cost in targets.items():
+                    if target == source: continue
+                    cost = in_cost + out_cost
+                    if distances.get(target, math.inf) > cost:
+                        shortcuts.append((source, target, cost))
+            return shortcuts
+
+        # The importance of a node is its edge difference (shortcuts added - edges removed)
+        # plus the number of its neighbors that were already contracted (to spread the contraction uniformly)
+        def importance(node: int) -> int:
+            return len(find_shortcuts(node, ESTIMATE_SETTLE_LIMIT)) - len(outgoing[node]) - len(incoming[node]) + contracted_neighbors[node]
+
+        queue = [(importance(node), node) for node in range(count)]
+        heapq.heapify(queue)
+        rank = [0] * count
+        next_rank = 0
+        while queue:
+            # Lazy update: recompute the importance of the best node and only contract it if it is still the best
+            _, node = heapq.heappop(queue)
+            priority = importance(node)
+            if queue and priority > queue[0][0]:
+                heapq.heappush(queue, (priority, node))
+                continue
+            for source, target, cost in find_shortcuts(node):
+                add_edge(source, target, cost, node)
+            rank[node] = next_rank
+            next_rank += 1
+            for neighbor in list(outgoing[node]):
+                del incoming[neighbor][node]
+                contracted_neighbors[neighbor] += 1
+            for neighbor in list(incoming[node]):
+                del outgoing[neighbor][node]
+                contracted_neighbors[neighbor] += 1
+            outgoing[node].clear()
+            incoming[node].clear()
+
+        upward: List[List[Tuple[int, float]]] = [[] for _ in range(count)]
+        downward: List[List[Tuple[int, float]]] = [[] for _ in range(count)]
+        middles: Dict[Tuple[int, int], int] = {}
+        for (u, w), (cost, middle) in edges.items():
+            middles[(u, w)] = middle
+            if rank[w] > rank[u]:
+                upward[u].append((w, cost))
+            else:
+                downward[w].append((u, cost))
+        return ContractionHierarchy([node.name for node in nodes], upward, downward, middles, graph_hash)
+
+    # Returns the names of the nodes on the shortest path from source to target excluding the source
+    # or None if the target cannot be reached. The visit function (if given) is called for every settled node.
+    def query(self, source: str, target: str, visit=None) -> List[str]:
+        source, target = self.index[source], self.index[target]
+        if source == target: return []
+        # Each direction has its own distances, parents and queue
+        searches = (
+            (self.upward, {source: 0}, {source: -1}, [(0, source)]),
+            (self.downward, {target: 0}, {target: -1}, [(0, target)]),
+        )
+        best, meeting = math.inf, -1
+        forward_turn = True
+        while True:
+            forward_queue, backward_queue = searches[0][3], searches[1][3]
+            # A direction is finished when its queue is empty or its least distance is not less than the best path
+            forward_active = forward_queue and forward_queue[0][0] < best
+            backward_active = backward_queue and backward_queue[0][0] < best
+            if not forward_active and not backward_active: break
+            forward_turn = forward_active and (forward_turn or not backward_active)
+            edges, distances, parents, queue = searches[0 if forward_turn else 1]
+            other_distances = searches[1 if forward_turn else 0][1]
+            forward_turn = not forward_turn
+            distance, node = heapq.heappop(queue)
+            if distance > distances[node]: continue
+            if visit is not None: visit(self.names[node])
+            if node in other_distances and distance + other_distances[node] < best:
+                best, meeting = distance + other_distances[node], node
+            for neighbor, cost in edges[node]:
+                new_distance = distance + cost
+                if new_distance < distances.get(neighbor, math.inf):
+                    distances[neighbor] = new_distance
+                    parents[neighbor] = node
+                    heapq.heappush(queue, (new_distance, neighbor))
+        if meeting < 0: return None
+        # Rebuild the path in the contracted graph then unpack each edge
+        forward_parents, backward_parents = searches[0][2], searches[1][2]
+        nodes = [meeting]
+        while forward_parents[nodes[-1]] >= 0:
+            nodes.append(forward_parents[nodes[-1]])
+        nodes.reverse()
+        while backward_parents[nodes[-1]] >= 0:
+            nodes.append(backward_parents[nodes[-1]])
+        path = []
+        for u, w in zip(nodes[:-1], nodes[1:]):
+            self._unpack(u, w, path)
+        return [self.names[node] for node in path]
+
+    # Append the original nodes (excluding u) of the edge u -> w to the path
+    def _unpack(self, u: int, w: int, path: List[int]) -> None:
+        # We use an explicit stack since the shortcuts can be deeply nested
+        stack = [(u, w)]
+        while stack:
+            u, w = stack.pop()
+            middle = self.middles[(u, w)]
+            if middle < 0:
+                path.append(w)
+            else:
+                stack.append((middle, w))
+                stack.append((u, middle))
+
+    # Write the hierarchy to a binary file: a length-prefixed JSON header (with the node names and the array sizes)
+    # followed by the upward edges, the downward edges (see _flatten_edges) and the middle node of every edge
+    def save(self, path: str) -> None:
+        upward, downward = _flatten_edges(self.upward), _flatten_edges(self.downward)
+        sources, targets, middles = array('q'), array('q'), array('q')
+        for (u, w), middle in self.middles.items():
+            sources.append(u)
+            targets.append(w)
+            middles.append(middle)
+        header = json.dumps({
+            "version": _FILE_VERSION,
+            "graph_hash": self.graph_hash,
+            "names": self.names,
+            "upward_edges": len(upward[1]),
+            "downward_edges": len(downward[1]),
+            "middles": len(middles),
+        }).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(_FILE_MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            for data in upward + downward + (sources, targets, middles):
+                data.tofile(f)
+
+    # Load a hierarchy from file, returns None if the file does not exist, if it is not a valid hierarchy file
+    # or if it does not match the given graph hash
+    @staticmethod
+    def load(path: str, graph_hash: str = "") -> 'ContractionHierarchy':
+        if not os.path.isfile(path): return None
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(_FILE_MAGIC)) != _FILE_MAGIC: return None
+                header_size = struct.unpack('<Q', f.read(8))[0]
+                if header_size > os.path.getsize(path): return None
+                header = json.loads(f.read(header_size).decode('utf-8'))
+                if not isinstance(header, dict) or header.get("version") != _FILE_VERSION or header.get("graph_hash") != graph_hash:
+                    return None
+                names = header.get("names")
+                if not isinstance(names, list) or not all(isinstance(name, str) for name in names): return None
+                sizes = [header.get(key) for key in ("upward_edges", "downward_edges", "middles")]
+                if not all(type(size) is int and size >= 0 for size in sizes): return None
+                count = len(names)
+                arrays = []
+                for typecode, size in (('q', count + 1), ('q', sizes[0]), ('d', sizes[0]),
+                                       ('q', count + 1), ('q', sizes[1]), ('d', sizes[1]),
+                                       ('q', sizes[2]), ('q', sizes[2]), ('q', sizes[2])):
+                    data = array(typecode)
+                    data.fromfile(f, size)
+                    arrays.append(data)
+        except (OSError, ValueError, EOFError, struct.error):
+            return None
+        upward, downward = _unflatten_edges(*arrays[0:3], count), _unflatten_edges(*arrays[3:6], count)
+        if upward is None or downward is None: return None
+        sources, targets, middles = arrays[6:9]
+        if any(not 0 <= node < count for node in sources) or any(not 0 <= node < count for node in targets): return None
+        if any(not -1 <= middle < count for middle in middles): return None
+        return ContractionHierarchy(names, upward, downward, dict(zip(zip(sources, targets), middles)), graph_hash)
+
+# Returns the path where the hierarchy of a graph file is saved (graphs/graph1.json -> graphs/graph1.ch)
+def hierarchy_path(graph_path: str) -> str:
+    return os.path.splitext(graph_path)[0] + ".ch"
+
+# Load the hierarchy of the graph file if it was saved before, otherwise build it and save it next to the graph file
+# The hierarchy is stored in the problem cache to be used by ContractionHierarchySearch
+def load_contraction_hierarchy(problem: GraphRoutingProblem, graph_path: str, save: bool = True) -> ContractionHierarchy:
+    with open(graph_path, 'rb') as f:
+        graph_hash = hashlib.sha1(f.read()).hexdigest()
+    path = hierarchy_path(graph_path)
+    hierarchy = ContractionHierarchy.load(path, graph_hash)
+    if hierarchy is None:
+        hierarchy = ContractionHierarchy.build(problem, graph_hash)
+        if save: hierarchy.save(path)
+    problem.cache()["contraction_hierarchy"] = hierarchy
+    return hierarchy
+
+# A search function (with the same signature as the uninformed search functions) that answers the query using the hierarchy
+# If no hierarchy was loaded for the problem, one is built in memory
+# The stats count the settled nodes of both directions as the expanded nodes
+@search_statistics
+def ContractionHierarchySearch(problem: GraphRoutingProblem, initial_state: GraphNode, stats: SearchStats = None) -> Solution:
+    cache = problem.cache()
+    hierarchy: ContractionHierarchy = cache.get("contraction_hierarchy")
+    if hierarchy is None:
+        hierarchy = ContractionHierarchy.build(problem)
+        cache["contraction_hierarchy"] = hierarchy
+    nodes: Dict[str, GraphNode] = cache.get("nodes_by_name")
+    if nodes is None:
+        nodes = {node.name: node for node in problem.adjacency}
+        cache["nodes_by_name"] = nodes
+    # The goal check is only used to track the traversal order (the settled nodes of both directions)
+    def settle(name: str) -> None:
+        if stats is not None: stats.expand(nodes[name])
+        problem.is_goal(nodes[name])
+    path = hierarchy.query(initial_state.name, problem.goal.name, settle)
+    return None if path is None else [nodes[name] for name in path]
+
+if __name__ == "__main__":
+    # Build the hierarchies of the given graph files ahead of time
+    parser = argparse.ArgumentParser(description="Build and save the contraction hierarchies of graph files")
+    parser.add_argument("graphs", nargs="+", help="paths to the graphs to preprocess")
+    args = parser.parse_args()
+    for graph_path in args.graphs:
+        problem = GraphRoutingProblem.from_file(graph_path)
+        hierarchy = load_contraction_hierarchy(problem, graph_path)
+        shortcuts = sum(middle >= 0 for middle in hierarchy.middles.values())
+        print(f"{graph_path}: {len(hierarchy.names)} nodes, {len(hierarchy.middles)} edges ({shortcuts} shortcuts) -> {hierarchy_path(graph_path)}")
@@ -1,9 +1,11 @@
 from dataclasses import dataclass
-from typing import FrozenSet, Iterable
+from typing import Callable, Dict, FrozenSet, Iterable, List, Tuple
 from enum import Enum
+from array import array
+import math
 
 from mathutils import Direction, Point
-from problem import Problem
+from problem import HeuristicFunction, Problem
 from helpers.utils import track_call_count
 
 # This file contains the definition for the Dungeon Scavenger problem
@@ -71,6 +73,8 @@ class DungeonProblem(Problem[DungeonState, Direction]):
     # The problem will contain the dungeon layout and the inital state
     layout: DungeonLayout
     initial_state: DungeonState
+    # All the actions cost 1
+    integer_costs = True
 
     def get_initial_state(self) -> DungeonState:
         return self.initial_state
@@ -104,6 +108,55 @@ class DungeonProblem(Problem[DungeonState, Direction]):
         # All actions have the same cost
         return 1
 
+    # The walkable neighbors of every walkable cell as a tuple of (direction, neighbor) in the same order as get_actions
+    # The table is built once per problem and stored in the problem cache
+    def get_neighbors(self) -> Dict[Point, Tuple[Tuple[Direction, Point], ...]]:
+        cache = self.cache()
+        neighbors = cache.get("neighbors")
+        if neighbors is None:
+            walkable = self.layout.walkable
+            neighbors = {}
+            for point in walkable:
+                adjacent = ((direction, point + direction.to_vector()) for direction in Direction)
+                neighbors[point] = tuple((direction, neighbor) for direction, neighbor in adjacent if neighbor in walkable)
+            cache["neighbors"] = neighbors
+        return neighbors
+
+    # The neighbors of the player are looked up in the precomputed table, so the walls are not checked again
+    # for every successor as they would be by calling get_actions then get_successor
+    def expand(self, state: DungeonState) -> List[Tuple[Direction, DungeonState, float]]:
+        layout, remaining_coins = state.layout, state.remaining_coins
+        expansions = []
+        for direction, player in self.get_neighbors()[state.player]:
+            # If we walk over a coin, we take it
+            coins = remaining_coins - {player} if player in remaining_coins else remaining_coins
+            expansions.append((direction, DungeonState(layout, player, coins), 1))
+        return expansions
+
+    # The fingerprint of a state is its packed integer (see DungeonStateEncoder)
+    def fingerprint(self, state: DungeonState) -> int:
+        return self.get_state_encoder().encode(state)
+
+    # The predecessors of a state are the states from which we can reach it in one action
+    # The player came from a neighboring cell with the same remaining coins. In addition, if the player stands where
+    # a coin was placed in the level, the coin may have been collected by this move (so it was remaining before it)
+    def get_predecessors(self, state: DungeonState) -> Iterable[DungeonState]:
+        player, remaining_coins = state.player, state.remaining_coins
+        collected_here = player in self.initial_state.remaining_coins and player not in remaining_coins
+        predecessors = []
+        for direction in Direction:
+            previous = player - direction.to_vector()
+            # The player cannot stand on a coin that was not collected yet
+            if previous not in self.layout.walkable or previous in remaining_coins: continue
+            predecessors.append(DungeonState(state.layout, previous, remaining_coins))
+            if collected_here:
+                predecessors.append(DungeonState(state.layout, previous, remaining_coins | {player}))
+        return predecessors
+
+    # Returns all the goal states: the player at the exit after collecting all the coins
+    def get_goal_states(self) -> List[DungeonState]:
+        return [DungeonState(self.layout, self.layout.exit, frozenset())]
+
     # Read a dungeon problem from text containing a grid of tiles
     @staticmethod
     def from_text(text: str) -> 'DungeonProblem':
@@ -127,8 +180,243 @@ class DungeonProblem(Problem[DungeonState, Direction]):
         problem.initial_state = DungeonState(problem.layout, player, frozenset(coins))
         return problem
 
+    # Returns the table of the shortest path distances between all the walkable cells of the layout
+    # The table is built once per problem and stored in the problem cache
+    def get_distance_table(self) -> 'DistanceTable':
+        cache = self.cache()
+        table = cache.get("distance_table")
+        if table is None:
+            table = DistanceTable(self.layout, self.get_cell_graph())
+            cache["distance_table"] = table
+        return table
+
+    # Returns the numbering and the neighbors of the walkable cells of the layout (see CellGraph)
+    # The graph is created once per problem and stored in the problem cache
+    def get_cell_graph(self) -> 'CellGraph':
+        cache = self.cache()
+        graph = cache.get("cell_graph")
+        if graph is None:
+            graph = CellGraph(self.layout)
+            cache["cell_graph"] = graph
+        return graph
+
+    # Returns the encoder that converts the states of this problem to and from packed integers
+    # The encoder is created once per problem and stored in the problem cache
+    def get_state_encoder(self) -> 'DungeonStateEncoder':
+        cache = self.cache()
+        encoder = cache.get("state_encoder")
+        if encoder is None:
+            encoder = DungeonStateEncoder(self.layout, self.initial_state.remaining_coins)
+            cache["state_encoder"] = encoder
+        return encoder
+
+    # Returns an equivalent problem whose states are packed integers (see DungeonStateEncoder)
+    def packed(self) -> 'PackedDungeonProblem':
+        return PackedDungeonProblem(self)
+
     # Read a dungeon problem from file containing a grid of tiles
     @staticmethod
     def from_file(path: str) -> 'DungeonProblem':
         with open(path, 'r') as f:
-            return DungeonProblem.from_text(f.read())
\ No newline at end of file
+            return DungeonProblem.from_text(f.read())
+
+# This class numbers the walkable cells of a layout and stores the neighbors of every cell (by their numbers)
+# It finds the true maze distances (the number of steps while avoiding walls) from one cell to all the others
+# with a breadth first search in O(cell_count) time, so the callers that only need the distances to a few targets
+# (such as the coins and the exit) do not have to build the whole DistanceTable
+class CellGraph:
+    def __init__(self, layout: DungeonLayout) -> None:
+        self.layout = layout
+        # Sort the cells by their location so the numbering does not depend on the set iteration order
+        self.cells: List[Point] = sorted(layout.walkable, key=lambda point: (point.y, point.x))
+        self.index: Dict[Point, int] = {point: index for index, point in enumerate(self.cells)}
+        self.cell_count = len(self.cells)
+        self.neighbors: List[List[int]] = [
+            [self.index[neighbor] for neighbor in (point + direction.to_vector() for direction in Direction) if neighbor in self.index]
+            for point in self.cells
+        ]
+
+    # Returns the list of distances from the given cell to every cell by its number (math.inf if the cell cannot be reached)
+    # Since the moves can be reversed, it is also the list of distances from every cell to the given cell
+    def distances_from(self, source: Point) -> List[float]:
+        neighbors = self.neighbors
+        distances = [math.inf] * self.cell_count
+        start = self.index[source]
+        distances[start] = 0
+        layer, distance = [start], 0
+        while layer:
+            distance += 1
+            next_layer = []
+            for cell in layer:
+                for neighbor in neighbors[cell]:
+                    if distances[neighbor] == math.inf:
+                        distances[neighbor] = distance
+                        next_layer.append(neighbor)
+            layer = next_layer
+        return distances
+
+# This class stores the true maze distance (the number of steps while avoiding walls) between every pair of walkable cells
+# The walkable cells are numbered (see CellGraph) and the distances are stored row by row in a flat array of unsigned integers
+# so the distance between the cells i and j is at index i * cell_count + j.
+# The table is filled by running a breadth first search from every walkable cell which takes O(cell_count^2) time and space
+# so it should only be used when the distances between arbitrary pairs of cells are needed
+class DistanceTable:
+    def __init__(self, layout: DungeonLayout, graph: CellGraph = None) -> None:
+        self.layout = layout
+        graph = graph or CellGraph(layout)
+        self.cells: List[Point] = graph.cells
+        self.index: Dict[Point, int] = graph.index
+        count = self.cell_count = graph.cell_count
+        neighbors = graph.neighbors
+        # Use the smallest item size that can hold the longest possible distance (count - 1) and the unreachable marker
+        typecode = 'H' if count < 0xFFFF else 'I'
+        self.unreachable = 0xFFFF if typecode == 'H' else 0xFFFFFFFF
+        self.distances = array(typecode, [self.unreachable]) * (count * count)
+        distances = self.distances
+        for source in range(count):
+            row = source * count
+            distances[row + source] = 0
+            layer, distance = [source], 0
+            while layer:
+                distance += 1
+                next_layer = []
+                for cell in layer:
+                    for neighbor in neighbors[cell]:
+                        if distances[row + neighbor] == self.unreachable:
+                            distances[row + neighbor] = distance
+                            next_layer.append(neighbor)
+                layer = next_layer
+
+    # Returns the number of steps needed to go from p1 to p2 (or math.inf if p2 cannot be reached from p1)
+    def distance(self, p1: Point, p2: Point) -> float:
+        distance = self.distances[self.index[p1] * self.cell_count + self.index[p2]]
+        return math.inf if distance == self.unreachable else distance
+
+# This class converts a dungeon state to a single python int and back
+# A packed state is (coin_mask << cell_bits) | cell where:
+#   cell = y * width + x is the index of the player location in the grid
+#   coin_mask has the bit (1 << i) set if the i-th coin of the level is still remaining
+# Packed states are hashed and compared as plain ints so they are much cheaper to store in sets and dictionaries
+# than a DungeonState which holds a Point and a frozenset of coins
+class DungeonStateEncoder:
+    def __init__(self, layout: DungeonLayout, coins: Iterable[Point]) -> None:
+        self.layout = layout
+        self.cell_bits = max(1, (layout.width * layout.height - 1).bit_length())
+        self.cell_mask = (1 << self.cell_bits) - 1
+        # The coins are sorted by their location so the encoding does not depend on the set iteration order
+        self.coins: List[Point] = sorted(coins, key=lambda coin: (coin.y, coin.x))
+        self.coin_bits: Dict[Point, int] = {coin: 1 << index for index, coin in enumerate(self.coins)}
+        # Remember the mask of the last coin set since the successors of a state share its frozenset object
+        # (a single entry so the memory does not grow with the number of coin sets seen)
+        self._last_coins: FrozenSet[Point] = None
+        self._last_mask = 0
+
+    def point_to_cell(self, point: Point) -> int:
+        return point.y * self.layout.width + point.x
+
+    def cell_to_point(self, cell: int) -> Point:
+        return Point(cell % self.layout.width, cell // self.layout.width)
+
+    # Returns the coin mask of a set of coins
+    def coins_to_mask(self, coins: FrozenSet[Point]) -> int:
+        if coins is self._last_coins: return self._last_mask
+        mask = 0
+        coin_bits = self.coin_bits
+        for coin in coins:
+            mask |= coin_bits[coin]
+        self._last_coins, self._last_mask = coins, mask
+        return mask
+
+    # Returns the set of coins in a coin mask
+    def mask_to_coins(self, mask: int) -> FrozenSet[Point]:
+        return frozenset(coin for index, coin in enumerate(self.coins) if mask >> index & 1)
+
+    def encode(self, state: DungeonState) -> int:
+        return (self.coins_to_mask(state.remaining_coins) << self.cell_bits) | self.point_to_cell(state.player)
+
+    def decode(self, packed: int) -> DungeonState:
+        return DungeonState(self.layout, self.cell_to_point(packed & self.cell_mask), self.mask_to_coins(packed >> self.cell_bits))
+
+# This is the dungeon problem where every state is a packed int (see DungeonStateEncoder)
+# All the grid lookups are precomputed into flat tables indexed by the cell index so that
+# get_actions, get_successor and is_goal never create Points or frozensets
+class PackedDungeonProblem(Problem[int, Direction]):
+    # All the actions cost 1
+    integer_costs = True
+
+    def __init__(self, problem: DungeonProblem) -> None:
+        super().__init__()
+        self.problem = problem
+        self.layout = problem.layout
+        self.encoder = problem.get_state_encoder()
+        self.initial_state = self.encoder.encode(problem.initial_state)
+        # The goal is the only state where the player is at the exit and the coin mask is empty
+        self.goal = self.encoder.point_to_cell(self.layout.exit)
+        self._cell_bits = self.encoder.cell_bits
+        self._cell_mask = self.encoder.cell_mask
+        cell_count = self.layout.width * self.layout.height
+        # For each cell, the possible actions (in the same order as DungeonProblem.get_actions)
+        self._actions: List[Tuple[Direction, ...]] = [()] * cell_count
+        # For each cell and direction (at index cell * 4 + direction), the next cell or -1 if it is not walkable
+        self._next_cell: List[int] = [-1] * (cell_count * 4)
+        # For each cell, the bit of the coin that is initially there (or 0 if there is no coin)
+        self._coin_bit: List[int] = [0] * cell_count
+        for point in self.layout.walkable:
+            cell = self.encoder.point_to_cell(point)
+            actions = []
+            for direction in Direction:
+                position = point + direction.to_vector()
+                if position not in self.layout.walkable: continue
+                actions.append(direction)
+                self._next_cell[cell * 4 + direction] = self.encoder.point_to_cell(position)
+            self._actions[cell] = tuple(actions)
+        for coin, bit in self.encoder.coin_bits.items():
+            self._coin_bit[self.encoder.point_to_cell(coin)] = bit
+
+    def get_initial_state(self) -> int:
+        return self.initial_state
+
+    # We use @track_call_count to track the number of times this function was called to count the number of explored nodes
+    @track_call_count
+    def is_goal(self, state: int) -> bool:
+        return state == self.goal
+
+    def get_actions(self, state: int) -> Iterable[Direction]:
+        return self._actions[state & self._cell_mask]
+
+    def get_successor(self, state: int, action: Direction) -> int:
+        cell = self._next_cell[(state & self._cell_mask) * 4 + action]
+        if cell < 0:
+            # If we try to walk into a wall, the state does not change
+            return state
+        # If we walk over a coin, we take it (its bit is cleared)
+        coins = (state >> self._cell_bits) & ~self._coin_bit[cell]
+        return (coins << self._cell_bits) | cell
+
+    def get_cost(self, state: int, action: Direction) -> float:
+        # All actions have the same cost
+        return 1
+
+    def expand(self, state: int) -> List[Tuple[Direction, int, float]]:
+        cell_bits, next_cell, coin_bit = self._cell_bits, self._next_cell, self._coin_bit
+        cell = state & self._cell_mask
+        coins = state >> cell_bits
+        expansions = []
+        for action in self._actions[cell]:
+            successor = next_cell[cell * 4 + action]
+            expansions.append((action, ((coins & ~coin_bit[successor]) << cell_bits) | successor, 1))
+        return expansions
+
+    def encode(self, state: DungeonState) -> int:
+        return self.encoder.encode(state)
+
+    def decode(self, state: int) -> DungeonState:
+        return self.encoder.decode(state)
+
+    # Convert a heuristic written for DungeonProblem into a heuristic for this problem
+    # The packed state is decoded before calling the heuristic and the original problem is passed
+    # so the heuristic can still use the original problem cache
+    def wrap_heuristic(self, heuristic: HeuristicFunction) -> Callable[['PackedDungeonProblem', int], float]:
+        def packed_heuristic(problem: PackedDungeonProblem, state: int) -> float:
+            return heuristic(problem.problem, problem.decode(state))
+        return packed_heuristic
\ No newline at end of file
@@ -2,7 +2,8 @@ from os import stat
 from dungeon import DungeonProblem, DungeonState
 from mathutils import Direction, Point, euclidean_distance, manhattan_distance
 from helpers import utils
-import heapq
+from typing import Dict, FrozenSet
+import heapq, math
 
 
 # This heuristic returns the distance between the player and the exit as an estimate for the path cost
@@ -14,25 +15,196 @@ def weak_heuristic(problem: DungeonProblem, state: DungeonState):
 
 # TODO: Import any modules and write any functions you want to us
 
+# The strong heuristic is a lower bound on the cost of collecting the remaining coins then reaching the exit
+# where all the distances are true maze distances found by a breadth first search from every coin and from the exit (see CellGraph in dungeon.py).
+# The bound only depends on the player location and the set of remaining coins. The part that depends on the coins only
+# is memoized by the remaining coin set (in problem.cache()) so it is computed once for each distinct set.
+#   - If few coins remain, we use the exact Held-Karp dynamic programming over the coin subsets
+#     which gives the exact cost of the best coin ordering (so the heuristic is perfect).
+#   - Otherwise, we use the weight of the minimum spanning tree over the remaining coins and the exit
+#     plus the distance from the player to the nearest coin.
+# Both bounds are consistent: moving one step changes the distance to the nearest coin by at most 1
+# and the bound of a coin set never exceeds the bound of the smaller set (after taking the coin) plus the distance to that coin.
+# Mixing them is also consistent since the Held-Karp bound is never lower than the MST bound for the same state.
+
+# The maximum number of remaining coins for which the Held-Karp bound is used.
+# The first call for a set of k coins solves all its 2^k subsets in O(2^k * k^2)
+HELD_KARP_LIMIT = 10
+
+# The data shared by all the calls of the strong heuristic for a certain problem
+class _CoinGraph:
+    def __init__(self, problem: DungeonProblem) -> None:
+        cells = problem.get_cell_graph()
+        # The number of each walkable cell (the player location is looked up in the distance rows by its number)
+        self.index = cells.index
+        # The coins are numbered and the exit is given the last number
+        self.coins = sorted(problem.initial_state.remaining_coins, key=lambda coin: (coin.y, coin.x))
+        self.coin_index = {coin: index for index, coin in enumerate(self.coins)}
+        self.exit = len(self.coins)
+        targets = self.coins + [problem.layout.exit]
+        # The distance from every walkable cell (by its number) to each target (one breadth first search per target)
+        self.cell_distances = [cells.distances_from(target) for target in targets]
+        # The distances between every pair of targets
+        self.distances = [[row[cells.index[target]] for target in targets] for row in self.cell_distances]
+        # Memoization of the coin set bounds
+        self.mst_bounds = {}
+        self.held_karp = {}
+
+    # Returns the weight of the minimum spanning tree over the given coins and the exit (using Prim's algorithm)
+    def mst_bound(self, coins: FrozenSet) -> float:
+        bound = self.mst_bounds.get(coins)
+        if bound is None:
+            nodes = [self.coin_index[coin] for coin in coins]
+            distances = self.distances
+            # Start the tree from the exit
+            best = [distances[self.exit][node] for node in nodes]
+            bound = 0
+            while nodes:
+                nearest = min(range(len(nodes)), key=best.__getitem__)
+                bound += best[nearest]
+                node = nodes[nearest]
+                nodes[nearest], best[nearest] = nodes[-1], best[-1]
+                nodes.pop(); best.pop()
+                row = distances[node]
+                for index, other in enumerate(nodes):
+                    if row[other] < best[index]:
+                        best[index] = row[other]
+            self.mst_bounds[coins] = bound
+        return bound
+
+    # Returns a dictionary that maps every coin in the given set (as a bitmask) to the cost of the shortest path
+    # that starts at this coin, visits all the other coins in the set and ends at the exit
+    def held_karp_costs(self, mask: int) -> Dict[int, float]:
+        costs = self.held_karp.get(mask)
+        if costs is None:
+            distances = self.distances
+            costs = {}
+            rest = mask
+            while rest:
+                bit = rest & -rest
+                rest ^= bit
+                start = bit.bit_length() - 1
+                remaining = mask ^ bit
+                if remaining == 0:
+                    costs[start] = distances[start][self.exit]
+                    continue
+                row = distances[start]
+                costs[start] = min(row[coin] + cost for coin, cost in self.held_karp_costs(remaining).items())
+            self.held_karp[mask] = costs
+        return costs
+
+def _get_coin_graph(problem: DungeonProblem) -> _CoinGraph:
+    cache = problem.cache()
+    graph = cache.get("coin_graph")
+    if graph is None:
+        graph = _CoinGraph(problem)
+        cache["coin_graph"] = graph
+    return graph
 
 def strong_heuristic(problem: DungeonProblem, state: DungeonState) -> float:
-    # TODO: ADD YOUR CODE HERE
     # IMPORTANT: DO NOT USE "problem.is_goal" HERE.
     # Calling it here will mess up the tracking of the explored nodes count
     # which is considered the number of is_goal calls during the search
-    # NOTE: you can use problem.cache() to get a dictionary in which you can store information that will persist between calls of this function
-    # This could be useful if you want to store the results heavy computations that can be cached and used across multiple calls of this function
-    direct_distance = manhattan_distance(state.player, problem.layout.exit)
-
-    # The idea is to get an intermediate point between the start and end goal so you can calculate more realistic distance to the goal
-    intermediate_distance = 0
-    for coin in state.remaining_coins:
-        current_distance = manhattan_distance(
-            state.player, coin) + manhattan_distance(coin, problem.layout.exit)
-        if current_distance > intermediate_distance:
-            intermediate_distance = current_distance
-
-    if len(state.remaining_coins) >= 1:
-        return intermediate_distance
-
-    return direct_distance
+    graph = _get_coin_graph(problem)
+    player = graph.index[state.player]
+    coins = state.remaining_coins
+    cell_distances = graph.cell_distances
+    if not coins:
+        return cell_distances[graph.exit][player]
+    if len(coins) <= HELD_KARP_LIMIT:
+        mask = 0
+        for coin in coins:
+            mask |= 1 << graph.coin_index[coin]
+        return min(cell_distances[coin][player] + cost for coin, cost in graph.held_karp_costs(mask).items())
+    nearest = min(cell_distances[graph.coin_index[coin]][player] for coin in coins)
+    return nearest + graph.mst_bound(coins)
+
+# The maximum number of coins in each coin group of the pair heuristic
+PAIR_GROUP_SIZE = 11
+
+# The data shared by all the calls of the pair heuristic for a certain problem
+# The coins of the level are split into fixed groups of at most PAIR_GROUP_SIZE coins (in the order of their locations).
+# For each group and each source cell, a Held-Karp table gives the cost of the shortest walk that starts at the cell,
+# visits a subset of the group and ends at one of its coins. It is computed the first time the cell is used as a source.
+class _PairGroups:
+    def __init__(self, problem: DungeonProblem) -> None:
+        graph = _get_coin_graph(problem)
+        self.graph = graph
+        # The distances between any two player locations are needed, so the whole distance table is built
+        self.distance_table = problem.get_distance_table()
+        count = len(graph.coins)
+        group_count = -(-count // PAIR_GROUP_SIZE)
+        self.groups = [list(range(start, count, group_count)) for start in range(group_count)]
+        # The group and the bit of each coin inside its group
+        self.coin_bits = {graph.coins[coin]: (group_index, 1 << bit) for group_index, group in enumerate(self.groups) for bit, coin in enumerate(group)}
+        self.masks = {}     # The masks (one per group) of each coin set
+        self.tables = {}    # The Held-Karp table of each (group index, source cell index)
+
+    # Returns the list of masks (one per group) of a coin set
+    def group_masks(self, coins: FrozenSet) -> list:
+        masks = self.masks.get(coins)
+        if masks is None:
+            masks = [0] * len(self.groups)
+            for coin in coins:
+                group_index, bit = self.coin_bits[coin]
+                masks[group_index] |= bit
+            self.masks[coins] = masks
+        return masks
+
+    # Returns best where best[mask][last] is the cost of the shortest walk from the source cell
+    # that visits exactly the group coins in the mask and ends at the coin "last" of the group
+    def table(self, group_index: int, source: int) -> list:
+        key = (group_index, source)
+        best = self.tables.get(key)
+        if best is None:
+            group = self.groups[group_index]
+            size = len(group)
+            distances = self.graph.distances
+            best = [[math.inf] * size for _ in range(1 << size)]
+            for last, coin in enumerate(group):
+                best[1 << last][last] = self.graph.cell_distances[coin][source]
+            for mask in range(1, 1 << size):
+                costs = best[mask]
+                for last in range(size):
+                    cost = costs[last]
+                    if cost == math.inf: continue
+                    row = distances[group[last]]
+                    for coin in range(size):
+                        bit = 1 << coin
+                        if mask & bit: continue
+                        new_cost = cost + row[group[coin]]
+                        if new_cost < best[mask | bit][coin]:
+                            best[mask | bit][coin] = new_cost
+            self.tables[key] = best
+        return best
+
+def _get_pair_groups(problem: DungeonProblem) -> _PairGroups:
+    cache = problem.cache()
+    groups = cache.get("pair_groups")
+    if groups is None:
+        groups = _PairGroups(problem)
+        cache["pair_groups"] = groups
+    return groups
+
+# Estimates the cost of going from the source state to the target state (used by the incremental search in "incremental_search.py")
+# The player has to collect every coin that remains in the source but not in the target. For each group of coins,
+# the cost is at least the cost of the shortest walk from the source to the target through the group coins among them.
+# The estimate is the maximum of these bounds over the groups (or the direct distance if no coin has to be collected).
+# It is infinite if the target still has a coin that was already collected in the source.
+# Each bound is an exact cost in a relaxed problem, so the estimate satisfies the triangle inequality which D* Lite needs when the start moves.
+def dungeon_pair_heuristic(problem: DungeonProblem, source: DungeonState, target: DungeonState) -> float:
+    if not target.remaining_coins <= source.remaining_coins:
+        return math.inf
+    groups = _get_pair_groups(problem)
+    graph = groups.graph
+    source_cell, target_cell = graph.index[source.player], graph.index[target.player]
+    cell_distances = graph.cell_distances
+    bound = groups.distance_table.distance(source.player, target.player)
+    target_masks = groups.group_masks(target.remaining_coins)
+    for group_index, source_mask in enumerate(groups.group_masks(source.remaining_coins)):
+        mask = source_mask & ~target_masks[group_index]
+        if not mask: continue
+        group = groups.groups[group_index]
+        costs = groups.table(group_index, source_cell)[mask]
+        bound = max(bound, min(cost + cell_distances[group[last]][target_cell] for last, cost in enumerate(costs)))
+    return bound
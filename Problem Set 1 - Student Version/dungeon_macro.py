@@ -0,0 +1,128 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from dungeon import DungeonLayout, DungeonProblem, DungeonState
+from mathutils import Direction, Point
+from problem import HeuristicFunction, Problem, Solution
+from helpers.utils import track_call_count
+
+# This file reduces the dungeon problem by compressing the layout before searching
+#   1. Dead ends are pruned: a walkable cell with at most one walkable neighbor that has no coin, no exit and no player
+#      can never be part of an optimal path (the player would have to come back the way it entered), so it is removed.
+#      Removing it may create a new dead end so this is repeated until no such cell remains.
+#   2. Corridors are collapsed: the cells with exactly two walkable neighbors (and no coin, exit or player) are corridor cells.
+#      The other cells are the nodes of the reduced graph and every corridor between two nodes becomes one macro action.
+# The reduced problem has the same states as the dungeon problem (but the player only stands on the nodes)
+# and each macro action moves the player along a whole corridor at once with a cost equal to the number of steps.
+# Since every macro action is a sequence of steps, any consistent dungeon heuristic stays consistent on the reduced problem,
+# and the optimal plans have the same cost. The plans are expanded back into the per-step directions for the agent.
+
+# A macro action walks the player through the given directions and ends at the target node
+@dataclass(frozen=True)
+class MacroAction:
+    directions: Tuple[Direction, ...]
+    target: Point
+
+    def __str__(self) -> str:
+        return f"{''.join(str(int(direction)) for direction in self.directions)} -> {self.target}"
+
+# The compressed graph of a layout where the given points (the coins, the exit and the player) are always kept as nodes
+class CompressedLayout:
+    def __init__(self, layout: DungeonLayout, keep: Iterable[Point]) -> None:
+        self.layout = layout
+        keep = set(keep)
+        cells: Set[Point] = set(layout.walkable)
+
+        def neighbors(cell: Point) -> List[Tuple[Direction, Point]]:
+            return [(direction, cell + direction.to_vector()) for direction in Direction if cell + direction.to_vector() in cells]
+
+        # Prune the dead ends (repeatedly) using a work list
+        pending = [cell for cell in cells if cell not in keep and len(neighbors(cell)) <= 1]
+        while pending:
+            cell = pending.pop()
+            if cell not in cells: continue
+            around = neighbors(cell)
+            if len(around) > 1: continue
+            cells.remove(cell)
+            for _, neighbor in around:
+                if neighbor not in keep and len(neighbors(neighbor)) <= 1:
+                    pending.append(neighbor)
+        self.cells: FrozenSet[Point] = frozenset(cells)
+
+        # The nodes are the kept points and every cell which is not a corridor cell
+        self.nodes: FrozenSet[Point] = frozenset(cell for cell in cells if cell in keep or len(neighbors(cell)) != 2)
+
+        # Walk from every node in every direction until another node is reached
+        self.actions: Dict[Point, List[MacroAction]] = {}
+        for node in self.nodes:
+            actions = []
+            for direction, cell in neighbors(node):
+                directions = [direction]
+                previous = node
+                while cell not in self.nodes:
+                    # A corridor cell has exactly two neighbors: continue through the one we did not come from
+                    direction, next_cell = next((step, neighbor) for step, neighbor in neighbors(cell) if neighbor != previous)
+                    directions.append(direction)
+                    previous, cell = cell, next_cell
+                # A corridor that comes back to the same node is useless
+                if cell != node:
+                    actions.append(MacroAction(tuple(directions), cell))
+            self.actions[node] = actions
+
+# The dungeon problem reduced to the compressed graph of its layout
+# The player of the initial state (and every coin and the exit) is kept as a node so the search can start from it
+class MacroDungeonProblem(Problem[DungeonState, MacroAction]):
+    # The cost of a macro action is its number of steps
+    integer_costs = True
+
+    def __init__(self, problem: DungeonProblem, initial_state: DungeonState = None) -> None:
+        super().__init__()
+        self.problem = problem
+        self.layout = problem.layout
+        self.initial_state = initial_state or problem.get_initial_state()
+        keep = set(problem.get_initial_state().remaining_coins) | {self.layout.exit, self.initial_state.player}
+        self.graph = CompressedLayout(self.layout, keep)
+
+    def get_initial_state(self) -> DungeonState:
+        return self.initial_state
+
+    # We use @track_call_count to track the number of times this function was called to count the number of explored nodes
+    @track_call_count
+    def is_goal(self, state: DungeonState) -> bool:
+        return len(state.remaining_coins) == 0 and state.player == self.layout.exit
+
+    def get_actions(self, state: DungeonState) -> Iterable[MacroAction]:
+        return self.graph.actions[state.player]
+
+    # Only the target of a macro action can hold a coin since every coin is a node
+    def get_successor(self, state: DungeonState, action: MacroAction) -> DungeonState:
+        remaining_coins = state.remaining_coins
+        if action.target in remaining_coins:
+            remaining_coins -= {action.target}
+        return DungeonState(state.layout, action.target, remaining_coins)
+
+    def get_cost(self, state: DungeonState, action: MacroAction) -> float:
+        return len(action.directions)
+
+    def fingerprint(self, state: DungeonState) -> int:
+        return self.problem.fingerprint(state)
+
+    # Returns a heuristic for the reduced problem from a heuristic of the dungeon problem
+    def wrap_heuristic(self, heuristic: HeuristicFunction) -> HeuristicFunction:
+        problem = self.problem
+        return lambda _, state: heuristic(problem, state)
+
+# Expands a plan of macro actions into the per-step directions
+def expand_plan(plan: List[MacroAction]) -> Solution:
+    if plan is None: return None
+    return [direction for action in plan for direction in action.directions]
+
+# Wraps a search function so that it runs on the reduced problem and returns the per-step plan
+# The returned function has the same signature as the given one, so it can be used with the search agents.
+# If a heuristic is given, it is wrapped to receive the original dungeon problem. The other keyword arguments (such as stats)
+# are passed to the search function.
+def macro_search(search_fn: Callable[..., Solution]) -> Callable[..., Solution]:
+    def search(problem: DungeonProblem, initial_state: DungeonState, *heuristic: HeuristicFunction, **options) -> Solution:
+        reduced = MacroDungeonProblem(problem, initial_state)
+        return expand_plan(search_fn(reduced, initial_state, *(reduced.wrap_heuristic(function) for function in heuristic), **options))
+    return search
@@ -0,0 +1,84 @@
+from dungeon import DungeonProblem, DungeonState
+from dungeon_heuristic import strong_heuristic
+from jps import get_jump_point_grid
+from problem import Solution
+from search import AStarSearch
+from search_stats import SearchStats, search_statistics
+
+# This file contains an exact solver for the dungeon problem that does not search the (position x coin subset) state space
+# Once the maze distances between the player, the coins and the exit are known,
+# the optimal plan is the shortest path that starts at the player, visits every coin and ends at the exit.
+# So the solver:
+#   1. Computes the distances between the player, the coins and the exit using Jump Point Search (see "jps.py")
+#   2. Finds the best coin ordering using dynamic programming over the coin subsets (Held-Karp)
+#   3. Expands the ordering back into a list of Directions by planning each leg with Jump Point Search
+
+# The maximum number of coins for which the dynamic programming is used (it takes O(2^k * k^2) time)
+# For levels with more coins, the solver falls back to A* search with the strong heuristic
+TSP_COIN_LIMIT = 16
+
+# Solves the dungeon problem optimally from the given state (or the initial state if none is given)
+# It has the same signature as an uninformed search function so it can be used with UninformedSearchAgent
+# The stats count the jump points expanded by the point to point searches
+@search_statistics
+def solve_dungeon_tsp(problem: DungeonProblem, initial_state: DungeonState = None, stats: SearchStats = None) -> Solution:
+    state = initial_state or problem.get_initial_state()
+    coins = sorted(state.remaining_coins, key=lambda coin: (coin.y, coin.x))
+    if len(coins) > TSP_COIN_LIMIT:
+        # The undecorated A* is called since this solver already adds the search time to the stats
+        heuristic = strong_heuristic if stats is None else stats.count_heuristic(strong_heuristic)
+        return AStarSearch.__wrapped__(problem, state, heuristic, stats=stats)
+    count = len(coins)
+    # The points are the coins followed by the player then the exit
+    start, exit = count, count + 1
+    grid = get_jump_point_grid(problem)
+    points = coins + [state.player, problem.layout.exit]
+    distances = grid.pairwise_distances(points, stats)
+    inf = float('inf')
+
+    # best[mask][last] is the cost of the shortest path that starts at the player,
+    # collects exactly the coins in the mask and ends at the coin "last" (which is in the mask)
+    # parent[mask][last] is the coin visited before "last" in that path (or start if "last" is the first coin)
+    full = (1 << count) - 1
+    best = [[inf] * count for _ in range(full + 1)]
+    parent = [[start] * count for _ in range(full + 1)]
+    for coin in range(count):
+        best[1 << coin][coin] = distances[start][coin]
+    for mask in range(1, full + 1):
+        costs = best[mask]
+        for last in range(count):
+            cost = costs[last]
+            if cost == inf: continue
+            row = distances[last]
+            for coin in range(count):
+                bit = 1 << coin
+                if mask & bit: continue
+                new_cost = cost + row[coin]
+                if new_cost < best[mask | bit][coin]:
+                    best[mask | bit][coin] = new_cost
+                    parent[mask | bit][coin] = last
+
+    # Close the path at the exit
+    if count == 0:
+        return grid.find_path(state.player, problem.layout.exit, stats)
+    last, total = None, inf
+    for coin in range(count):
+        cost = best[full][coin] + distances[coin][exit]
+        if cost < total:
+            last, total = coin, cost
+    if last is None: return None
+
+    # Recover the coin order then plan each leg of the path
+    order = []
+    mask = full
+    while last != start:
+        order.append(last)
+        last, mask = parent[mask][last], mask ^ (1 << last)
+    order.reverse()
+    actions = []
+    previous = state.player
+    for coin in order:
+        actions += grid.find_path(previous, coins[coin], stats)
+        previous = coins[coin]
+    actions += grid.find_path(previous, problem.layout.exit, stats)
+    return actions
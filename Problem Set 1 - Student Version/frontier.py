@@ -0,0 +1,263 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Deque, Dict, Generic, Hashable, Iterator, List, TypeVar
+
+# This file contains the frontier containers used by the search functions in "search.py"
+# A frontier stores the items (nodes or states) that were generated but not explored yet
+
+# T is used for generic typing where T represents the type of the stored items
+T = TypeVar("T")
+
+# Frontier is a generic abstract class for all the frontier containers
+# Every frontier supports "push", "pop", "len" and truth testing (a frontier is truthy while it is not empty)
+class Frontier(ABC, Generic[T]):
+    # Add an item to the frontier with the given priority (ignored by the FIFO and LIFO frontiers)
+    # Returns True if the frontier changed
+    @abstractmethod
+    def push(self, item: T, priority: float = 0) -> bool:
+        pass
+
+    # Remove and return the next item to explore
+    @abstractmethod
+    def pop(self) -> T:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def __bool__(self) -> bool:
+        return len(self) != 0
+
+# A First-In-First-Out queue with O(1) push and pop
+class FIFOFrontier(Frontier[T]):
+    def __init__(self) -> None:
+        super().__init__()
+        self._items: Deque[T] = deque()
+
+    def push(self, item: T, priority: float = 0) -> bool:
+        self._items.append(item)
+        return True
+
+    def pop(self) -> T:
+        return self._items.popleft()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+# A Last-In-First-Out stack with O(1) push and pop
+class LIFOFrontier(Frontier[T]):
+    def __init__(self) -> None:
+        super().__init__()
+        self._items: List[T] = []
+
+    def push(self, item: T, priority: float = 0) -> bool:
+        self._items.append(item)
+        return True
+
+    def pop(self) -> T:
+        return self._items.pop()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+# An indexed binary min-heap where every item appears at most once
+# Each entry is a list [priority, sequence_number, item] where the sequence number is a global insertion counter.
+# Entries are ordered by priority then by sequence number, so items with the same priority are popped
+# in the order in which they were pushed (first in first out) and the items themselves are never compared.
+# This means that the items only need to be hashable (no need to convert them to strings to make them comparable).
+# The heap also stores the position of each item so that pushing an item that is already in the frontier
+# with a lower priority updates its entry in place (decrease-key) instead of adding a stale duplicate.
+class HeapFrontier(Frontier[T]):
+    def __init__(self) -> None:
+        super().__init__()
+        self._heap: List[list] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._counter = 0
+
+    # Insert the item or decrease its priority if it is already in the frontier with a higher priority
+    # A decreased item receives a new sequence number as if it was removed then pushed again
+    # Returns False (and changes nothing) if the item is already in the frontier with a priority that is not higher
+    def push(self, item: T, priority: float = 0) -> bool:
+        self._counter += 1
+        position = self._positions.get(item)
+        if position is None:
+            entry = [priority, self._counter, item]
+            self._heap.append(entry)
+            self._sift_up(len(self._heap) - 1, entry)
+            return True
+        entry = self._heap[position]
+        if priority >= entry[0]:
+            return False
+        entry[0], entry[1] = priority, self._counter
+        self._sift_up(position, entry)
+        return True
+
+    def pop(self) -> T:
+        heap = self._heap
+        last = heap.pop()
+        if heap:
+            top = heap[0]
+            self._sift_down(0, last)
+        else:
+            top = last
+        del self._positions[top[2]]
+        return top[2]
+
+    # Set the priority of an item whether it is in the frontier or not (unlike push, the priority can also increase)
+    # The item receives a new sequence number as if it was removed then pushed again
+    def update(self, item: T, priority: float) -> None:
+        position = self._positions.get(item)
+        if position is None:
+            self.push(item, priority)
+            return
+        self._counter += 1
+        entry = self._heap[position]
+        entry[0], entry[1] = priority, self._counter
+        self._sift_up(position, entry)
+        self._sift_down(self._positions[item], entry)
+
+    # Remove an item from the frontier (it must be in the frontier)
+    def remove(self, item: T) -> None:
+        heap = self._heap
+        position = self._positions.pop(item)
+        last = heap.pop()
+        if position < len(heap):
+            self._sift_up(position, last)
+            self._sift_down(self._positions[last[2]], last)
+
+    # Return the item with the least priority without removing it
+    def peek(self) -> T:
+        return self._heap[0][2]
+
+    # Return the least priority in the frontier
+    def peek_priority(self) -> float:
+        return self._heap[0][0]
+
+    # Return the priority of an item in the frontier (or None if it is not in the frontier)
+    def get_priority(self, item: T) -> float:
+        position = self._positions.get(item)
+        return None if position is None else self._heap[position][0]
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._positions
+
+    # Iterate over the items in the frontier (in no particular order)
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    # Move the entry up from the given position until its parent is not greater than it
+    def _sift_up(self, position: int, entry: list) -> None:
+        heap, positions = self._heap, self._positions
+        while position > 0:
+            parent_position = (position - 1) >> 1
+            parent = heap[parent_position]
+            if not entry < parent: break
+            heap[position] = parent
+            positions[parent[2]] = position
+            position = parent_position
+        heap[position] = entry
+        positions[entry[2]] = position
+
+    # Move the entry down from the given position until its children are not less than it
+    def _sift_down(self, position: int, entry: list) -> None:
+        heap, positions = self._heap, self._positions
+        size = len(heap)
+        child_position = 2 * position + 1
+        while child_position < size:
+            child = heap[child_position]
+            right_position = child_position + 1
+            if right_position < size and heap[right_position] < child:
+                child_position = right_position
+                child = heap[child_position]
+            if not child < entry: break
+            heap[position] = child
+            positions[child[2]] = position
+            position = child_position
+            child_position = 2 * position + 1
+        heap[position] = entry
+        positions[entry[2]] = position
+
+# The default largest priority of a BucketFrontier (a priority above it does not fit in the bucket list)
+BUCKET_MAX_PRIORITY = 1 << 20
+
+# A bucket queue (Dial's algorithm) for small non-negative integer priorities
+# Each priority has its own FIFO bucket so push and pop run in O(1) (amortized over the scanned empty buckets).
+# Like the HeapFrontier, every item appears at most once and pushing an item with a lower priority moves it
+# to the end of its new bucket, so the pop order is exactly the same as the one of the HeapFrontier.
+# Moved items leave a stale entry behind in their old bucket which is skipped when it reaches the front.
+# A bucket is only created when a priority is first used and it is released once it is empty, so the memory
+# used by the unused priorities is a single list slot each.
+# Pushing a priority that is not an integer between 0 and max_priority raises a ValueError.
+# In that case, to_heap converts the frontier into a HeapFrontier that pops the items in the same order.
+class BucketFrontier(Frontier[T]):
+    def __init__(self, max_priority: int = BUCKET_MAX_PRIORITY) -> None:
+        super().__init__()
+        self.max_priority = max_priority
+        self._buckets: List[Deque[list]] = [] # The bucket of each priority (None if it is empty)
+        self._entries: Dict[Hashable, list] = {}
+        self._minimum = 0 # All the buckets before this index are empty
+
+    def push(self, item: T, priority: float = 0) -> bool:
+        if not 0 <= priority <= self.max_priority or priority != int(priority):
+            raise ValueError(f"BucketFrontier only supports integer priorities between 0 and {self.max_priority}, got {priority}")
+        index = int(priority)
+        entry = self._entries.get(item)
+        if entry is not None:
+            if index >= entry[0]: return False
+            entry[1] = None # Mark the old entry as stale
+        entry = [index, item]
+        self._entries[item] = entry
+        buckets = self._buckets
+        if len(buckets) <= index:
+            buckets.extend([None] * (index + 1 - len(buckets)))
+        bucket = buckets[index]
+        if bucket is None:
+            bucket = buckets[index] = deque()
+        bucket.append(entry)
+        if index < self._minimum:
+            self._minimum = index
+        return True
+
+    def pop(self) -> T:
+        if not self._entries:
+            raise IndexError("pop from an empty frontier")
+        buckets, index = self._buckets, self._minimum
+        while True:
+            bucket = buckets[index]
+            if bucket is not None:
+                while bucket:
+                    entry = bucket.popleft()
+                    item = entry[1]
+                    if item is not None:
+                        self._minimum = index
+                        del self._entries[item]
+                        return item
+                buckets[index] = None
+            index += 1
+
+    # Return the priority of an item in the frontier (or None if it is not in the frontier)
+    def get_priority(self, item: T) -> float:
+        entry = self._entries.get(item)
+        return None if entry is None else entry[0]
+
+    # Return a HeapFrontier with the same items and priorities that pops them in the same order
+    # The items are pushed by increasing priority and in the order of their buckets, so the sequence numbers
+    # keep the first in first out order among the items with the same priority
+    def to_heap(self) -> HeapFrontier[T]:
+        heap = HeapFrontier()
+        for bucket in self._buckets[self._minimum:]:
+            if bucket is None: continue
+            for index, item in bucket:
+                if item is not None:
+                    heap.push(item, index)
+        return heap
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,6 @@
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Tuple
 from dataclasses import dataclass
-import json
+import json, math
 
 from problem import Problem
 from mathutils import Point, euclidean_distance
@@ -21,11 +21,20 @@ class GraphNode:
 
 # This is the implementation of the graph routing problem
 class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
-    def __init__(self, start: GraphNode, goal: GraphNode, adjacency: Dict[GraphNode, List[GraphNode]]) -> None:
+    def __init__(self, start: GraphNode, goal: GraphNode, adjacency: Dict[GraphNode, List[GraphNode]],
+                 reverse_adjacency: Dict[GraphNode, List[GraphNode]] = None) -> None:
         super().__init__()
         self.start = start
         self.goal = goal
         self.adjacency = adjacency
+        # The reverse adjacency maps each node to the nodes that have an edge into it (its predecessors)
+        # It is built once when the problem is created so that backward searches do not need to scan all the edges
+        if reverse_adjacency is None:
+            reverse_adjacency = {node: [] for node in adjacency}
+            for node, adjacent in adjacency.items():
+                for next_node in adjacent:
+                    reverse_adjacency.setdefault(next_node, []).append(node)
+        self.reverse_adjacency = reverse_adjacency
     
     def get_initial_state(self) -> GraphNode:
         return self.start
@@ -46,11 +55,53 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
     # The cost of an action is the distance between the current node and the next node 
     def get_cost(self, state: GraphNode, action: GraphNode) -> float:
         return euclidean_distance(state.position, action.position)
+
+    # The successor of each action is the action itself and the cost is computed inline (the same formula as euclidean_distance)
+    def expand(self, state: GraphNode) -> List[Tuple[GraphNode, GraphNode, float]]:
+        x, y = state.position
+        expansions = []
+        for node in self.adjacency.get(state, []):
+            dx, dy = x - node.position.x, y - node.position.y
+            expansions.append((node, node, math.sqrt(dx * dx + dy * dy)))
+        return expansions
     
+    # The node names are unique so the name is enough to identify a node
+    def fingerprint(self, state: GraphNode) -> str:
+        return state.name
+
+    # The predecessors of a node are the nodes from which we can reach it in one action
+    def get_predecessors(self, state: GraphNode) -> Iterable[GraphNode]:
+        return self.reverse_adjacency.get(state, [])
+
+    # Returns all the goal states (the problem has a single goal node)
+    def get_goal_states(self) -> List[GraphNode]:
+        return [self.goal]
+
+    # Returns the problem of going backward from the goal to the given node (or the start if none is given)
+    # by walking the edges in the reverse direction. The costs stay the same since the euclidean distance is symmetric.
+    def get_reversed(self, goal: GraphNode = None) -> 'GraphRoutingProblem':
+        return self.share_reversed_cache(GraphRoutingProblem(self.goal, goal or self.start, self.reverse_adjacency, self.adjacency))
+
+    # All the reversed problems of this problem share one cache, so the data computed for the reversed graph
+    # (which does not depend on the start or the goal) is kept between the queries instead of being computed again.
+    # The shared cache also holds this problem as "reversed_of", so the data of the reversed graph can be derived
+    # from the data of this problem (for example, the landmark tables are swapped instead of being built again)
+    def share_reversed_cache(self, reversed_problem: 'GraphRoutingProblem') -> 'GraphRoutingProblem':
+        cache = self.cache()
+        shared = cache.get("reversed_cache")
+        if shared is None:
+            shared = cache["reversed_cache"] = {"reversed_of": self}
+        setattr(reversed_problem, "_cache", shared)
+        return reversed_problem
+
     # Read a graph routing problem from file
     @staticmethod
     def from_file(path: str) -> 'GraphRoutingProblem':
-        problem_def: Dict[str, Dict] = json.load(open(path, 'r'))
+        return GraphRoutingProblem.from_dict(json.load(open(path, 'r')))
+
+    # Create a problem from the content of a graph file after it was parsed as JSON
+    @staticmethod
+    def from_dict(problem_def: Dict[str, Dict]) -> 'GraphRoutingProblem':
         graph_def: Dict[str, Dict] = problem_def.get("graph", {})
         node_dict = {name: GraphNode(name, Point(*item.get("position", [0,0]))) for name, item in graph_def.items()}
         adjacency: Dict[GraphNode, List[GraphNode]] = {}
@@ -63,4 +114,8 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
         return GraphRoutingProblem(start, goal, adjacency)
 
 def graphrouting_heuristic(problem: GraphRoutingProblem, state: GraphNode) -> float:
-    return euclidean_distance(state.position, problem.goal.position)
\ No newline at end of file
+    return euclidean_distance(state.position, problem.goal.position)
+
+# Estimates the cost of going from the source node to the target node (used by the incremental search in "incremental_search.py")
+def graphrouting_pair_heuristic(problem: GraphRoutingProblem, source: GraphNode, target: GraphNode) -> float:
+    return euclidean_distance(source.position, target.position)
\ No newline at end of file
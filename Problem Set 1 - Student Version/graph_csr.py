@@ -0,0 +1,321 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Tuple
+import json, math, os, struct
+
+from problem import Problem
+from graph import GraphNode, GraphRoutingProblem
+from mathutils import Point
+
+# This file contains a compact representation of the graph routing problem for very large graphs
+# The graph is stored in the Compressed Sparse Row (CSR) format where the nodes are numbered from 0 to n-1 and:
+#   the outgoing edges of node i are at the indices offsets[i] to offsets[i+1]-1 of the targets and weights arrays
+#   targets holds the number of the node at the end of each edge and weights holds the precomputed edge cost
+# The node names and positions are stored in a list and two arrays.
+# So a graph takes a few bytes per node and per edge instead of a GraphNode object per node and a python list per node.
+# The search functions still see GraphNode objects since CSRGraphRoutingProblem creates lightweight node views on demand.
+
+# The magic bytes and version of the binary cache file, the version should be increased whenever the format changes
+_FILE_MAGIC = b"CSRG"
+_FILE_VERSION = 1
+
+# A GraphNode that also knows its number in the CSR graph
+# The number is not compared or hashed so it has no effect on the node equality
+@dataclass(frozen=True)
+class IndexedGraphNode(GraphNode):
+    index: int = field(default=-1, compare=False, repr=False)
+
+# This class holds the CSR arrays of a graph
+# The reverse arrays (reverse_offsets, reverse_sources, reverse_weights) store the incoming edges in the same format
+class CSRGraph:
+    def __init__(self, names: List[str], xs: array, ys: array, offsets: array, targets: array, weights: array,
+                 metadata: Dict[str, Any] = None, reverse: Tuple[array, array, array] = None) -> None:
+        self.names = names
+        self.xs, self.ys = xs, ys
+        self.offsets, self.targets, self.weights = offsets, targets, weights
+        # Any extra top level fields of the graph file (such as "start", "goal" and "figure")
+        self.metadata = metadata or {}
+        self.reverse_offsets, self.reverse_sources, self.reverse_weights = reverse or self._transpose()
+        # The node views are created on demand and shared with the reversed graph
+        self._views: List[IndexedGraphNode] = [None] * len(names)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.targets)
+
+    # Returns the view of the node with the given number
+    def node(self, index: int) -> IndexedGraphNode:
+        view = self._views[index]
+        if view is None:
+            view = IndexedGraphNode(self.names[index], Point(self.xs[index], self.ys[index]), index)
+            self._views[index] = view
+        return view
+
+    # Returns the graph with all the edges reversed (the arrays are shared, not copied)
+    def reversed(self) -> 'CSRGraph':
+        graph = CSRGraph.__new__(CSRGraph)
+        graph.names, graph.xs, graph.ys, graph.metadata = self.names, self.xs, self.ys, self.metadata
+        graph.offsets, graph.targets, graph.weights = self.reverse_offsets, self.reverse_sources, self.reverse_weights
+        graph.reverse_offsets, graph.reverse_sources, graph.reverse_weights = self.offsets, self.targets, self.weights
+        graph._views = self._views
+        return graph
+
+    # Build the incoming edge arrays using a counting sort over the edge targets
+    def _transpose(self) -> Tuple[array, array, array]:
+        count = self.node_count
+        reverse_offsets = array('q', [0]) * (count + 1)
+        for target in self.targets:
+            reverse_offsets[target + 1] += 1
+        for index in range(count):
+            reverse_offsets[index + 1] += reverse_offsets[index]
+        reverse_sources = array(self.targets.typecode, [0]) * len(self.targets)
+        reverse_weights = array('d', [0]) * len(self.targets)
+        position = array('q', reverse_offsets[:-1])
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        for source in range(count):
+            for edge in range(offsets[source], offsets[source + 1]):
+                target = targets[edge]
+                slot = position[target]
+                reverse_sources[slot] = source
+                reverse_weights[slot] = weights[edge]
+                position[target] = slot + 1
+        return reverse_offsets, reverse_sources, reverse_weights
+
+    # Write the graph to a binary file: a length-prefixed JSON header followed by the raw arrays
+    def save(self, path: str, source_stamp: List[int] = None) -> None:
+        names = '\0'.join(self.names).encode('utf-8')
+        header = json.dumps({
+            "version": _FILE_VERSION,
+            "source": source_stamp,
+            "nodes": self.node_count,
+            "edges": self.edge_count,
+            "names_size": len(names),
+            "target_typecode": self.targets.typecode,
+            "metadata": self.metadata,
+        }).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(_FILE_MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            f.write(names)
+            for data in (self.xs, self.ys, self.offsets, self.targets, self.weights,
+                         self.reverse_offsets, self.reverse_sources, self.reverse_weights):
+                data.tofile(f)
+
+    # Read a graph from a binary file, returns None if the file does not exist or does not match the source stamp
+    @staticmethod
+    def load(path: str, source_stamp: List[int] = None) -> 'CSRGraph':
+        if not os.path.isfile(path): return None
+        with open(path, 'rb') as f:
+            if f.read(len(_FILE_MAGIC)) != _FILE_MAGIC: return None
+            header = json.loads(f.read(struct.unpack('<Q', f.read(8))[0]).decode('utf-8'))
+            if header.get("version") != _FILE_VERSION or header.get("source") != source_stamp: return None
+            node_count, edge_count = header["nodes"], header["edges"]
+            names_data = f.read(header["names_size"]).decode('utf-8')
+            names = names_data.split('\0') if node_count else []
+            arrays = []
+            target_typecode = header["target_typecode"]
+            for typecode, size in (('d', node_count), ('d', node_count),
+                                   ('q', node_count + 1), (target_typecode, edge_count), ('d', edge_count),
+                                   ('q', node_count + 1), (target_typecode, edge_count), ('d', edge_count)):
+                data = array(typecode)
+                data.fromfile(f, size)
+                arrays.append(data)
+        return CSRGraph(names, *arrays[:5], metadata=header.get("metadata"), reverse=tuple(arrays[5:]))
+
+    # Read a graph from a JSON graph file (in the same format read by GraphRoutingProblem.from_file) without loading
+    # the whole file into memory. The file is parsed twice: the first pass numbers the nodes and reads their positions
+    # and the second pass fills the edge arrays (since an edge may point to a node that appears later in the file)
+    @staticmethod
+    def from_json(path: str) -> 'CSRGraph':
+        names: List[str] = []
+        index: Dict[str, int] = {}
+        xs, ys = array('d'), array('d')
+        def read_node(name: str, item: Dict) -> None:
+            index[name] = len(names)
+            names.append(name)
+            x, y = item.get("position", [0, 0])
+            xs.append(x)
+            ys.append(y)
+        metadata = _stream_graph_file(path, read_node)
+
+        offsets = array('q', [0])
+        targets = array('i' if len(names) < 2**31 else 'q')
+        weights = array('d')
+        def read_edges(name: str, item: Dict) -> None:
+            source = index[name]
+            x, y = xs[source], ys[source]
+            for adjacent in sorted(item.get("adjacent", [])):
+                target = index.get(adjacent)
+                if target is None: continue
+                # Same formula as euclidean_distance so the costs are exactly the same as GraphRoutingProblem.get_cost
+                dx, dy = x - xs[target], y - ys[target]
+                targets.append(target)
+                weights.append(math.sqrt(dx * dx + dy * dy))
+            offsets.append(len(targets))
+        _stream_graph_file(path, read_edges)
+        return CSRGraph(names, xs, ys, offsets, targets, weights, metadata)
+
+# Parse a JSON graph file in chunks and call the callback with (name, definition) for each node in the "graph" field
+# Only one node definition is decoded at a time. Returns the other top level fields of the file.
+def _stream_graph_file(path: str, callback: Callable[[str, Dict], None], chunk_size: int = 1 << 20) -> Dict[str, Any]:
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, position, eof = "", 0, False
+
+        # Make sure there is unparsed text in the buffer (returns False at the end of the file)
+        def fill() -> bool:
+            nonlocal buffer, position, eof
+            if eof: return False
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[position:] + chunk
+            position = 0
+            return True
+
+        # Skip the whitespace and return the next character without consuming it
+        def peek() -> str:
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position < len(buffer): return buffer[position]
+                if not fill(): raise ValueError(f"Unexpected end of file in {path}")
+
+        def expect(char: str) -> None:
+            nonlocal position
+            if peek() != char: raise ValueError(f"Expected '{char}' in {path}")
+            position += 1
+
+        # Decode the next complete JSON value. A value that ends exactly at the end of the buffer
+        # may continue in the next chunk (such as a number) so we read more before accepting it
+        def value() -> Any:
+            nonlocal position
+            peek()
+            while True:
+                try:
+                    result, end = decoder.raw_decode(buffer, position)
+                    if end < len(buffer) or eof:
+                        position = end
+                        return result
+                except json.JSONDecodeError:
+                    if eof: raise
+                fill()
+
+        # Iterate over the keys of an object, the caller must consume the value of each key
+        def keys() -> Iterator[str]:
+            nonlocal position
+            expect('{')
+            if peek() == '}':
+                position += 1
+                return
+            while True:
+                key = value()
+                expect(':')
+                yield key
+                if peek() == ',':
+                    position += 1
+                    continue
+                expect('}')
+                return
+
+        metadata = {}
+        for key in keys():
+            if key == "graph":
+                for name in keys():
+                    callback(name, value())
+            else:
+                metadata[key] = value()
+        return metadata
+
+# A list-like view over a row of the CSR arrays that returns node views
+class _CSRAdjacency(Mapping):
+    def __init__(self, graph: CSRGraph) -> None:
+        self.graph = graph
+
+    def __getitem__(self, node: GraphNode) -> List[IndexedGraphNode]:
+        graph = self.graph
+        index = node.index
+        return [graph.node(target) for target in graph.targets[graph.offsets[index]:graph.offsets[index + 1]]]
+
+    def __iter__(self) -> Iterator[IndexedGraphNode]:
+        return (self.graph.node(index) for index in range(self.graph.node_count))
+
+    def __len__(self) -> int:
+        return self.graph.node_count
+
+    def __contains__(self, node: object) -> bool:
+        return isinstance(node, IndexedGraphNode) and 0 <= node.index < self.graph.node_count
+
+# The graph routing problem over a CSR graph
+# The states and actions are node views (IndexedGraphNode) so all the search functions and heuristics
+# written for GraphRoutingProblem work without changes, but the edges and costs are read from the CSR arrays.
+# It does not call GraphRoutingProblem.__init__ since the adjacency dictionaries are replaced by views over the arrays.
+class CSRGraphRoutingProblem(GraphRoutingProblem):
+    def __init__(self, graph: CSRGraph, start: int, goal: int) -> None:
+        Problem.__init__(self)
+        self.graph = graph
+        self.start = graph.node(start)
+        self.goal = graph.node(goal)
+        self.adjacency = _CSRAdjacency(graph)
+        self.reverse_adjacency = _CSRAdjacency(graph.reversed())
+
+    def get_actions(self, state: IndexedGraphNode) -> Iterable[IndexedGraphNode]:
+        return self.adjacency[state]
+
+    def get_predecessors(self, state: IndexedGraphNode) -> Iterable[IndexedGraphNode]:
+        return self.reverse_adjacency[state]
+
+    # The cost is the precomputed weight of the edge (found by scanning the outgoing edges of the state)
+    def get_cost(self, state: IndexedGraphNode, action: IndexedGraphNode) -> float:
+        graph = self.graph
+        target = action.index
+        for edge in range(graph.offsets[state.index], graph.offsets[state.index + 1]):
+            if graph.targets[edge] == target:
+                return graph.weights[edge]
+        raise ValueError(f"There is no edge from {state} to {action}")
+
+    # The successors and their costs are read from the same row of the CSR arrays (without scanning the row for every cost)
+    def expand(self, state: IndexedGraphNode) -> List[Tuple[IndexedGraphNode, IndexedGraphNode, float]]:
+        graph = self.graph
+        start, end = graph.offsets[state.index], graph.offsets[state.index + 1]
+        expansions = []
+        for target, weight in zip(graph.targets[start:end], graph.weights[start:end]):
+            node = graph.node(target)
+            expansions.append((node, node, weight))
+        return expansions
+
+    def fingerprint(self, state: IndexedGraphNode) -> int:
+        return state.index
+
+    def get_reversed(self, goal: GraphNode = None) -> 'CSRGraphRoutingProblem':
+        return self.share_reversed_cache(CSRGraphRoutingProblem(self.graph.reversed(), self.goal.index, (goal or self.start).index))
+
+    # Returns the view of the node with the given name (by scanning the names, so it should not be used in a loop)
+    def get_node(self, name: str) -> IndexedGraphNode:
+        return self.graph.node(self.graph.names.index(name))
+
+    # Read a graph routing problem from a JSON graph file. If use_cache is True, the CSR arrays are also saved
+    # to a binary file next to the graph (graphs/graph1.json -> graphs/graph1.csr) and loaded from it in the later runs
+    # as long as the graph file did not change (same size and modification time)
+    @staticmethod
+    def from_file(path: str, use_cache: bool = True) -> 'CSRGraphRoutingProblem':
+        graph = None
+        if use_cache:
+            stat = os.stat(path)
+            stamp = [stat.st_size, stat.st_mtime_ns]
+            cache_path = os.path.splitext(path)[0] + ".csr"
+            graph = CSRGraph.load(cache_path, stamp)
+        if graph is None:
+            graph = CSRGraph.from_json(path)
+            if use_cache: graph.save(cache_path, stamp)
+        names = {name: index for index, name in enumerate(graph.names)}
+        start = names[graph.metadata.get("start", "")]
+        goal = names[graph.metadata.get("goal", "")]
+        return CSRGraphRoutingProblem(graph, start, goal)
@@ -0,0 +1,69 @@
+from typing import List
+import argparse, glob, math, os, time
+
+from dungeon import DungeonProblem
+from dungeon_heuristic import strong_heuristic
+from graph import GraphRoutingProblem, graphrouting_heuristic
+from level_generator import generate_geometric_graph, generate_open_map
+from parallel_search import HashDistributedAStarSearch, default_layer_width
+from pea_benchmark import path_cost
+from problem import HeuristicFunction, Problem
+from search import AStarSearch
+from search_stats import SearchStats
+
+# This script measures how Hash Distributed A* (see "parallel_search.py") scales with the number of worker processes
+# on the levels in "dungeons/", randomly generated open maps and randomly generated geometric graphs (see "level_generator.py").
+# For each problem, it runs A* once then HDA* with every given number of workers and prints the expanded nodes,
+# the number of f(n) layers, the run time, the node throughput (expanded nodes per second), the speedup over 1 worker
+# and the speedup over A* (below 1 when HDA* is slower than A*). The layer width (see default_layer_width in
+# "parallel_search.py" unless --width is given) is printed with the problem name.
+# The speedup can not be larger than the number of CPUs, which is printed first.
+#
+# Usage: python hda_benchmark.py [--workers 1 2 4] [--size 60] [--maps 2] [--nodes 20000] [--degree 8] [--graphs 2] [--width W] [--seed 0]
+
+def benchmark(name: str, problem: Problem, heuristic: HeuristicFunction, workers: List[int], layer_width: float) -> None:
+    # Build the data cached by the heuristic (such as the coin distances of the dungeon) before timing the searches
+    # (the worker processes are forked after this, so they inherit the filled caches)
+    heuristic(problem, problem.get_initial_state())
+    if layer_width is None: layer_width = default_layer_width(problem, problem.get_initial_state())
+    stats, start = SearchStats(), time.time()
+    expected = path_cost(problem, AStarSearch(problem, problem.get_initial_state(), heuristic, stats=stats))
+    astar_time = time.time() - start
+    print(f"{name:<32} {'A*':>7} {stats.expanded:>9} {'':>7} {astar_time:>8.3f}s {stats.expanded / max(astar_time, 1e-9):>10.0f}")
+    print(f"  (layer width {layer_width:.3g})")
+    base_time = None
+    for count in workers:
+        stats, start = SearchStats(), time.time()
+        solution = HashDistributedAStarSearch(problem, problem.get_initial_state(), heuristic, count, layer_width, stats=stats)
+        elapsed = time.time() - start
+        cost = path_cost(problem, solution)
+        assert cost == expected or math.isclose(cost, expected), f"The path costs of A* and HDA* with {count} workers differ on {name}"
+        if base_time is None: base_time = elapsed
+        print(f"{'':<32} {f'HDA*x{count}':>7} {stats.expanded:>9} {stats.counters.get('layers', 0):>7} {elapsed:>8.3f}s"
+              f" {stats.expanded / max(elapsed, 1e-9):>10.0f} {base_time / max(elapsed, 1e-9):>8.2f}x {astar_time / max(elapsed, 1e-9):>8.2f}x")
+
+def main(args: argparse.Namespace) -> None:
+    print(f"CPUs: {os.cpu_count()}")
+    print(f"{'Problem':<32} {'Search':>7} {'Expanded':>9} {'Layers':>7} {'Time':>9} {'Nodes/s':>10} {'Speedup':>9} {'vs A*':>9}")
+    for path in sorted(glob.glob("dungeons/*.txt")):
+        benchmark(path, DungeonProblem.from_file(path), strong_heuristic, args.workers, args.width)
+    for index in range(args.maps):
+        seed = args.seed + index
+        problem = generate_open_map(args.size, args.size, 0.1, 6, seed)
+        benchmark(f"generated {args.size}x{args.size} (seed {seed})", problem, strong_heuristic, args.workers, args.width)
+    for index in range(args.graphs):
+        seed = args.seed + index
+        problem = generate_geometric_graph(args.nodes, args.degree, seed).to_problem()
+        benchmark(f"graph {args.nodes}x{args.degree} (seed {seed})", problem, graphrouting_heuristic, args.workers, args.width)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the scaling of Hash Distributed A* with the number of workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="the numbers of worker processes to compare")
+    parser.add_argument("--size", type=int, default=60, help="the width and height of the generated maps")
+    parser.add_argument("--maps", type=int, default=2, help="the number of generated maps")
+    parser.add_argument("--nodes", type=int, default=20000, help="the number of nodes of the generated graphs")
+    parser.add_argument("--degree", type=int, default=8, help="the number of nearest nodes connected to each node of the generated graphs")
+    parser.add_argument("--graphs", type=int, default=2, help="the number of generated graphs")
+    parser.add_argument("--width", type=float, default=None, help="the layer width of HDA* (how far above the smallest f(n) the bound is raised), by default it is chosen for each problem")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first generated map and graph")
+    main(parser.parse_args())
@@ -1,19 +1,39 @@
+from typing import Callable, Type
 from problem import A, S, Problem
 from .utils import add_call_listener
 
 class InconsistentHeuristicException(Exception):
     pass
 
+def _check_transition(heuristic, problem: Problem[S, A], state: S, action: A, next_state: S, c: float):
+    h = heuristic(problem, state)
+    next_h = heuristic(problem, next_state)
+    if h - next_h > c:
+        message = f"State (heuristic = {h}):" + "\n" + str(state) + "\n"
+        message += f"Action: {str(action)} (cost = {c})" + "\n"
+        message += f"Next State (heuristic = {next_h}):" + "\n" + str(next_state) + "\n"
+        message += "Decrease in heuristic exceeds the actions cost\n"
+        message += f"h(state) - h(next state) = {h} - {next_h} = {h - next_h} > {c} (action cost)"
+        raise InconsistentHeuristicException(message)
+
 def test_heuristic_consistency(heuristic):
     def listener(next_state: S, problem: Problem[S, A], state: S, action: A):
-        h = heuristic(problem, state)
-        next_h = heuristic(problem, next_state)
-        c = problem.get_cost(state, action)
-        if h - next_h > c:
-            message = f"State (heuristic = {h}):" + "\n" + str(state) + "\n"
-            message += f"Action: {str(action)} (cost = {c})" + "\n"
-            message += f"Next State (heuristic = {next_h}):" + "\n" + str(next_state) + "\n"
-            message += "Decrease in heuristic exceeds the actions cost\n"
-            message += f"h(state) - h(next state) = {h} - {next_h} = {h - next_h} > {c} (action cost)"
-            raise InconsistentHeuristicException(message)
-    return add_call_listener(listener)
\ No newline at end of file
+        _check_transition(heuristic, problem, state, action, next_state, problem.get_cost(state, action))
+    return add_call_listener(listener)
+
+# Same as test_heuristic_consistency but for problem.expand which returns all the transitions of a state at once
+def test_expansion_consistency(heuristic):
+    def listener(expansions, problem: Problem[S, A], state: S):
+        for action, next_state, c in expansions:
+            _check_transition(heuristic, problem, state, action, next_state, c)
+    return add_call_listener(listener)
+
+# Checks the heuristic consistency for every transition generated by get_successor or expand of the problem class
+# Returns a function that restores the original methods
+def check_heuristic_consistency(problem_type: Type[Problem], heuristic) -> Callable[[], None]:
+    original_get_successor, original_expand = problem_type.get_successor, problem_type.expand
+    problem_type.get_successor = test_heuristic_consistency(heuristic)(original_get_successor)
+    problem_type.expand = test_expansion_consistency(heuristic)(original_expand)
+    def restore() -> None:
+        problem_type.get_successor, problem_type.expand = original_get_successor, original_expand
+    return restore
@@ -3,8 +3,8 @@ from agents import HeuristicFunction
 from graph import GraphRoutingProblem, graphrouting_heuristic
 from dungeon import DungeonProblem, Direction
 from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_function
-from .heuristic_checks import InconsistentHeuristicException, test_heuristic_consistency
-from functools import lru_cache
+from .heuristic_checks import InconsistentHeuristicException, check_heuristic_consistency
+from heuristic_cache import HeuristicCache
 import time
 
 def run_uninformed_search_for_graph_routing(
@@ -89,9 +89,8 @@ def test_dungeon_heuristic(
     function_path: str, 
     problem: DungeonProblem) -> Tuple[float, int, str, float]:
     fetch_tracked_call_count(DungeonProblem.is_goal)
-    heuristic = lru_cache(2**16)(load_function("dungeon_heuristic.strong_heuristic"))
-    original_get_successor = DungeonProblem.get_successor
-    DungeonProblem.get_successor = test_heuristic_consistency(heuristic)(DungeonProblem.get_successor)
+    heuristic = HeuristicCache(load_function("dungeon_heuristic.strong_heuristic"))
+    restore_problem = check_heuristic_consistency(DungeonProblem, heuristic)
     search_fn = load_function(function_path)
     initial_state = problem.get_initial_state()
     message = ""
@@ -102,7 +101,7 @@ def test_dungeon_heuristic(
         message = "Heuristic is inconsistent:\n" + str(err)
         return None, 1e10, message, 0
     finally:
-        DungeonProblem.get_successor = original_get_successor
+        restore_problem()
     elapsed = time.time() - start
     explored = fetch_tracked_call_count(DungeonProblem.is_goal)
     path_cost = None
@@ -34,6 +34,10 @@ def fetch_tracked_call_count(fn):
     setattr(fn, "calls", 0)
     return calls
 
+# The recorded calls are kept in a bounded deque so that long runs which never fetch them do not keep growing in memory
+# Only the last RECORDED_CALLS_LIMIT calls are kept (use SearchStats in "search_stats.py" for the search statistics)
+RECORDED_CALLS_LIMIT = 1 << 20
+
 def record_calls(fn):
     def deco(*args, **kwargs):
         deco.calls.append({
@@ -41,12 +45,12 @@ def record_calls(fn):
             "kwargs": kwargs
         })
         return fn(*args, **kwargs)
-    deco.calls = deque()
+    deco.calls = deque(maxlen=RECORDED_CALLS_LIMIT)
     return deco
 
 def fetch_recorded_calls(fn):
     calls = getattr(fn, "calls", deque())
-    setattr(fn, "calls", deque())
+    setattr(fn, "calls", deque(maxlen=RECORDED_CALLS_LIMIT))
     return calls
 
 def add_call_listener(listener):
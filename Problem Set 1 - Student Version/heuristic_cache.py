@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+import functools, sys
+
+from problem import HeuristicFunction, Problem, S
+
+# The default memory budget of a heuristic cache in bytes
+HEURISTIC_CACHE_BUDGET = 16 << 20
+
+# The approximate memory used by an entry of the cache besides its key and value (the ordered dictionary slot and links)
+_ENTRY_OVERHEAD = 112
+
+# Returns the estimated memory used by an entry of the cache (the key is a pair of the problem id and the state fingerprint)
+def _entry_size(key: Tuple[int, Hashable], value: float) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(key[1]) + sys.getsizeof(value) + _ENTRY_OVERHEAD
+
+# HeuristicCache memoizes the values of a heuristic function for the states of a problem
+# It can be used anywhere a HeuristicFunction is accepted: cache = HeuristicCache(strong_heuristic)
+# The values are stored by the fingerprint of the state (see Problem.fingerprint) which is a compact value that
+# is cheaper to hash and store than the state itself (e.g. a packed integer instead of a DungeonState).
+# The cache can be shared between several problems (such as the forward and the backward problems of a bidirectional search)
+# since the values are stored by the pair (id of the problem, fingerprint of the state). A problem is referenced by the cache
+# as long as it has entries, so its id can not be reused by another problem while its values are still stored.
+# The memory used by the entries (estimated from the sizes of the keys and values) is kept under memory_budget bytes
+# by evicting the least recently used entries. The hits, misses and evictions are counted.
+class HeuristicCache:
+    def __init__(self, heuristic: HeuristicFunction, memory_budget: int = HEURISTIC_CACHE_BUDGET) -> None:
+        functools.update_wrapper(self, heuristic)
+        self.heuristic = heuristic
+        self.memory_budget = memory_budget
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory = 0     # The estimated memory used by the entries in bytes
+        self._values: Dict[Tuple[int, Hashable], float] = OrderedDict()
+        self._problems: Dict[int, list] = {}    # The [problem, number of entries] of every problem that has entries
+
+    def __call__(self, problem: Problem, state: S) -> float:
+        key = (id(problem), problem.fingerprint(state))
+        values = self._values
+        value = values.get(key)
+        if value is not None:
+            self.hits += 1
+            values.move_to_end(key)
+            return value
+        self.misses += 1
+        value = self.heuristic(problem, state)
+        values[key] = value
+        self.memory += _entry_size(key, value)
+        entry = self._problems.get(key[0])
+        if entry is None:
+            self._problems[key[0]] = [problem, 1]
+        else:
+            entry[1] += 1
+        # Evict the least recently used entries until the memory is within the budget (the new entry is always kept)
+        while self.memory > self.memory_budget and len(values) > 1:
+            old_key, old_value = values.popitem(last=False)
+            self.memory -= _entry_size(old_key, old_value)
+            self.evictions += 1
+            entry = self._problems[old_key[0]]
+            entry[1] -= 1
+            if entry[1] == 0: del self._problems[old_key[0]]
+        return value
+
+    # Remove all the entries (the counters are not reset)
+    def clear(self) -> None:
+        self._values.clear()
+        self._problems.clear()
+        self.memory = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    # Returns the ratio of the calls that were answered from the cache
+    @property
+    def hit_rate(self) -> float:
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0
+
+    # Returns the counters as a dictionary which can be saved as JSON
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "entries": len(self._values), "memory": self.memory, "memory_budget": self.memory_budget
+        }
+
+    def __str__(self) -> str:
+        return (f"Heuristic cache: {self.hits} hits, {self.misses} misses ({self.hit_rate:.1%} hit rate), {self.evictions} evictions, "
+                f"{len(self._values)} entries ({self.memory / (1 << 20):.2f} of {self.memory_budget / (1 << 20):.2f} MB)")
@@ -0,0 +1,144 @@
+from typing import Callable, Dict, Generic, Iterable, List, Tuple
+import math
+
+from frontier import HeapFrontier
+from problem import Problem, S, A, Solution
+
+# This file implements D* Lite, an incremental search algorithm that keeps its search effort between calls
+# The search runs backward from the goal states toward the start state and computes, for each state s:
+#   g(s):   the cost to the goal as of the last time s was expanded
+#   rhs(s): the one step lookahead min(c(s, s') + g(s')) over the successors s' of s (0 for the goal states)
+# A state is consistent if g(s) = rhs(s). The search only expands the inconsistent states ordered by the key:
+#   [min(g(s), rhs(s)) + h(start, s) + km, min(g(s), rhs(s))]
+# until no key in the queue is less than the key of the start and rhs(start) <= g(start). Then rhs(start) is the
+# optimal cost and the optimal path follows the successors with the least c(s, s') + g(s').
+# When the start moves (for example, when the agent is not where its plan expected it to be), the values of the
+# states that were already searched stay valid since they are costs to the goal. Instead of reordering the queue,
+# the offset km accumulates h(previous start, new start) so the old keys remain lower bounds of the new keys.
+# When some action costs change, only the changed states are updated and the repair spreads from them.
+#
+# The problem must provide:
+#   get_predecessors(state): the states from which the given state can be reached in one action
+#   get_goal_states(): all the goal states
+# The heuristic h(problem, source, target) estimates the cost from the source to the target.
+# It must be admissible and satisfy the triangle inequality h(a, c) <= h(a, b) + h(b, c) (the zero heuristic is used by default).
+
+PairHeuristicFunction = Callable[[Problem[S, A], S, S], float]
+
+class DStarLite(Generic[S, A]):
+    def __init__(self, problem: Problem[S, A], heuristic: PairHeuristicFunction = None) -> None:
+        self.problem = problem
+        self.heuristic = heuristic or (lambda *_: 0)
+        self.goals = set(problem.get_goal_states())
+        self.g: Dict[S, float] = {}
+        self.rhs: Dict[S, float] = {goal: 0 for goal in self.goals}
+        self.queue = HeapFrontier()
+        self.km = 0
+        self.start: S = None
+        self.expanded = 0   # The total number of expanded states over all the calls
+
+    # Returns the list of (action, successor, cost) for the state
+    def _successors(self, state: S) -> List[Tuple[A, S, float]]:
+        return self.problem.expand(state)
+
+    def _key(self, state: S) -> Tuple[float, float]:
+        value = min(self.g.get(state, math.inf), self.rhs.get(state, math.inf))
+        return (value + self.heuristic(self.problem, self.start, state) + self.km, value)
+
+    # Recompute the rhs of the state then add it to the queue if it is inconsistent (or remove it if it is consistent)
+    def _update_state(self, state: S) -> None:
+        g = self.g
+        if state not in self.goals:
+            self.rhs[state] = min((cost + g.get(successor, math.inf) for _, successor, cost in self._successors(state)), default=math.inf)
+        if g.get(state, math.inf) != self.rhs.get(state, math.inf):
+            self.queue.update(state, self._key(state))
+        elif state in self.queue:
+            self.queue.remove(state)
+
+    # Expand the inconsistent states until the cost of the start is known
+    # If max_expansions is given, it stops after expanding that many states and returns False (the search can be resumed later)
+    def _compute_shortest_path(self, max_expansions: int = None) -> bool:
+        problem, queue, g, rhs = self.problem, self.queue, self.g, self.rhs
+        start = self.start
+        limit = math.inf if max_expansions is None else self.expanded + max_expansions
+        while queue and (queue.peek_priority() < self._key(start) or rhs.get(start, math.inf) > g.get(start, math.inf)):
+            if self.expanded >= limit: return False
+            state = queue.peek()
+            old_key, new_key = queue.peek_priority(), self._key(state)
+            if old_key < new_key:
+                # The key was computed for an older start, reinsert the state with its current key
+                queue.update(state, new_key)
+                continue
+            queue.pop()
+            # The goal check is only used to track the expanded states; the search stops on the keys
+            problem.is_goal(state)
+            self.expanded += 1
+            if g.get(state, math.inf) > rhs[state]:
+                # The cost to the goal decreased: the state becomes consistent
+                g[state] = rhs[state]
+                for predecessor in problem.get_predecessors(state):
+                    self._update_state(predecessor)
+            else:
+                # The cost to the goal increased: reset the state and update it along with its predecessors
+                g[state] = math.inf
+                for predecessor in problem.get_predecessors(state):
+                    self._update_state(predecessor)
+                self._update_state(state)
+        return True
+
+    # Move the start of the search to the given state
+    def _move_start(self, state: S) -> None:
+        if self.start is None:
+            self.start = state
+            for goal in self.goals:
+                self.queue.update(goal, self._key(goal))
+            return
+        if state == self.start: return
+        step = self.heuristic(self.problem, self.start, state)
+        self.start = state
+        if step == math.inf:
+            # The offset cannot absorb an infinite change so the queue is reordered using the new start
+            self.km = 0
+            for queued in list(self.queue):
+                self.queue.update(queued, self._key(queued))
+        else:
+            self.km += step
+
+    # Notify the search that the costs of the actions of the given states changed
+    def update_costs(self, states: Iterable[S]) -> None:
+        for state in states:
+            self._update_state(state)
+
+    # Moves the start to the given state and repairs the search so that its optimal cost is known
+    # Returns False if the repair needed more than max_expansions expanded states (then the repair is not finished)
+    def repair(self, state: S, max_expansions: int = None) -> bool:
+        self._move_start(state)
+        return self._compute_shortest_path(max_expansions)
+
+    # Returns the best action to do in the given state (or None if no goal can be reached from it)
+    def next_action(self, state: S) -> A:
+        self.repair(state)
+        # The start may stay inconsistent with rhs(start) < g(start) but rhs(start) is the optimal cost from it
+        if self.rhs.get(state, math.inf) == math.inf: return None
+        g = self.g
+        best_action, best_cost = None, math.inf
+        for action, successor, cost in self._successors(state):
+            total = cost + g.get(successor, math.inf)
+            if total < best_cost:
+                best_action, best_cost = action, total
+        return best_action
+
+    # Returns the optimal plan from the given state to a goal (or None if no goal can be reached from it)
+    # The plan follows the successors with the smallest g(n) + cost, so it stops after as many steps as the states
+    # that have a g(n) and returns None instead of looping forever if the g values along the path are not consistent
+    def plan(self, state: S) -> Solution:
+        self.repair(state)
+        g = self.g
+        if self.rhs.get(state, math.inf) == math.inf: return None
+        path = []
+        for _ in range(len(g) + 1):
+            if state in self.goals: return path
+            action, successor, _ = min(self._successors(state), key=lambda step: step[2] + g.get(step[1], math.inf))
+            path.append(action)
+            state = successor
+        return None
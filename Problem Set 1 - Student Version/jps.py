@@ -0,0 +1,148 @@
+from typing import Dict, List, Tuple
+import math
+
+from dungeon import DungeonLayout, DungeonProblem
+from frontier import HeapFrontier
+from mathutils import Direction, Point
+from problem import Solution
+from search_stats import SearchStats
+
+# This file implements Jump Point Search (JPS) for point to point queries over the walkable cells of a dungeon layout
+# In a 4-connected grid with unit costs, there are many shortest paths between two cells that only differ in
+# the order of their moves, and A* expands the cells of all of them. JPS only expands "jump points":
+# from a cell, it keeps moving in a straight line without adding anything to the frontier and only stops at
+#   - the goal
+#   - a cell with a forced neighbor: a side cell that is open while the side cell behind it is a wall,
+#     so the shortest paths through that side cell must turn at this cell
+#   - (when moving vertically) a cell from which a horizontal scan reaches a jump point
+# A jump point reached horizontally continues forward, up and down. A jump point reached vertically continues
+# forward, left and right. The start and the goal are always jump points. The path cost between two jump points
+# is the length of the straight line between them, so A* over the jump points with the manhattan distance
+# still returns the shortest paths.
+#
+# The layout is stored as a flat bytearray of open cells with a border of walls around it
+# so that the scans never need to check the grid bounds.
+
+class JumpPointGrid:
+    def __init__(self, layout: DungeonLayout) -> None:
+        self.layout = layout
+        self.stride = layout.width + 2
+        self.open = bytearray(self.stride * (layout.height + 2))
+        for point in layout.walkable:
+            self.open[self.cell(point)] = 1
+
+    def cell(self, point: Point) -> int:
+        return (point.y + 1) * self.stride + point.x + 1
+
+    # Move from the cell in the given direction (step = +-1 for horizontal moves or +-stride for vertical moves)
+    # until a jump point is reached. Returns the jump point or -1 if a wall is hit first.
+    def _jump(self, cell: int, step: int, goal: int) -> int:
+        open, stride = self.open, self.stride
+        if step == 1 or step == -1:
+            while True:
+                cell += step
+                if not open[cell]: return -1
+                if cell == goal: return cell
+                if (open[cell - stride] and not open[cell - step - stride]) or (open[cell + stride] and not open[cell - step + stride]):
+                    return cell
+        while True:
+            cell += step
+            if not open[cell]: return -1
+            if cell == goal: return cell
+            if (open[cell - 1] and not open[cell - 1 - step]) or (open[cell + 1] and not open[cell + 1 - step]):
+                return cell
+            # A vertical move must stop wherever a horizontal move can reach a jump point
+            if self._jump(cell, 1, goal) >= 0 or self._jump(cell, -1, goal) >= 0:
+                return cell
+
+    # Runs A* over the jump points. Returns the path cost and the parent of each reached jump point,
+    # or None if the goal cannot be reached.
+    # If stats are given, the expanded and generated jump points are added to them
+    def _search(self, start: int, goal: int, stats: SearchStats = None) -> Tuple[float, Dict[int, int]]:
+        open, stride = self.open, self.stride
+        if not open[start] or not open[goal]: return None
+        goal_x, goal_y = goal % stride, goal // stride
+        def heuristic(cell: int) -> int:
+            return abs(cell % stride - goal_x) + abs(cell // stride - goal_y)
+        frontier = HeapFrontier()
+        frontier.push(start, heuristic(start))
+        cost = {start: 0}
+        parents = {start: None}
+        explored = set()
+        generated = 1
+        result = None
+        while frontier:
+            cell = frontier.pop()
+            if stats is not None: stats.expand(cell, len(frontier) + 1)
+            if cell == goal:
+                result = (cost[cell], parents)
+                break
+            explored.add(cell)
+            parent = parents[cell]
+            if parent is None:
+                steps = (1, -1, stride, -stride)
+            elif abs(cell - parent) < stride:
+                # Reached horizontally: forward, up and down
+                steps = (1 if cell > parent else -1, stride, -stride)
+            else:
+                # Reached vertically: forward, left and right
+                steps = (stride if cell > parent else -stride, 1, -1)
+            for step in steps:
+                jump_point = self._jump(cell, step, goal)
+                if jump_point < 0 or jump_point in explored: continue
+                distance = abs(jump_point - cell)
+                if distance >= stride: distance //= stride
+                new_cost = cost[cell] + distance
+                if jump_point not in cost or new_cost < cost[jump_point]:
+                    cost[jump_point] = new_cost
+                    parents[jump_point] = cell
+                    frontier.push(jump_point, new_cost + heuristic(jump_point))
+                    generated += 1
+        if stats is not None:
+            stats.generated += generated
+        return result
+
+    # Returns the length of the shortest path between the two points (infinity if there is no path)
+    def distance(self, start: Point, goal: Point, stats: SearchStats = None) -> float:
+        result = self._search(self.cell(start), self.cell(goal), stats)
+        return math.inf if result is None else result[0]
+
+    # Returns the shortest path between the two points as a list of directions (None if there is no path)
+    def find_path(self, start: Point, goal: Point, stats: SearchStats = None) -> Solution:
+        start_cell, goal_cell = self.cell(start), self.cell(goal)
+        result = self._search(start_cell, goal_cell, stats)
+        if result is None: return None
+        _, parents = result
+        # Collect the jump points from the goal back to the start then fill the straight lines between them
+        jump_points = [goal_cell]
+        while parents[jump_points[-1]] is not None:
+            jump_points.append(parents[jump_points[-1]])
+        jump_points.reverse()
+        stride = self.stride
+        path = []
+        for source, target in zip(jump_points, jump_points[1:]):
+            difference = target - source
+            if abs(difference) < stride:
+                path += [Direction.RIGHT if difference > 0 else Direction.LEFT] * abs(difference)
+            else:
+                path += [Direction.DOWN if difference > 0 else Direction.UP] * (abs(difference) // stride)
+        return path
+
+    # Returns the matrix of the shortest path lengths between every pair of the given points
+    # Since the moves are reversible, each pair is only searched once
+    def pairwise_distances(self, points: List[Point], stats: SearchStats = None) -> List[List[float]]:
+        count = len(points)
+        distances = [[0] * count for _ in range(count)]
+        for i in range(count):
+            for j in range(i + 1, count):
+                distances[i][j] = distances[j][i] = self.distance(points[i], points[j], stats)
+        return distances
+
+# Returns the jump point grid of the problem layout (it is built once per problem and stored in the problem cache)
+def get_jump_point_grid(problem: DungeonProblem) -> JumpPointGrid:
+    cache = problem.cache()
+    grid = cache.get("jump_point_grid")
+    if grid is None:
+        grid = JumpPointGrid(problem.layout)
+        cache["jump_point_grid"] = grid
+    return grid
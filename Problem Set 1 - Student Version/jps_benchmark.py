@@ -0,0 +1,88 @@
+from typing import Iterable, List, Tuple
+import argparse, glob, time
+
+from dungeon import DungeonLayout, DungeonProblem
+from jps import JumpPointGrid
+from level_generator import generate_open_map
+from mathutils import Direction, Point, manhattan_distance
+from problem import Problem
+from search import AStarSearch
+from search_stats import SearchStats
+
+# This script compares A* and Jump Point Search (see "jps.py") on the point to point queries used by the dungeon solvers:
+# from the player to the exit and to every coin, between every pair of coins and from every coin to the exit.
+# It runs on the levels in "dungeons/" and on larger randomly generated open maps,
+# then prints the number of expanded nodes and the run time of both searches for each map.
+#
+# Usage: python jps_benchmark.py [--size 60] [--maps 3] [--walls 0.1] [--seed 0]
+
+# A point to point query on the grid of a dungeon layout (without coins) to run A* on
+class GridPathProblem(Problem[Point, Direction]):
+    def __init__(self, layout: DungeonLayout, start: Point, goal: Point) -> None:
+        super().__init__()
+        self.layout, self.start, self.goal = layout, start, goal
+
+    def get_initial_state(self) -> Point:
+        return self.start
+
+    def is_goal(self, state: Point) -> bool:
+        return state == self.goal
+
+    def get_actions(self, state: Point) -> Iterable[Direction]:
+        return [direction for direction in Direction if state + direction.to_vector() in self.layout.walkable]
+
+    def get_successor(self, state: Point, action: Direction) -> Point:
+        return state + action.to_vector()
+
+    def get_cost(self, state: Point, action: Direction) -> float:
+        return 1
+
+# Returns the query pairs of a dungeon problem
+def get_queries(problem: DungeonProblem) -> List[Tuple[Point, Point]]:
+    state = problem.get_initial_state()
+    coins = sorted(state.remaining_coins, key=lambda coin: (coin.y, coin.x))
+    queries = [(state.player, problem.layout.exit)]
+    queries += [(state.player, coin) for coin in coins]
+    queries += [(coins[i], coins[j]) for i in range(len(coins)) for j in range(i + 1, len(coins))]
+    queries += [(coin, problem.layout.exit) for coin in coins]
+    return queries
+
+def benchmark(name: str, problem: DungeonProblem) -> None:
+    queries = get_queries(problem)
+    heuristic = lambda grid_problem, state: manhattan_distance(state, grid_problem.goal)
+    stats, start = SearchStats(), time.time()
+    astar_costs = []
+    for source, target in queries:
+        grid_problem = GridPathProblem(problem.layout, source, target)
+        path = AStarSearch(grid_problem, source, heuristic, stats=stats)
+        astar_costs.append(None if path is None else len(path))
+    astar_expanded = stats.expanded
+    astar_time = time.time() - start
+    grid = JumpPointGrid(problem.layout)
+    stats, start = SearchStats(), time.time()
+    jps_costs = []
+    for source, target in queries:
+        path = grid.find_path(source, target, stats)
+        jps_costs.append(None if path is None else len(path))
+    jps_expanded = stats.expanded
+    jps_time = time.time() - start
+    assert astar_costs == jps_costs, f"The path costs of A* and JPS differ on {name}"
+    reduction = astar_expanded / max(jps_expanded, 1)
+    print(f"{name:<28} {len(queries):>8} {astar_expanded:>12} {jps_expanded:>12} {reduction:>9.1f}x {astar_time:>9.3f}s {jps_time:>9.3f}s")
+
+def main(args: argparse.Namespace) -> None:
+    print(f"{'Map':<28} {'Queries':>8} {'A* expanded':>12} {'JPS expanded':>12} {'Reduction':>10} {'A* time':>10} {'JPS time':>10}")
+    for path in sorted(glob.glob("dungeons/*.txt")):
+        benchmark(path, DungeonProblem.from_file(path))
+    for index in range(args.maps):
+        seed = args.seed + index
+        problem = generate_open_map(args.size, args.size, args.walls, 10, seed)
+        benchmark(f"generated {args.size}x{args.size} (seed {seed})", problem)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare A* and Jump Point Search on the dungeon grids")
+    parser.add_argument("--size", type=int, default=60, help="the width and height of the generated maps")
+    parser.add_argument("--maps", type=int, default=3, help="the number of generated maps")
+    parser.add_argument("--walls", type=float, default=0.1, help="the probability that an inner cell of a generated map is a wall")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first generated map")
+    main(parser.parse_args())
@@ -0,0 +1,188 @@
+from array import array
+from typing import Dict, List
+import hashlib, heapq, json, math, os, struct
+
+from graph import GraphRoutingProblem, GraphNode, graphrouting_heuristic
+
+# This file implements the ALT heuristic (A*, Landmarks and Triangle inequality) for the graph routing problem
+# A few nodes are selected as landmarks and the shortest path distances from and to each landmark are precomputed.
+# For any landmark L, the triangle inequality gives two lower bounds on the distance d(n, goal):
+#   d(n, goal) >= d(L, goal) - d(L, n)      and      d(n, goal) >= d(n, L) - d(goal, L)
+# The heuristic is the maximum of these bounds over all the landmarks. It is consistent since each bound is consistent.
+# The tables are computed once per graph file and saved next to it, so later runs just load them.
+# The file is a length-prefixed JSON header followed by the raw distance arrays (like the CSR graph files in "graph_csr.py")
+# so loading a file placed next to a graph can not run any code, and the header is checked before the arrays are read.
+
+# The default number of landmarks
+DEFAULT_LANDMARK_COUNT = 8
+
+# The file format version, it should be increased whenever the saved content changes
+_FILE_MAGIC = b"LMKT"
+_FILE_VERSION = 2
+
+# Runs Dijkstra's algorithm from the source over the given edges and returns the distances of all nodes (by index)
+# The edges are given as a function that returns a list of (neighbor index, edge cost) pairs for a node index
+def _dijkstra(source: int, count: int, edges) -> List[float]:
+    distances = [math.inf] * count
+    distances[source] = 0
+    queue = [(0, source)]
+    while queue:
+        distance, node = heapq.heappop(queue)
+        if distance > distances[node]: continue
+        for neighbor, cost in edges(node):
+            new_distance = distance + cost
+            if new_distance < distances[neighbor]:
+                distances[neighbor] = new_distance
+                heapq.heappush(queue, (new_distance, neighbor))
+    return distances
+
+# This class stores the landmark distance tables of a graph
+# The nodes are numbered and, for the i-th landmark, the distances are stored in flat arrays at index i * node_count + node:
+#   forward holds d(landmark, node) and backward holds d(node, landmark)
+# Unreachable nodes have an infinite distance
+class LandmarkTable:
+    def __init__(self, names: List[str], landmarks: List[int], forward: array, backward: array, graph_hash: str = "") -> None:
+        self.names = names
+        self.index: Dict[str, int] = {name: index for index, name in enumerate(names)}
+        self.landmarks = landmarks
+        self.forward = forward
+        self.backward = backward
+        self.graph_hash = graph_hash
+        self._reversed: 'LandmarkTable' = None
+
+    # Select the landmarks using farthest point selection: each new landmark is the node with the largest distance
+    # to its nearest landmark already selected (nodes that cannot be reached from any selected landmark come first)
+    # then compute the forward and backward distances for each landmark
+    @staticmethod
+    def build(problem: GraphRoutingProblem, count: int = DEFAULT_LANDMARK_COUNT, graph_hash: str = "") -> 'LandmarkTable':
+        nodes: List[GraphNode] = sorted(problem.adjacency, key=lambda node: node.name)
+        index = {node: i for i, node in enumerate(nodes)}
+        outgoing = [[(index[next_node], problem.get_cost(node, next_node)) for next_node in problem.get_actions(node)] for node in nodes]
+        incoming = [[(index[previous], problem.get_cost(previous, node)) for previous in problem.get_predecessors(node)] for node in nodes]
+        node_count = len(nodes)
+        count = min(count, node_count)
+        landmarks: List[int] = []
+        forward, backward = array('d'), array('d')
+        # The distance from every node to the nearest selected landmark (in both directions)
+        nearest = [math.inf] * node_count
+        # Start from the node farthest from the first node
+        candidate = 0
+        if node_count:
+            distances = _dijkstra(0, node_count, outgoing.__getitem__)
+            candidate = max(range(node_count), key=lambda node: (distances[node] != math.inf, distances[node]))
+        while len(landmarks) < count:
+            landmarks.append(candidate)
+            from_landmark = _dijkstra(candidate, node_count, outgoing.__getitem__)
+            to_landmark = _dijkstra(candidate, node_count, incoming.__getitem__)
+            forward.extend(from_landmark)
+            backward.extend(to_landmark)
+            for node in range(node_count):
+                nearest[node] = min(nearest[node], from_landmark[node] + to_landmark[node])
+            selected = set(landmarks)
+            candidate = max(range(node_count), key=lambda node: (node not in selected, nearest[node]))
+        return LandmarkTable([node.name for node in nodes], landmarks, forward, backward, graph_hash)
+
+    # Returns the table of the graph with all the edges reversed: d(L, n) in the reversed graph is d(n, L) in this graph,
+    # so the forward and backward distances are swapped (the arrays are shared, not copied)
+    def reversed(self) -> 'LandmarkTable':
+        if self._reversed is None:
+            self._reversed = LandmarkTable(self.names, self.landmarks, self.backward, self.forward, self.graph_hash)
+            self._reversed._reversed = self
+        return self._reversed
+
+    # Returns the lower bound on the distance between the two nodes
+    def estimate(self, source: str, target: str) -> float:
+        node_count = len(self.names)
+        source, target = self.index[source], self.index[target]
+        forward, backward = self.forward, self.backward
+        bound = 0
+        for offset in range(0, len(self.landmarks) * node_count, node_count):
+            # d(L, target) - d(L, source)
+            to_source, to_target = forward[offset + source], forward[offset + target]
+            if to_source != math.inf:
+                if to_target == math.inf: return math.inf # If L reaches the source but not the target, the source cannot reach the target
+                bound = max(bound, to_target - to_source)
+            # d(source, L) - d(target, L)
+            from_source, from_target = backward[offset + source], backward[offset + target]
+            if from_target != math.inf:
+                if from_source == math.inf: return math.inf # If the target reaches L but the source does not, the source cannot reach the target
+                bound = max(bound, from_source - from_target)
+        return bound
+
+    # Write the table to a binary file: a length-prefixed JSON header (with the node names and the landmarks)
+    # followed by the forward and backward arrays
+    def save(self, path: str) -> None:
+        header = json.dumps({
+            "version": _FILE_VERSION,
+            "graph_hash": self.graph_hash,
+            "names": self.names,
+            "landmarks": self.landmarks,
+        }).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(_FILE_MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            self.forward.tofile(f)
+            self.backward.tofile(f)
+
+    # Load a table from file, returns None if the file does not exist, if it is not a valid table file
+    # or if it does not match the given graph hash
+    @staticmethod
+    def load(path: str, graph_hash: str = "") -> 'LandmarkTable':
+        if not os.path.isfile(path): return None
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(_FILE_MAGIC)) != _FILE_MAGIC: return None
+                header_size = struct.unpack('<Q', f.read(8))[0]
+                if header_size > os.path.getsize(path): return None
+                header = json.loads(f.read(header_size).decode('utf-8'))
+                if not isinstance(header, dict) or header.get("version") != _FILE_VERSION or header.get("graph_hash") != graph_hash:
+                    return None
+                names, landmarks = header.get("names"), header.get("landmarks")
+                if not isinstance(names, list) or not all(isinstance(name, str) for name in names): return None
+                if not isinstance(landmarks, list) or not all(type(landmark) is int and 0 <= landmark < len(names) for landmark in landmarks):
+                    return None
+                forward, backward = array('d'), array('d')
+                forward.fromfile(f, len(landmarks) * len(names))
+                backward.fromfile(f, len(landmarks) * len(names))
+        except (OSError, ValueError, EOFError, struct.error):
+            return None
+        return LandmarkTable(names, landmarks, forward, backward, graph_hash)
+
+# Returns the path where the landmark tables of a graph file are saved (graphs/graph1.json -> graphs/graph1.landmarks)
+def landmarks_path(graph_path: str) -> str:
+    return os.path.splitext(graph_path)[0] + ".landmarks"
+
+# Load the landmark tables of the graph file if they were saved before with the same number of landmarks,
+# otherwise build them and save them next to the graph file.
+# The table is stored in the problem cache to be used by landmark_heuristic
+def load_landmarks(problem: GraphRoutingProblem, graph_path: str, count: int = DEFAULT_LANDMARK_COUNT, save: bool = True) -> LandmarkTable:
+    with open(graph_path, 'rb') as f:
+        graph_hash = hashlib.sha1(f.read()).hexdigest()
+    path = landmarks_path(graph_path)
+    table = LandmarkTable.load(path, graph_hash)
+    if table is None or len(table.landmarks) != min(count, len(table.names)):
+        table = LandmarkTable.build(problem, count, graph_hash)
+        if save: table.save(path)
+    problem.cache()["landmarks"] = table
+    return table
+
+# Returns the landmark table of the problem
+# The table of a reversed problem (see GraphRoutingProblem.get_reversed) is the table of the original problem
+# with the forward and backward distances swapped. Otherwise, if no table was loaded for the problem,
+# one is built in memory with the default number of landmarks
+def get_landmark_table(problem: GraphRoutingProblem) -> LandmarkTable:
+    cache = problem.cache()
+    original = cache.get("reversed_of")
+    if original is not None:
+        return get_landmark_table(original).reversed()
+    table: LandmarkTable = cache.get("landmarks")
+    if table is None:
+        table = LandmarkTable.build(problem)
+        cache["landmarks"] = table
+    return table
+
+# The ALT heuristic combined with the euclidean distance (the maximum of two consistent heuristics is consistent)
+def landmark_heuristic(problem: GraphRoutingProblem, state: GraphNode) -> float:
+    table = get_landmark_table(problem)
+    return max(table.estimate(state.name, problem.goal.name), graphrouting_heuristic(problem, state))
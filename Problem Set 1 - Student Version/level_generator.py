@@ -0,0 +1,217 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+import argparse, heapq, json, math, os, random
+
+from dungeon import DungeonProblem, DungeonTile
+from graph import GraphRoutingProblem
+
+# This file generates random dungeon levels and graphs to test how the search algorithms scale with the problem size.
+# Every generator takes a seed so the same arguments always give the same level.
+# The dungeons are returned as text in the format read by DungeonProblem.from_text (and from_file)
+# and the graphs are saved in the JSON format read by GraphRoutingProblem.from_file (and CSRGraphRoutingProblem.from_file).
+#
+# Usage:
+#   python level_generator.py maze generated/maze.txt [--width 101] [--height 101] [--coins 4] [--loops 0.05] [--seed 0]
+#   python level_generator.py open generated/open.txt [--width 60] [--height 60] [--coins 10] [--walls 0.1] [--seed 0]
+#   python level_generator.py graph generated/graph.json [--nodes 10000] [--degree 6] [--seed 0]
+
+# Places the player, the exit and the coins on distinct random free cells of the rows and returns the level text
+def _place_objects(rows: List[List[str]], free: List[Tuple[int, int]], coin_count: int, rng: random.Random) -> str:
+    if coin_count + 2 > len(free):
+        raise ValueError(f"The level has {len(free)} free cells which is not enough for the player, the exit and {coin_count} coins")
+    player, exit, *coins = rng.sample(free, coin_count + 2)
+    rows[player[1]][player[0]] = DungeonTile.PLAYER
+    rows[exit[1]][exit[0]] = DungeonTile.EXIT
+    for x, y in coins: rows[y][x] = DungeonTile.COIN
+    return '\n'.join(''.join(row) for row in rows)
+
+# Generates a maze level: the corridors are carved by a randomized depth first search from a random cell so every
+# free cell is reachable and there is exactly one path between any two cells. Then, each wall between two corridors
+# is removed with the probability loop_density which adds loops (0 gives a perfect maze, 1 gives an open grid of pillars).
+# The corridors are on the odd rows and columns so an even width or height leaves an extra wall on the right or bottom side.
+def generate_maze_text(width: int, height: int, coin_count: int, loop_density: float, seed: int) -> str:
+    if width < 3 or height < 3:
+        raise ValueError(f"The maze size must be at least 3x3, got {width}x{height}")
+    rng = random.Random(seed)
+    wall, empty = DungeonTile.WALL, DungeonTile.EMPTY
+    rows = [[wall] * width for _ in range(height)]
+    # The corridor cells are the cells with odd coordinates which are not on the border
+    max_x, max_y = (width - 2) | 1, (height - 2) | 1
+    if max_x >= width - 1: max_x -= 2
+    if max_y >= height - 1: max_y -= 2
+    start = (rng.randrange(1, max_x + 1, 2), rng.randrange(1, max_y + 1, 2))
+    rows[start[1]][start[0]] = empty
+    # The depth first search is iterative since the recursion would be too deep for large mazes
+    stack = [start]
+    steps = ((2, 0), (-2, 0), (0, 2), (0, -2))
+    while stack:
+        x, y = stack[-1]
+        unvisited = [(x + dx, y + dy) for dx, dy in steps if 1 <= x + dx <= max_x and 1 <= y + dy <= max_y and rows[y + dy][x + dx] == wall]
+        if not unvisited:
+            stack.pop()
+            continue
+        nx, ny = unvisited[rng.randrange(len(unvisited))]
+        rows[(y + ny) // 2][(x + nx) // 2] = empty
+        rows[ny][nx] = empty
+        stack.append((nx, ny))
+    # Remove some of the walls that separate two corridor cells to add loops
+    if loop_density > 0:
+        for y in range(1, max_y + 1):
+            row = rows[y]
+            # On the odd rows, the walls are between horizontal neighbors (even x), on the even rows between vertical neighbors (odd x)
+            for x in (range(2, max_x, 2) if y % 2 == 1 else range(1, max_x + 1, 2)):
+                if row[x] == wall and rng.random() < loop_density: row[x] = empty
+    free = [(x, y) for y in range(height) for x in range(width) if rows[y][x] == empty]
+    return _place_objects(rows, free, coin_count, rng)
+
+# Generates a rectangular map surrounded by walls where each inner cell is a wall with the given probability
+# (there is no guarantee that all the coins and the exit are reachable from the player)
+def generate_open_map_text(width: int, height: int, wall_density: float, coin_count: int, seed: int) -> str:
+    rng = random.Random(seed)
+    rows = [['#' if x in (0, width - 1) or y in (0, height - 1) or rng.random() < wall_density else '.' for x in range(width)] for y in range(height)]
+    free = [(x, y) for y in range(height) for x in range(width) if rows[y][x] == '.']
+    return _place_objects(rows, free, coin_count, rng)
+
+def generate_maze(width: int, height: int, coin_count: int, loop_density: float, seed: int) -> DungeonProblem:
+    return DungeonProblem.from_text(generate_maze_text(width, height, coin_count, loop_density, seed))
+
+def generate_open_map(width: int, height: int, wall_density: float, coin_count: int, seed: int) -> DungeonProblem:
+    return DungeonProblem.from_text(generate_open_map_text(width, height, wall_density, coin_count, seed))
+
+# Returns an upper bound of the number of states of a dungeon level: every free cell with every subset of the coins
+def count_dungeon_states(text: str, coin_count: int) -> int:
+    return sum(text.count(tile) for tile in (DungeonTile.EMPTY, DungeonTile.PLAYER, DungeonTile.COIN, DungeonTile.EXIT)) << coin_count
+
+# A generated graph where the nodes are numbered: node i is named f"n{i}", is at positions[i]
+# and has an edge to every node in adjacency[i]
+@dataclass
+class GeneratedGraph:
+    positions: List[Tuple[int, int]]
+    adjacency: List[List[int]]
+    start: int
+    goal: int
+
+    @staticmethod
+    def name(index: int) -> str:
+        return f"n{index}"
+
+    # Returns the graph in the format of the graph files
+    def to_dict(self) -> Dict[str, Any]:
+        name = self.name
+        return {
+            "graph": {name(index): {"position": list(position), "adjacent": [name(other) for other in adjacent]}
+                      for index, (position, adjacent) in enumerate(zip(self.positions, self.adjacency))},
+            "start": name(self.start),
+            "goal": name(self.goal),
+        }
+
+    def to_problem(self) -> GraphRoutingProblem:
+        return GraphRoutingProblem.from_dict(self.to_dict())
+
+    # Writes the graph file one node at a time so the whole JSON document is never built in memory
+    def save(self, path: str) -> None:
+        name = self.name
+        with open(path, 'w') as f:
+            f.write('{"graph": {')
+            for index, (position, adjacent) in enumerate(zip(self.positions, self.adjacency)):
+                if index: f.write(',')
+                f.write(f'\n{json.dumps(name(index))}: {{"position": [{position[0]}, {position[1]}], '
+                        f'"adjacent": {json.dumps([name(other) for other in adjacent])}}}')
+            f.write(f'\n}}, "start": {json.dumps(name(self.start))}, "goal": {json.dumps(name(self.goal))}}}\n')
+
+# Generates a random geometric graph: the nodes are placed uniformly at integer positions in a square and each node is
+# connected in both directions to its "degree" nearest nodes. The square side grows with the square root of the node count
+# so the distances between neighbors stay similar for any graph size.
+# The nearest nodes are found by putting the nodes in a grid of buckets and visiting the buckets in rings around the node
+# until no closer node can be found, so the generation takes about O(node_count * degree) time instead of O(node_count^2).
+# The start is a random node and the goal is a random node reachable from the start (if there is one).
+def generate_geometric_graph(node_count: int, degree: int, seed: int, side: int = None) -> GeneratedGraph:
+    if node_count < 2:
+        raise ValueError(f"The graph must have at least 2 nodes, got {node_count}")
+    rng = random.Random(seed)
+    if side is None: side = max(1000, 32 * math.isqrt(node_count))
+    positions = [(rng.randrange(side), rng.randrange(side)) for _ in range(node_count)]
+    degree = min(degree, node_count - 1)
+    # Choose the bucket size such that a bucket holds about 2 nodes on average
+    buckets_per_side = max(1, math.isqrt(node_count // 2))
+    bucket_size = side / buckets_per_side
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    for index, (x, y) in enumerate(positions):
+        buckets.setdefault((int(x / bucket_size), int(y / bucket_size)), []).append(index)
+    neighbor_sets = [set() for _ in range(node_count)]
+    for index, (x, y) in enumerate(positions):
+        bx, by = int(x / bucket_size), int(y / bucket_size)
+        candidates: List[Tuple[int, int]] = []
+        ring = 0
+        while True:
+            # Visit the buckets on the border of the square of buckets at distance "ring" from the bucket of the node
+            for cx in range(bx - ring, bx + ring + 1):
+                for cy in ((by - ring, by + ring) if abs(cx - bx) != ring else range(by - ring, by + ring + 1)):
+                    for other in buckets.get((cx, cy), ()):
+                        if other != index:
+                            ox, oy = positions[other]
+                            candidates.append(((ox - x) ** 2 + (oy - y) ** 2, other))
+            # Any node outside the visited buckets is at least ring * bucket_size away from this node
+            if len(candidates) >= degree:
+                nearest = heapq.nsmallest(degree, candidates)
+                if nearest[-1][0] <= (ring * bucket_size) ** 2 or ring > buckets_per_side:
+                    break
+            elif ring > buckets_per_side:
+                nearest = candidates
+                break
+            ring += 1
+        for _, other in nearest:
+            neighbor_sets[index].add(other)
+            neighbor_sets[other].add(index)
+    adjacency = [sorted(neighbors) for neighbors in neighbor_sets]
+    start = rng.randrange(node_count)
+    # Find the nodes reachable from the start via breadth first search to pick a reachable goal
+    reached = {start}
+    queue = deque([start])
+    while queue:
+        for other in adjacency[queue.popleft()]:
+            if other not in reached:
+                reached.add(other)
+                queue.append(other)
+    reached.discard(start)
+    goal = rng.choice(sorted(reached)) if reached else rng.choice([index for index in range(node_count) if index != start])
+    return GeneratedGraph(positions, adjacency, start, goal)
+
+def main(args: argparse.Namespace) -> None:
+    directory = os.path.dirname(args.output)
+    if directory: os.makedirs(directory, exist_ok=True)
+    if args.kind == "graph":
+        graph = generate_geometric_graph(args.nodes, args.degree, args.seed)
+        graph.save(args.output)
+        edges = sum(map(len, graph.adjacency))
+        print(f"{args.output}: {args.nodes} nodes (states), {edges} edges")
+        return
+    if args.kind == "maze":
+        text = generate_maze_text(args.width, args.height, args.coins, args.loops, args.seed)
+    else:
+        text = generate_open_map_text(args.width, args.height, args.walls, args.coins, args.seed)
+    with open(args.output, 'w') as f:
+        f.write(text + '\n')
+    print(f"{args.output}: {args.width}x{args.height} with {args.coins} coins (at most {count_dungeon_states(text, args.coins)} states)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate random dungeon levels and graphs")
+    subparsers = parser.add_subparsers(dest="kind", required=True)
+    maze = subparsers.add_parser("maze", help="generate a maze dungeon level")
+    maze.add_argument("--width", type=int, default=101, help="the width of the level")
+    maze.add_argument("--height", type=int, default=101, help="the height of the level")
+    maze.add_argument("--coins", type=int, default=4, help="the number of coins")
+    maze.add_argument("--loops", type=float, default=0.05, help="the probability of removing each wall between two corridors")
+    open_map = subparsers.add_parser("open", help="generate an open dungeon level with randomly placed walls")
+    open_map.add_argument("--width", type=int, default=60, help="the width of the level")
+    open_map.add_argument("--height", type=int, default=60, help="the height of the level")
+    open_map.add_argument("--coins", type=int, default=10, help="the number of coins")
+    open_map.add_argument("--walls", type=float, default=0.1, help="the probability that an inner cell is a wall")
+    graph = subparsers.add_parser("graph", help="generate a random geometric graph")
+    graph.add_argument("--nodes", type=int, default=10000, help="the number of nodes")
+    graph.add_argument("--degree", type=int, default=6, help="the number of nearest nodes connected to each node")
+    for subparser in (maze, open_map, graph):
+        subparser.add_argument("output", help="the path of the generated file")
+        subparser.add_argument("--seed", type=int, default=0, help="the seed of the random generator")
+    main(parser.parse_args())
@@ -32,6 +32,11 @@ class Point:
     def __iter__(self) -> Iterator[int]:
         return iter((self.x, self.y))
 
+    # The default pickling of a frozen dataclass with slots fails, so a point is pickled as a call to its constructor
+    # (this is needed to send points and graph nodes to other processes)
+    def __reduce__(self):
+        return (Point, (self.x, self.y))
+
 # This is a helper function to compute the manhattan distance between 2 points
 def manhattan_distance(p1: Point, p2: Point) -> int:
     return abs(p1.x - p2.x) + abs(p1.y - p2.y)
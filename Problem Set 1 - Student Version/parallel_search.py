@@ -0,0 +1,266 @@
+from typing import Dict, List
+import heapq, itertools, math, multiprocessing, os
+from queue import Empty
+
+from dungeon import DungeonProblem, PackedDungeonProblem
+from problem import HeuristicFunction, Problem, S, A, Solution
+from search import AStarSearch
+from search_stats import SearchStats, search_statistics
+
+# This file implements Hash Distributed A* (HDA*) which runs A* on several worker processes at the same time
+# Every state is owned by exactly one worker which is chosen from the hash of the state, so each worker keeps
+# its own frontier and its own table of path costs for the states it owns and never needs to share them.
+# When a worker generates a successor owned by another worker, it sends it (with its path cost and its parent)
+# to the owner through the owner's queue. The successors are sent in batches to reduce the communication overhead.
+#
+# Without any synchronization, a worker whose states all have a large f(n) would keep expanding them while another
+# worker still has states with a smaller f(n), so most of the extra work done by more workers would be wasted.
+# So the workers share a global bound on f(n): a worker only expands its states with f(n) <= bound, then it becomes idle.
+# When every worker is idle (and every message was received), the main process moves the bound to the smallest f(n)
+# left in any frontier and wakes the workers that own a state with this f(n). So the states are expanded in layers
+# of f(n) and the workers only share the work of the current layer. The bound is raised by "layer_width" above
+# the smallest f(n), since every layer costs a synchronization of all the workers: with real costs, almost every state
+# has its own f(n), so layers of equal f(n) would hold a single state each. By default, the width is the average cost
+# of the actions of the initial state, which groups the f(n) values of a few steps into one layer.
+#
+# A state can still be expanded before its cheapest path is known (inside a layer or if the heuristic is not consistent),
+# so a state is reopened whenever a cheaper path to it is received, and finding a goal does not stop the search:
+# the cost of the best goal found so far (the incumbent) is shared between the workers and the search continues
+# until no worker has a state with f(n) less than the incumbent. Since the heuristic is admissible,
+# the incumbent is then the optimal path cost.
+#
+# A layer is done when every worker is idle (it has no state with f(n) below the bound and the incumbent) and every
+# message that was sent was also received. The main process detects this by reading the idle flags and
+# the message counters twice: if nothing changed between the two reads, no worker can become busy again.
+#
+# A dungeon problem is searched as a PackedDungeonProblem so the states are small ints which are cheap to send and hash.
+# The worker processes are forked from the main process so they inherit the problem, the heuristic and
+# the caches filled before the search starts. If the platform cannot fork, the search falls back to AStarSearch.
+
+HDA_DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+_HDA_BATCH_SIZE = 64        # The number of successors that are buffered for a worker before sending them
+_HDA_POLL_INTERVAL = 32     # The number of expansions between two reads of the worker queue
+
+# Returns the index of the worker that owns the given state
+# The hash is mixed by a multiplicative hash since the hashes of small ints (such as the packed dungeon states) are the ints themselves
+def _owner(state, count: int) -> int:
+    return (((hash(state) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 32) % count
+
+def _hda_worker(index: int, problem: Problem[S, A], heuristic: HeuristicFunction, inboxes: List, replies,
+                sent, received, idle, lowest, layer, incumbent) -> None:
+    count = len(inboxes)
+    inbox = inboxes[index]
+    frontier = []                   # A heap of (f(n), order, g(n), state)
+    order = itertools.count()       # States with the same f(n) are expanded in the order they were added
+    cost: Dict[S, float] = {}       # The minimum path cost so far of every owned state
+    parents: Dict[S, tuple] = {}    # The parent state and the action of the cheapest path to every owned state
+    heuristics: Dict[S, float] = {} # The heuristic is computed once per state even if the state is reopened
+    outgoing = [[] for _ in range(count)]
+    expanded, generated, duplicates = 0, 0, 0
+    bound = incumbent.value
+
+    def add(state, new_cost: float, parent, action) -> None:
+        nonlocal duplicates
+        old_cost = cost.get(state)
+        if old_cost is not None and old_cost <= new_cost:
+            duplicates += 1
+            return
+        h = heuristics.get(state)
+        if h is None:
+            h = heuristics[state] = heuristic(problem, state)
+        # A state that cannot lead to a cheaper goal than the incumbent is dropped
+        if new_cost + h >= bound: return
+        cost[state] = new_cost
+        parents[state] = (parent, action)
+        heapq.heappush(frontier, (new_cost + h, next(order), new_cost, state))
+
+    def send(destination: int) -> None:
+        sent[index] += 1
+        inboxes[destination].put(("nodes", outgoing[destination]))
+        outgoing[destination] = []
+
+    # Handles a message and returns False if the worker should stop
+    def receive(message) -> bool:
+        kind = message[0]
+        if kind == "nodes":
+            # The worker is marked as busy before the message is counted as received (see the termination check)
+            idle[index] = 0
+            received[index] += 1
+            for node in message[1]:
+                add(*node)
+        elif kind == "layer":
+            idle[index] = 0
+            received[index] += 1
+        elif kind == "parent":
+            replies.put(("parent", message[1], parents.get(message[1])))
+        elif kind == "exit":
+            replies.put(("done", index, (expanded, generated, duplicates)))
+            return False
+        return True
+
+    while True:
+        bound = incumbent.value
+        # Drop the states that cannot lead to a cheaper goal than the incumbent
+        while frontier and (frontier[0][0] >= bound or frontier[0][2] > cost[frontier[0][3]]):
+            heapq.heappop(frontier)
+        if not frontier or frontier[0][0] > layer.value:
+            # Send everything that is still buffered before becoming idle then wait for the next message
+            for destination in range(count):
+                if outgoing[destination]: send(destination)
+            # The smallest f(n) left is published before becoming idle so the main process can choose the next layer
+            lowest[index] = frontier[0][0] if frontier else math.inf
+            idle[index] = 1
+            if not receive(inbox.get()): return
+            continue
+        _, _, g, state = heapq.heappop(frontier)
+        expanded += 1
+        if problem.is_goal(state):
+            with incumbent.get_lock():
+                if g < incumbent.value:
+                    incumbent.value = g
+                    replies.put(("goal", g, state))
+            continue
+        for action, successor, action_cost in problem.expand(state):
+            generated += 1
+            new_cost = g + action_cost
+            owner = _owner(successor, count)
+            if owner == index:
+                add(successor, new_cost, state, action)
+            else:
+                outgoing[owner].append((successor, new_cost, state, action))
+                if len(outgoing[owner]) >= _HDA_BATCH_SIZE: send(owner)
+        if expanded % _HDA_POLL_INTERVAL == 0:
+            # Send the partial batches so that the other workers do not starve then read the waiting messages
+            for destination in range(count):
+                if outgoing[destination]: send(destination)
+            while True:
+                try:
+                    message = inbox.get_nowait()
+                except Empty:
+                    break
+                if not receive(message): return
+
+# Returns the default layer width of HDA* for the problem: the average cost of the actions of the given state (0 if it has none)
+def default_layer_width(problem: Problem[S, A], state: S) -> float:
+    costs = [cost for _, _, cost in problem.expand(state)]
+    return sum(costs) / len(costs) if costs else 0
+
+# The stats count the expanded, generated and duplicate states of all the workers and the number of "messages" sent
+# between them (the other statistics such as the heuristic calls are not collected from the worker processes).
+# The goal checks run in the worker processes, so the total number of expansions is also added to the call counter
+# of the problem's is_goal (if it is tracked by @track_call_count) to keep the explored node count of the agents correct.
+# The calls recorded by @record_calls (the traversal order of the graph problems) are lost in the worker processes.
+# The number of f(n) layers is counted as "layers" (see default_layer_width for the default width of the layers).
+@search_statistics
+def HashDistributedAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                               workers: int = HDA_DEFAULT_WORKERS, layer_width: float = None, stats: SearchStats = None) -> Solution:
+    if workers < 1:
+        raise ValueError(f"HDA* needs at least one worker, got {workers}")
+    if layer_width is not None and layer_width < 0:
+        raise ValueError(f"The layer width must not be negative, got {layer_width}")
+    if "fork" not in multiprocessing.get_all_start_methods():
+        # The undecorated A* is called since this search already counts the heuristic calls and the time in the stats
+        return AStarSearch.__wrapped__(problem, initial_state, heuristic, stats=stats)
+    search_problem, start = problem, initial_state
+    if isinstance(problem, DungeonProblem):
+        search_problem = PackedDungeonProblem(problem)
+        heuristic = search_problem.wrap_heuristic(heuristic)
+        start = search_problem.encode(initial_state)
+    # Compute the heuristic of the initial state before forking so the workers inherit the filled heuristic caches
+    start_h = heuristic(search_problem, start)
+    if start_h == math.inf: return None
+    if layer_width is None:
+        layer_width = default_layer_width(search_problem, start)
+
+    context = multiprocessing.get_context("fork")
+    inboxes = [context.Queue() for _ in range(workers)]
+    replies = context.Queue()
+    sent = context.RawArray('q', workers + 1)     # The last counter is for the message sent by the main process
+    received = context.RawArray('q', workers)
+    idle = context.RawArray('b', workers)
+    lowest = context.RawArray('d', workers)     # The smallest f(n) in the frontier of every idle worker
+    layer = context.RawValue('d', start_h + layer_width)    # The bound on the f(n) of the expanded states
+    incumbent = context.Value('d', math.inf)
+    processes = [
+        context.Process(target=_hda_worker, args=(index, search_problem, heuristic, inboxes, replies, sent, received, idle, lowest, layer, incumbent), daemon=True)
+        for index in range(workers)
+    ]
+    for process in processes: process.start()
+
+    def quiescent() -> bool:
+        if not all(idle): return False
+        total_sent, total_received = sum(sent), sum(received)
+        if total_sent != total_received or not all(idle): return False
+        return sum(sent) == total_sent and sum(received) == total_received
+
+    # Wait for the next reply of the given kind (the goal replies of worse goals may still arrive and are skipped)
+    def wait_reply(kind: str):
+        while True:
+            try:
+                reply = replies.get(timeout=0.01)
+            except Empty:
+                if not all(process.is_alive() for process in processes):
+                    raise RuntimeError("An HDA* worker stopped unexpectedly")
+                continue
+            if reply[0] == kind: return reply
+
+    try:
+        sent[workers] = 1
+        inboxes[_owner(start, workers)].put(("nodes", [(start, 0, None, None)]))
+        goals = {}
+        layers = 1
+        while True:
+            while not quiescent():
+                try:
+                    reply = replies.get(timeout=0.001)
+                    if reply[0] == "goal": goals[reply[1]] = reply[2]
+                except Empty:
+                    if not all(process.is_alive() for process in processes):
+                        raise RuntimeError("An HDA* worker stopped unexpectedly")
+            # Every worker finished the current layer, so the bound moves to the smallest f(n) left
+            # and the workers that own a state in the next layer are woken up
+            next_f = min(lowest)
+            if next_f >= incumbent.value: break
+            layer.value = next_f + layer_width
+            layers += 1
+            for index in range(workers):
+                if lowest[index] <= layer.value:
+                    sent[workers] += 1
+                    inboxes[index].put(("layer",))
+
+        solution = None
+        best = incumbent.value
+        if best < math.inf:
+            while best not in goals:
+                _, g, goal = wait_reply("goal")
+                goals[g] = goal
+            # Follow the parents from the goal back to the initial state by asking their owners
+            solution = []
+            state = goals[best]
+            while True:
+                inboxes[_owner(state, workers)].put(("parent", state))
+                _, _, (parent, action) = wait_reply("parent")
+                if parent is None: break
+                solution.append(action)
+                state = parent
+            solution.reverse()
+
+        for inbox in inboxes: inbox.put(("exit",))
+        counts = [wait_reply("done")[2] for _ in range(workers)]
+        expanded = sum(count[0] for count in counts)
+        for process in processes: process.join()
+    finally:
+        for process in processes:
+            if process.is_alive(): process.terminate()
+
+    calls = getattr(type(problem).is_goal, "calls", None)
+    if isinstance(calls, int):
+        type(problem).is_goal.calls = calls + expanded
+    if stats is not None:
+        stats.expanded += expanded
+        stats.generated += sum(count[1] for count in counts)
+        stats.duplicates += sum(count[2] for count in counts)
+        stats.count("messages", sum(sent))
+        stats.count("layers", layers)
+    return solution
@@ -0,0 +1,63 @@
+import argparse, glob, math, time
+
+from dungeon import DungeonProblem
+from dungeon_heuristic import strong_heuristic
+from graph import GraphRoutingProblem, graphrouting_heuristic
+from level_generator import generate_geometric_graph, generate_open_map
+from problem import HeuristicFunction, Problem
+from search import AStarSearch, PartialExpansionAStarSearch
+from search_stats import SearchStats
+
+# This script compares the peak frontier size of A* and Partial Expansion A* (see PartialExpansionAStarSearch in "search.py")
+# on the graphs in "graphs/", the levels in "dungeons/", randomly generated dense graphs and randomly generated open maps
+# (see "level_generator.py").
+# For each problem, it prints the peak frontier size, the expanded and generated nodes and the run time of both searches.
+#
+# Usage: python pea_benchmark.py [--nodes 2000] [--degree 16] [--graphs 3] [--size 40] [--maps 2] [--seed 0]
+
+def path_cost(problem: Problem, solution) -> float:
+    if solution is None: return None
+    state, total = problem.get_initial_state(), 0
+    for action in solution:
+        total += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    return total
+
+def benchmark(name: str, problem: Problem, heuristic: HeuristicFunction) -> None:
+    # Build the data cached by the heuristic (such as the coin distances of the dungeon) before timing the searches
+    heuristic(problem, problem.get_initial_state())
+    results = []
+    for search_fn in (AStarSearch, PartialExpansionAStarSearch):
+        stats, start = SearchStats(), time.time()
+        solution = search_fn(problem, problem.get_initial_state(), heuristic, stats=stats)
+        results.append((path_cost(problem, solution), stats, time.time() - start))
+    (astar_cost, astar, astar_time), (pea_cost, pea, pea_time) = results
+    assert astar_cost == pea_cost or math.isclose(astar_cost, pea_cost), f"The path costs of A* and PEA* differ on {name}"
+    reduction = astar.peak_frontier / max(pea.peak_frontier, 1)
+    print(f"{name:<32} {astar.peak_frontier:>9} {pea.peak_frontier:>9} {reduction:>9.1f}x"
+          f" {astar.expanded:>9}/{astar.generated:<9} {pea.expanded + pea.reexpanded:>9}/{pea.generated:<9} {astar_time:>8.3f}s {pea_time:>8.3f}s")
+
+def main(args: argparse.Namespace) -> None:
+    print(f"{'Problem':<32} {'A* peak':>9} {'PEA* peak':>9} {'Reduction':>10} {'A* exp/gen':>19} {'PEA* exp/gen':>19} {'A* time':>9} {'PEA* time':>9}")
+    for path in sorted(glob.glob("graphs/*.json")):
+        benchmark(path, GraphRoutingProblem.from_file(path), graphrouting_heuristic)
+    for path in sorted(glob.glob("dungeons/*.txt")):
+        benchmark(path, DungeonProblem.from_file(path), strong_heuristic)
+    for index in range(args.graphs):
+        seed = args.seed + index
+        problem = generate_geometric_graph(args.nodes, args.degree, seed).to_problem()
+        benchmark(f"graph {args.nodes}x{args.degree} (seed {seed})", problem, graphrouting_heuristic)
+    for index in range(args.maps):
+        seed = args.seed + index
+        problem = generate_open_map(args.size, args.size, 0.1, 6, seed)
+        benchmark(f"generated {args.size}x{args.size} (seed {seed})", problem, strong_heuristic)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the peak frontier size of A* and Partial Expansion A*")
+    parser.add_argument("--nodes", type=int, default=2000, help="the number of nodes of the generated graphs")
+    parser.add_argument("--degree", type=int, default=16, help="the number of nearest nodes connected to each node of the generated graphs")
+    parser.add_argument("--graphs", type=int, default=3, help="the number of generated graphs")
+    parser.add_argument("--size", type=int, default=40, help="the width and height of the generated maps")
+    parser.add_argument("--maps", type=int, default=2, help="the number of generated maps")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first generated graph and map")
+    main(parser.parse_args())
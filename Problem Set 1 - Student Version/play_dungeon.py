@@ -1,9 +1,9 @@
 from typing import List
 from dungeon import DungeonProblem, Direction, DungeonState, DungeonTile
-from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
+from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent, AnytimeSearchAgent, IncrementalSearchAgent
 from helpers.utils import fetch_tracked_call_count
-from helpers.heuristic_checks import test_heuristic_consistency
-from functools import lru_cache
+from helpers.heuristic_checks import check_heuristic_consistency
+from heuristic_cache import HeuristicCache, HEURISTIC_CACHE_BUDGET
 import argparse, time
 
 def colored_dungeon(level: str):
@@ -28,6 +28,10 @@ def get_heuristic(name: str):
     print(f"Requested Heuristic '{name}' is invalid")
     exit(-1)
 
+# Return the heuristic selected by the user in a cache limited to the memory budget selected by the user
+def get_cached_heuristic(args: argparse.Namespace) -> HeuristicCache:
+    return HeuristicCache(get_heuristic(args.heuristic), int(args.heuristic_budget * (1 << 20)))
+
 # Create an agent based on the user selections
 def create_agent(args: argparse.Namespace):
     agent_type: str = args.agent
@@ -57,22 +61,78 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "ucs":
         from search import UniformCostSearch
         return UninformedSearchAgent(UniformCostSearch)
+    if agent_type == "tsp":
+        from dungeon_solver import solve_dungeon_tsp
+        return UninformedSearchAgent(solve_dungeon_tsp)
     if agent_type == "astar":
         from search import AStarSearch
         # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
+        heuristic = get_cached_heuristic(args)
         # If desired by the user, we track every transition and check for the heuristic consistency for each transition
         if args.checks:
-            DungeonProblem.get_successor = test_heuristic_consistency(heuristic)(DungeonProblem.get_successor)
+            check_heuristic_consistency(DungeonProblem, heuristic)
         return InformedSearchAgent(AStarSearch, heuristic)
+    if agent_type == "lazyastar":
+        from search import LazyAStarSearch
+        # The heuristic is only computed for the popped states so the cache is mostly useful for the heuristic checks
+        heuristic = get_cached_heuristic(args)
+        if args.checks:
+            check_heuristic_consistency(DungeonProblem, heuristic)
+        return InformedSearchAgent(LazyAStarSearch, heuristic)
+    if agent_type == "pea":
+        from search import PartialExpansionAStarSearch
+        # A state can be expanded several times so the cache saves the repeated heuristic calls
+        heuristic = get_cached_heuristic(args)
+        if args.checks:
+            check_heuristic_consistency(DungeonProblem, heuristic)
+        return InformedSearchAgent(PartialExpansionAStarSearch, heuristic)
     if agent_type == "gbfs":
         from search import BestFirstSearch
         # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
+        heuristic = get_cached_heuristic(args)
         # If desired by the user, we track every transition and check for the heuristic consistency for each transition
         if args.checks:
-            DungeonProblem.get_successor = test_heuristic_consistency(heuristic)(DungeonProblem.get_successor)
+            check_heuristic_consistency(DungeonProblem, heuristic)
         return InformedSearchAgent(BestFirstSearch, heuristic)
+    if agent_type == "ida":
+        from search import IterativeDeepeningAStar
+        # We cache the heuristic calls since IDA* evaluates the same states again in every iteration
+        heuristic = get_cached_heuristic(args)
+        if args.checks:
+            check_heuristic_consistency(DungeonProblem, heuristic)
+        return InformedSearchAgent(IterativeDeepeningAStar, heuristic)
+    if agent_type == "sma":
+        from search import SMAStar
+        heuristic = get_cached_heuristic(args)
+        if args.checks:
+            check_heuristic_consistency(DungeonProblem, heuristic)
+        # Limit the number of nodes kept in memory to the value requested by the user
+        max_nodes = args.max_nodes
+        return InformedSearchAgent(lambda problem, state, heuristic, **options: SMAStar(problem, state, heuristic, max_nodes, **options), heuristic)
+    if agent_type == "arastar":
+        from search import AnytimeAStarSearch
+        heuristic = get_cached_heuristic(args)
+        if args.checks:
+            check_heuristic_consistency(DungeonProblem, heuristic)
+        # Print every improvement of the solution cost or its bound (how far it can be from the optimal cost)
+        def report(solution, cost, bound):
+            print(f"Best solution so far: cost {cost} (at most {bound:.3f} times the optimal cost)")
+        return AnytimeSearchAgent(AnytimeAStarSearch, heuristic, args.time_budget, report)
+    if agent_type == "hda":
+        from parallel_search import HashDistributedAStarSearch
+        heuristic = get_cached_heuristic(args)
+        # Split the search between the number of worker processes requested by the user
+        workers, layer_width = args.workers, args.layer_width
+        return InformedSearchAgent(lambda problem, state, heuristic, **options: HashDistributedAStarSearch(problem, state, heuristic, workers, layer_width, **options), heuristic)
+    if agent_type == "dstar":
+        # D* Lite needs a heuristic that estimates the cost between any two states
+        # The pair heuristic is much weaker than the strong heuristic in the (location x coin subset) state space, so
+        # the agent switches to A* with the strong heuristic if D* Lite costs more than a fresh A* search
+        fallback = HeuristicCache(get_heuristic("strong"), int(args.heuristic_budget * (1 << 20)))
+        if args.heuristic == "zero":
+            return IncrementalSearchAgent(fallback_heuristic=fallback)
+        from dungeon_heuristic import dungeon_pair_heuristic
+        return IncrementalSearchAgent(dungeon_pair_heuristic, fallback)
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -80,16 +140,31 @@ def main(args: argparse.Namespace):
     state_printer = lambda state: print(state)
     if args.ansicolors: state_printer = lambda state: print(colored_dungeon(str(state)))
     start = time.time() # Track run time
+    if args.macro: from dungeon_macro import MacroDungeonProblem
     problem = DungeonProblem.from_file(args.level) # create the problem
     state = problem.get_initial_state() # Get the initial state
     print("Initial State:")
     state_printer(state)
     agent = create_agent(args)
+    # If desired by the user, the search agents search the problem reduced by compressing its corridors and dead ends
+    if args.macro and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        from dungeon_macro import macro_search
+        agent.search_fn = macro_search(agent.search_fn)
+    # If desired by the user, the search agents collect the statistics of their searches
+    if args.stats and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        from search_stats import SearchStats
+        agent.stats = SearchStats()
+    # If desired by the user, the search agents reuse the solutions saved by the previous runs on this level (and save the new ones)
+    # The anytime agent is excluded since its solutions depend on the time budget
+    if args.solution_cache and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)) and not isinstance(agent, AnytimeSearchAgent):
+        from solution_cache import load_solution_cache
+        agent.solution_cache = load_solution_cache(args.level)
     step = 0 # This will store the current step
     total_explored_nodes = 0 # This will store the number of traversed nodes during search
     unsolvable = False # This will store whether the problem is unsolvable or not
     while not problem.is_goal(state):
         fetch_tracked_call_count(DungeonProblem.is_goal) # Clear the call counter
+        if args.macro: fetch_tracked_call_count(MacroDungeonProblem.is_goal)
         action = agent.act(problem, state) # Request an action from the agent
         # If no solution was found, break
         if action is None:
@@ -98,6 +173,7 @@ def main(args: argparse.Namespace):
             break
         # Get the number of traversed nodes
         total_explored_nodes += fetch_tracked_call_count(DungeonProblem.is_goal)
+        if args.macro: total_explored_nodes += fetch_tracked_call_count(MacroDungeonProblem.is_goal)
         # Apply the action to the state
         state = problem.get_successor(state, action)
         step += 1
@@ -115,6 +191,12 @@ def main(args: argparse.Namespace):
     # This was a search agent, display the number of traversed nodes
     if not isinstance(agent, HumanAgent):
         print(f"Search explored {total_explored_nodes} nodes")
+        if getattr(agent, "stats", None) is not None:
+            print(agent.stats)
+            if isinstance(getattr(agent, "heuristic", None), HeuristicCache):
+                print(agent.heuristic)
+        if getattr(agent, "solution_cache", None) is not None:
+            print(agent.solution_cache)
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -124,11 +206,27 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Dungeon as Human or AI")
     parser.add_argument("level", help="path to the dungeon to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'lazyastar', 'pea', 'gbfs', 'tsp', 'ida', 'sma', 'arastar', 'hda', 'dstar'],
                         help="the agent that will play the game")
     parser.add_argument("--heuristic", '-hf', default="zero",
                         choices=["zero", "weak", "strong"],
                         help="choose the heuristic to use with A* or Greedy Best First Search")
+    parser.add_argument("--heuristic-budget", "-hb", type=float, default=HEURISTIC_CACHE_BUDGET / (1 << 20),
+                        help="the memory budget (in MB) of the cache of the heuristic values")
+    parser.add_argument("--max-nodes", "-mn", type=int, default=10000,
+                        help="the maximum number of nodes kept in memory by SMA*")
+    parser.add_argument("--time-budget", "-tb", type=float, default=1.0,
+                        help="the number of seconds that the anytime search (ARA*) can spend to improve its solution")
+    parser.add_argument("--workers", "-w", type=int, default=1,
+                        help="the number of worker processes used by the parallel A* (HDA*), see hda_benchmark.py for its scaling")
+    parser.add_argument("--layer-width", "-lw", type=float, default=None,
+                        help="how far above the smallest f(n) the parallel A* (HDA*) expands before synchronizing its workers (default: the average action cost of the start)")
+    parser.add_argument("--macro", "-m", action="store_true", default=False,
+                        help="Search the problem reduced by collapsing the corridors and pruning the dead ends")
+    parser.add_argument("--stats", "-s", action="store_true", default=False,
+                        help="Print the statistics of the searches (expanded and generated nodes, frontier size, heuristic calls and run time)")
+    parser.add_argument("--solution-cache", "-sc", action="store_true", default=False,
+                        help="Reuse the solutions saved next to the level file by the previous runs and save the new ones")
     parser.add_argument("--checks", "-c", action='store_true', default=False,
                         help="Enable consistency checks for the heuristic")
     parser.add_argument("--ansicolors", "-ac", action="store_true",
@@ -1,9 +1,19 @@
 import time
 from graph import GraphRoutingProblem, GraphNode, graphrouting_heuristic
-from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
+from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent, IncrementalSearchAgent
 from helpers.utils import fetch_recorded_calls
 import argparse, os, json
 
+# Return the heuristic selected by the user
+def get_heuristic(name: str):
+    if name == "euclidean":
+        return graphrouting_heuristic
+    if name == "landmarks":
+        from landmarks import landmark_heuristic
+        return landmark_heuristic
+    print(f"Requested Heuristic '{name}' is invalid")
+    exit(-1)
+
 # Create an agent based on the user selections
 def create_agent(args: argparse.Namespace):
     agent_type: str = args.agent
@@ -37,19 +47,55 @@ def create_agent(args: argparse.Namespace):
         return UninformedSearchAgent(UniformCostSearch)
     if agent_type == "astar":
         from search import AStarSearch
-        return InformedSearchAgent(AStarSearch, graphrouting_heuristic)
+        return InformedSearchAgent(AStarSearch, get_heuristic(args.heuristic))
+    if agent_type == "lazyastar":
+        from search import LazyAStarSearch
+        return InformedSearchAgent(LazyAStarSearch, get_heuristic(args.heuristic))
+    if agent_type == "pea":
+        from search import PartialExpansionAStarSearch
+        return InformedSearchAgent(PartialExpansionAStarSearch, get_heuristic(args.heuristic))
     if agent_type == "gbfs":
         from search import BestFirstSearch
-        return InformedSearchAgent(BestFirstSearch, graphrouting_heuristic)
+        return InformedSearchAgent(BestFirstSearch, get_heuristic(args.heuristic))
+    if agent_type == "ch":
+        from contraction import ContractionHierarchySearch
+        return UninformedSearchAgent(ContractionHierarchySearch)
+    if agent_type == "biucs":
+        from bidirectional_search import BidirectionalUniformCostSearch
+        return UninformedSearchAgent(BidirectionalUniformCostSearch)
+    if agent_type == "biastar":
+        from bidirectional_search import BidirectionalAStarSearch
+        return InformedSearchAgent(BidirectionalAStarSearch, get_heuristic(args.heuristic))
+    if agent_type == "hda":
+        from parallel_search import HashDistributedAStarSearch
+        workers, layer_width = args.workers, args.layer_width
+        return InformedSearchAgent(lambda problem, state, heuristic, **options: HashDistributedAStarSearch(problem, state, heuristic, workers, layer_width, **options), get_heuristic(args.heuristic))
+    if agent_type == "dstar":
+        from graph import graphrouting_pair_heuristic
+        return IncrementalSearchAgent(graphrouting_pair_heuristic)
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
 def main(args: argparse.Namespace):
     start = time.time() # Track run time
     graph_path = args.graph
-    problem = GraphRoutingProblem.from_file(graph_path) # create the problem
+    # create the problem (optionally stored in the compact CSR format which is faster to load for large graphs)
+    if args.csr:
+        from graph_csr import CSRGraphRoutingProblem
+        problem = CSRGraphRoutingProblem.from_file(graph_path)
+        figure_path = problem.graph.metadata.get("figure")
+    else:
+        problem = GraphRoutingProblem.from_file(graph_path)
+        figure_path = json.load(open(graph_path, 'r')).get("figure")
+    # The landmark tables are loaded from the file next to the graph (or computed and saved there on the first run)
+    if args.heuristic == "landmarks":
+        from landmarks import load_landmarks
+        load_landmarks(problem, graph_path, args.landmarks)
+    # Similarly, the contraction hierarchy is loaded from the file next to the graph (or built and saved there)
+    if args.agent == "ch":
+        from contraction import load_contraction_hierarchy
+        load_contraction_hierarchy(problem, graph_path)
     # Check if there is a figure for the graph that we can display on the console
-    figure_path = json.load(open(graph_path, 'r')).get("figure")
     figure = None
     if figure_path:
         figure_path = os.path.join(os.path.dirname(graph_path), figure_path)
@@ -61,6 +107,14 @@ def main(args: argparse.Namespace):
         print(figure)
     print("Current Node:", state)
     agent = create_agent(args)
+    # If desired by the user, the search agents collect the statistics of their searches
+    if args.stats and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        from search_stats import SearchStats
+        agent.stats = SearchStats()
+    # If desired by the user, the search agents reuse the solutions saved by the previous runs on this graph (and save the new ones)
+    if args.solution_cache and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        from solution_cache import load_solution_cache
+        agent.solution_cache = load_solution_cache(graph_path)
     step = 0 # This will store the current step
     path_cost = 0 # This will store the total path cost
     traversed_nodes = [] # This will store all the traversed nodes in order of traversal
@@ -92,6 +146,10 @@ def main(args: argparse.Namespace):
     # This was a search agent, display the traversed nodes
     if not isinstance(agent, HumanAgent):
         print(f"Traversal Order: {'->'.join(traversed_nodes)}")
+        if getattr(agent, "stats", None) is not None:
+            print(agent.stats)
+        if getattr(agent, "solution_cache", None) is not None:
+            print(agent.solution_cache)
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -100,8 +158,23 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Graph as Human or AI")
     parser.add_argument("graph", help="path to the graph to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'lazyastar', 'pea', 'gbfs', 'biucs', 'biastar', 'ch', 'hda', 'dstar'],
                         help="the agent that will play the game")
+    parser.add_argument("--heuristic", '-hf', default="euclidean",
+                        choices=["euclidean", "landmarks"],
+                        help="choose the heuristic to use with the informed search agents")
+    parser.add_argument("--landmarks", "-lm", type=int, default=8,
+                        help="the number of landmarks used by the landmarks heuristic")
+    parser.add_argument("--workers", "-w", type=int, default=1,
+                        help="the number of worker processes used by the parallel A* (HDA*), see hda_benchmark.py for its scaling")
+    parser.add_argument("--layer-width", "-lw", type=float, default=None,
+                        help="how far above the smallest f(n) the parallel A* (HDA*) expands before synchronizing its workers (default: the average action cost of the start)")
+    parser.add_argument("--stats", "-s", action="store_true", default=False,
+                        help="Print the statistics of the searches (expanded and generated nodes, frontier size, heuristic calls and run time)")
+    parser.add_argument("--solution-cache", "-sc", action="store_true", default=False,
+                        help="Reuse the solutions saved next to the graph file by the previous runs and save the new ones")
+    parser.add_argument("--csr", action="store_true", default=False,
+                        help="Load the graph in the compact CSR format and cache it in a binary file next to the graph")
 
     args = parser.parse_args()
     try:
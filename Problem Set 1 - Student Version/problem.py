@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Generic, Iterable, List, TypeVar, Union
+from typing import Callable, Generic, Hashable, Iterable, List, Tuple, TypeVar, Union
 from helpers.utils import CacheContainer, with_cache
 
 # S and A are used for generic typing where S represents the state type and A represents the action type
@@ -10,6 +10,10 @@ A = TypeVar("A")
 # It also implements 'CacheContainer' which allows you to call the "cache" method
 # which returns a dictionary in which you can store any data you want to cache
 class Problem(ABC, Generic[S, A], CacheContainer):
+    # Whether every action cost is a non-negative integer. If it is True, the uniform cost and A* searches
+    # store their frontier in a bucket queue instead of a binary heap (see BucketFrontier in "frontier.py")
+    integer_costs: bool = False
+
     # This function returns the initial state
     @abstractmethod
     def get_initial_state(self) -> S:
@@ -34,6 +38,18 @@ class Problem(ABC, Generic[S, A], CacheContainer):
     def get_cost(self, state: S, action: A) -> float:
         return 1.0
 
+    # Given a state, this function returns a list of (action, successor, cost) for all the possible actions
+    # in the same order as get_actions. The search functions call it once per expanded state instead of calling
+    # get_successor and get_cost for every action, so problems can override it with a faster implementation
+    # that computes each successor and its cost in a single pass.
+    def expand(self, state: S) -> List[Tuple[A, S, float]]:
+        return [(action, self.get_successor(state, action), self.get_cost(state, action)) for action in self.get_actions(state)]
+
+    # Given a state, this function returns a compact hashable value that identifies it among the states of this problem
+    # (two different states must have different fingerprints). It is used as a key by the caches (see "heuristic_cache.py")
+    def fingerprint(self, state: S) -> Hashable:
+        return state
+
 # These are type aliases for:
 # A solution which is a list of actions (or None if no solution is found)
 Solution = Union[List[A], None]
@@ -1,12 +1,12 @@
-from os import curdir, stat
 from problem import HeuristicFunction, Problem, S, A, Solution
 from collections import deque
+from frontier import Frontier, FIFOFrontier, LIFOFrontier, HeapFrontier, BucketFrontier
 from helpers import utils
-import heapq
+from search_stats import SearchStats, search_statistics
+from typing import Callable
+import heapq, itertools, math, time
 
 
-# TODO: Import any modules or write any helper functions you want to use
-
 # All search functions take a problem and a state
 # If it is an informed search function, it will also receive a heuristic function
 # S and A are used for generic typing where S represents the state type and A represents the action type
@@ -15,156 +15,700 @@ import heapq
 # 1. A list of actions which represent the path from the initial state to the final state
 # 2. None if there is no solution
 
+# All the search functions also accept an optional SearchStats object (see "search_stats.py") as the keyword argument "stats"
+# which they fill with the statistics of the search. When it is not given, the statistics are not collected.
+
+
+# A search node is stored as a plain tuple (state, parent_node, action) where parent_node is the node from which
+# this node was generated (None for the root) and action is the action that generated it (None for the root).
+# Storing a single parent pointer per node keeps the memory cost of each node constant instead of copying
+# the whole action list for every generated successor.
+# Follow the parent pointers from the given node back to the root and return the actions in order from the root
+# The path is only built once when a goal is found
+def _reconstruct_path(node) -> Solution:
+    path = []
+    _, parent, action = node
+    while parent is not None:
+        path.append(action)
+        _, parent, action = parent
+    path.reverse()
+    return path
+
 
-def BreadthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
-    # A FIFO queue to store the next states to explore. initial_state is the only element at the begining
-    frontier = [(initial_state, [])]
+# Returns the frontier for the uniform cost and A* searches. If bucket_queue is None, a bucket queue is used
+# when the problem declares integer costs (since the priorities are then usually small integers), otherwise
+# a bucket queue is used if and only if bucket_queue is True. Both frontiers pop the states in the same order.
+def _priority_frontier(problem: Problem, bucket_queue: bool = None) -> Frontier:
+    if bucket_queue is None: bucket_queue = problem.integer_costs
+    return BucketFrontier() if bucket_queue else HeapFrontier()
+
+# Push a state to the frontier and return the frontier. If a bucket queue does not support the priority
+# (for example, a heuristic returned a fraction or infinity), it is converted to a heap first.
+def _push(frontier: Frontier, state, priority: float) -> Frontier:
+    try:
+        frontier.push(state, priority)
+    except ValueError:
+        frontier = frontier.to_heap()
+        frontier.push(state, priority)
+    return frontier
+
+
+@search_statistics
+def BreadthFirstSearch(problem: Problem[S, A], initial_state: S, stats: SearchStats = None) -> Solution:
+    # A FIFO queue to store the next nodes to explore. The root node is the only element at the begining
+    frontier = FIFOFrontier()
+    frontier.push((initial_state, None, None))
     explored = set()                    # An empty set to mark/store the visited nodes
 
     while frontier:  # while there are more nodes to explore, do:
         # Choose the shallowest node in the frontier
-        state, path = frontier.pop(0)
+        node = frontier.pop()
+        state = node[0]
         if state not in explored:   # If unexplored node
+            if stats is not None: stats.expand(state, len(frontier))
             # If you reached the goal, then return the path.
             if problem.is_goal(state):
-                return path
+                return _reconstruct_path(node)
             # Otherwise, add the current state to the explored set
             explored.add(state)
 
             # and loop over all the next states
-            for action in problem.get_actions(state):
-                successor = problem.get_successor(state, action)
-                # Append the next states to the frontier to get explored
-                frontier.append((successor, path + [action]))
+            for action, successor, _ in problem.expand(state):
+                if stats is not None: stats.generated += 1
+                # Append the next nodes to the frontier to get explored
+                frontier.push((successor, node, action))
+        elif stats is not None:
+            stats.duplicates += 1
 
     # If there is no solution, return None
     return None
 
 
-def DepthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
-    # A LIFO stack to store the next states to explore. initial_state is the only element at the begining
-    frontier = [(initial_state, [])]
+@search_statistics
+def DepthFirstSearch(problem: Problem[S, A], initial_state: S, stats: SearchStats = None) -> Solution:
+    # A LIFO stack to store the next nodes to explore. The root node is the only element at the begining
+    frontier = LIFOFrontier()
+    frontier.push((initial_state, None, None))
     explored = set()                    # An empty set to mark/store the visited nodes
 
     while frontier:  # while there are more nodes to explore, do:
-        state, path = frontier.pop()    # Choose the deepest node in the frontier
+        node = frontier.pop()           # Choose the deepest node in the frontier
+        state = node[0]
         if state not in explored:       # If unexplored node
+            if stats is not None: stats.expand(state, len(frontier))
             # If you reached the goal, then return the path.
             if problem.is_goal(state):
-                return path
+                return _reconstruct_path(node)
             # Otherwise, add the current state to the explored set
             explored.add(state)
 
             # and loop over all the next states
-            for action in problem.get_actions(state):
-                successor = problem.get_successor(state, action)
-                # Append the next states to the frontier to get explored
-                frontier.append((successor, path + [action]))
+            for action, successor, _ in problem.expand(state):
+                if stats is not None: stats.generated += 1
+                # Append the next nodes to the frontier to get explored
+                frontier.push((successor, node, action))
+        elif stats is not None:
+            stats.duplicates += 1
 
     # If there is no solution, return None
     return None
 
 
-def UniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
-    # A FIFO priority queue to store the next states to explore.
-    # initial_state is the only element at the begining with path cost  = 0
-    # Each entry consists of (cumulative_path_cost, (node_string_representation, node), path)
-    frontier = [(0, (initial_state.__str__(), initial_state), [])]
+@search_statistics
+def UniformCostSearch(problem: Problem[S, A], initial_state: S, bucket_queue: bool = None, stats: SearchStats = None) -> Solution:
+    # A priority queue to store the next states to explore ordered by their path cost.
+    # States with the same path cost are retrieved in the order they were enqueued (first in first out)
+    # initial_state is the only element at the begining with path cost = 0
+    # For integer costs, the queue is a bucket queue with O(1) push and pop (see _priority_frontier)
+    frontier = _push(_priority_frontier(problem, bucket_queue), initial_state, 0)
+    nodes = {initial_state: (initial_state, None, None)}    # The search node of every generated state
+    cost = {initial_state: 0}   # A map to store the minimum path cost so far
     explored = set()    # An empty set to mark/store the visited nodes
 
     while frontier:  # while there are more nodes to explore, do:
-        # Choose the shallowest node in the frontier with the least path cost
-        cost, state, path = heapq.heappop(frontier)
-        if state not in explored:       # If unexplored node
-            # If you reached the goal, then return the path.
-            if problem.is_goal(state[1]):
-                return path
-            # Otherwise, add the current state to the explored set
-            explored.add(state)
+        # Choose the node in the frontier with the least path cost
+        state = frontier.pop()
+        if stats is not None: stats.expand(state, len(frontier) + 1)
+        # If you reached the goal, then return the path.
+        if problem.is_goal(state):
+            return _reconstruct_path(nodes[state])
+        # Otherwise, add the current state to the explored set
+        explored.add(state)
+        node = nodes[state]
 
-            # and loop over all the next states
-            for action in problem.get_actions(state[1]):
-                successor = problem.get_successor(state[1], action)
-                # Append the next states to the frontier to get explored and ordered prior to it's cumulative path cost
-                heapq.heappush(frontier, (cost + problem.get_cost(
-                    state[1], action), (successor.__str__(), successor), path + [action]))
+        # and loop over all the next states
+        for action, successor, action_cost in problem.expand(state):
+            if stats is not None: stats.generated += 1
+            if successor in explored:
+                if stats is not None: stats.duplicates += 1
+                continue
+            new_cost = cost[state] + action_cost
+            # Add the next state to the frontier or decrease its path cost if we found a cheaper path to it
+            try:
+                pushed = frontier.push(successor, new_cost)
+            except ValueError:
+                # The bucket queue does not support this cost, continue with a heap (see _push)
+                frontier = frontier.to_heap()
+                pushed = frontier.push(successor, new_cost)
+            if pushed:
+                cost[successor] = new_cost
+                nodes[successor] = (successor, node, action)
+            elif stats is not None:
+                stats.duplicates += 1
 
     # If there is no solution, return None
     return None
 
 
-def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
-    # A workaround for the heapq's comparator because GraphNode and DungeonNode are not comparable
-    # So, this index guarantees that the heapq doesn't need to compare the nodes.
-    idx = 0
-    # A FIFO priority queue to store the next states to explore
-    # initial_state is the only element at the begining with path cost  = 0
-    # Each entry consists of (cumulative_path_cost, (node_string_representation, node), path)
-    frontier = [(0, (idx, initial_state), [])]
-    explored = set([])          # An empty set to mark/store the visited nodes
-    cost = {initial_state: 0}   # A map to store the minimum cost so far
+@search_statistics
+def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, bucket_queue: bool = None,
+                stats: SearchStats = None) -> Solution:
+    # A priority queue to store the next states to explore ordered by f(n) = g(n) + h(n).
+    # States with the same f(n) are retrieved in the order they were enqueued (first in first out)
+    # For integer costs and heuristic values, the queue is a bucket queue with O(1) push and pop (see _priority_frontier)
+    frontier = _push(_priority_frontier(problem, bucket_queue), initial_state, heuristic(problem, initial_state))
+    nodes = {initial_state: (initial_state, None, None)}    # The search node of every generated state
+    cost = {initial_state: 0}   # A map to store the minimum path cost so far
+    explored = set()            # An empty set to mark/store the visited nodes
 
     while frontier:  # while there are more nodes to explore, do:
-        # Choose the shallowest node in the frontier with the least path cost
-        _, state, path = heapq.heappop(frontier)
-        state = state[1]
+        # Choose the node in the frontier with the least f(n)
+        state = frontier.pop()
+        if stats is not None: stats.expand(state, len(frontier) + 1)
+        # If you reached the goal, then return the path.
+        if problem.is_goal(state):
+            return _reconstruct_path(nodes[state])
+        # Otherwise, add the current state to the explored set
+        explored.add(state)
+        node = nodes[state]
 
-        if state not in explored:       # If unexplored node
-            # If you reached the goal, then return the path.
-            if problem.is_goal(state):
-                return path
-            # Otherwise, add the current state to the explored set
-            explored.add(state)
-
-            # and loop over all the next states
-            for action in problem.get_actions(state):
-                successor = problem.get_successor(state, action)
-                # Append the next states to the frontier to get explored and ordered prior to it's cumulative path cost
-                new_cost = cost[state] + problem.get_cost(state, action)
-                if successor not in explored or cost[successor] > new_cost:
-                    cost[successor] = new_cost
-                    idx += 1
-                    heapq.heappush(frontier, (new_cost+heuristic(problem, successor),
-                                   (idx, successor), path + [action]))
+        # and loop over all the next states
+        for action, successor, action_cost in problem.expand(state):
+            if stats is not None: stats.generated += 1
+            if successor in explored:
+                if stats is not None: stats.duplicates += 1
+                continue
+            new_cost = cost[state] + action_cost
+            # Add the next state to the frontier only if it is new or we found a cheaper path to it
+            # Since h(n) does not depend on the path, f(n) decreases if and only if g(n) decreases
+            if successor not in cost or new_cost < cost[successor]:
+                cost[successor] = new_cost
+                nodes[successor] = (successor, node, action)
+                f = new_cost + heuristic(problem, successor)
+                try:
+                    frontier.push(successor, f)
+                except ValueError:
+                    # The bucket queue does not support this f(n), continue with a heap (see _push)
+                    frontier = frontier.to_heap()
+                    frontier.push(successor, f)
+            elif stats is not None:
+                stats.duplicates += 1
 
     # If there is no solution, return None
     return None
 
 
-def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
-    # A workaround for the heapq's comparator because GraphNode and DungeonNode are not comparable
-    # So, this index guarantees that the heapq doesn't need to compare the nodes.
-    idx = 0
-    # A FIFO priority queue to store the next states to explore
-    # initial_state is the only element at the begining with path cost  = 0
-    # Each entry consists of (cumulative_path_cost, (node_string_representation, node), path)
-    frontier = [(0, (idx, initial_state), [])]
-    explored = set([])          # An empty set to mark/store the visited nodes
-    cost = {initial_state: 0}   # A map to store the minimum cost so far
+@search_statistics
+def LazyAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                    cheap_heuristic: HeuristicFunction = None, bucket_queue: bool = None, stats: SearchStats = None) -> Solution:
+    # Lazy A* explores the states in the order of f(n) = g(n) + h(n) like A*, but it only calls the (expensive) heuristic
+    # when a state is popped from the frontier instead of every time a successor is generated.
+    # A successor is pushed with a cheap lower bound of h(n) instead: for a consistent heuristic, h(n) >= h(parent) - cost,
+    # and if a cheap admissible heuristic is given, h(n) >= cheap_heuristic(n) too. The bound is also at least 0.
+    # When a state is popped, its true h(n) is computed. If g(n) + h(n) is greater than the priority it was popped with,
+    # the state is pushed again with its true f(n) since other states may come before it. Otherwise, it is expanded.
+    # Since every priority is a lower bound of the true f(n), the states are expanded with their optimal path cost
+    # (for a consistent heuristic) as in A*. The heuristic is never called for the states that are never popped.
+    # The stats count the "reinsertions" and the "heuristic_calls_saved" compared to A* (which calls the heuristic
+    # every time it finds a new or cheaper path to a state).
+    h_values = {initial_state: heuristic(problem, initial_state)} # The true h(n) of the popped states
+    bounds = {}                 # The lower bound of h(n) with which each state was last pushed (for the states without h_values)
+    queued = {initial_state: h_values[initial_state]}   # The priority of each state in the frontier
+    frontier = _push(_priority_frontier(problem, bucket_queue), initial_state, queued[initial_state])
+    nodes = {initial_state: (initial_state, None, None)}    # The search node of every generated state
+    cost = {initial_state: 0}   # A map to store the minimum path cost so far
+    explored = set()            # An empty set to mark/store the visited nodes
+    candidates = 0              # The number of times A* would have called the heuristic
+    solution = None
 
     while frontier:  # while there are more nodes to explore, do:
-        # Choose the shallowest node in the frontier with the least path cost
-        _, state, path = heapq.heappop(frontier)
-        state = state[1]
+        # Choose the node in the frontier with the least estimate of f(n)
+        state = frontier.pop()
+        priority = queued.pop(state)
+        h = h_values.get(state)
+        if h is None:
+            # Compute the true h(n) the first time the state is popped
+            h = h_values[state] = heuristic(problem, state)
+            del bounds[state]
+            f = cost[state] + h
+            if f > priority:
+                # The estimate was too low, the state goes back to the frontier with its true f(n)
+                queued[state] = f
+                frontier = _push(frontier, state, f)
+                if stats is not None: stats.count("reinsertions")
+                continue
+        if stats is not None: stats.expand(state, len(frontier) + 1)
+        # If you reached the goal, then return the path.
+        if problem.is_goal(state):
+            solution = _reconstruct_path(nodes[state])
+            break
+        # Otherwise, add the current state to the explored set
+        explored.add(state)
+        node = nodes[state]
 
-        if state not in explored:       # If unexplored node
-            # If you reached the goal, then return the path.
+        # and loop over all the next states
+        for action, successor, action_cost in problem.expand(state):
+            if stats is not None: stats.generated += 1
+            if successor in explored:
+                if stats is not None: stats.duplicates += 1
+                continue
+            new_cost = cost[state] + action_cost
+            # Add the next state to the frontier only if it is new or we found a cheaper path to it
+            if successor not in cost or new_cost < cost[successor]:
+                candidates += 1
+                cost[successor] = new_cost
+                nodes[successor] = (successor, node, action)
+                estimate = h_values.get(successor)
+                if estimate is None:
+                    # Use the best lower bound of h(n) known so far (a lower bound found through another parent still holds)
+                    estimate = max(h - action_cost, bounds.get(successor, 0))
+                    if cheap_heuristic is not None: estimate = max(estimate, cheap_heuristic(problem, successor))
+                    bounds[successor] = estimate
+                # If the state is already in the frontier with a lower priority, it keeps it (it is still a lower bound)
+                f = new_cost + estimate
+                if successor not in queued or f < queued[successor]:
+                    queued[successor] = f
+                    frontier = _push(frontier, successor, f)
+            elif stats is not None:
+                stats.duplicates += 1
+
+    if stats is not None:
+        stats.count("heuristic_calls_saved", candidates + 1 - len(h_values))
+    return solution
+
+
+@search_statistics
+def PartialExpansionAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, stats: SearchStats = None) -> Solution:
+    # Partial Expansion A* (PEA*) explores the states in the same order of f(n) = g(n) + h(n) as A* but it keeps
+    # the frontier small by not storing the successors that A* would store without ever expanding them.
+    # Each state in the frontier has a stored value F(n) which is f(n) when it is first pushed. When a state is popped,
+    # all its successors are generated but only the ones with f(successor) = F(n) are pushed (or f(successor) <= F(n)
+    # the first time since the heuristic may be inconsistent). If some successors have a greater f, the state is pushed
+    # again with F(n) = the least of their f values instead of being closed. The successors with f greater than
+    # the solution cost are never stored. The price is that a state can be expanded (and its successors generated and
+    # evaluated by the heuristic) several times, once for every distinct f value of its successors.
+    # The goal check is only done the first time a state is popped. A state is closed (explored) after its last expansion.
+    # The stats count the expansions of the states that were already partially expanded as "reexpanded".
+    frontier = HeapFrontier()
+    frontier.push(initial_state, heuristic(problem, initial_state))
+    nodes = {initial_state: (initial_state, None, None)}    # The search node of every generated state
+    cost = {initial_state: 0}   # A map to store the minimum path cost so far
+    explored = set()            # An empty set to mark/store the fully expanded states
+    partial = {}                # For each partially expanded state in the frontier, the F(n) up to which its successors were pushed
+    inf = math.inf
+
+    while frontier:  # while there are more nodes to explore, do:
+        # Choose the node in the frontier with the least F(n)
+        F = frontier.peek_priority()
+        state = frontier.pop()
+        pushed_up_to = partial.pop(state, None)
+        if pushed_up_to is None:
+            if stats is not None: stats.expand(state, len(frontier) + 1)
+            # If you reached the goal, then return the path (only the first time the state is popped).
             if problem.is_goal(state):
-                return path
-            # Otherwise, add the current state to the explored set
+                return _reconstruct_path(nodes[state])
+            pushed_up_to = -inf
+        elif stats is not None:
+            stats.reexpanded += 1
+            if len(frontier) + 1 > stats.peak_frontier: stats.peak_frontier = len(frontier) + 1
+        node, g = nodes[state], cost[state]
+
+        # Loop over all the next states and push the ones whose f is in (pushed_up_to, F]
+        next_F = inf
+        for action, successor, action_cost in problem.expand(state):
+            if stats is not None: stats.generated += 1
+            if successor in explored:
+                if stats is not None: stats.duplicates += 1
+                continue
+            new_cost = g + action_cost
+            f = new_cost + heuristic(problem, successor)
+            # The successor was already pushed by a previous expansion of this state
+            if f <= pushed_up_to: continue
+            if f > F:
+                # The successor is left for a later expansion of this state
+                if f < next_F: next_F = f
+                continue
+            if successor not in cost or new_cost < cost[successor]:
+                cost[successor] = new_cost
+                nodes[successor] = (successor, node, action)
+                # If the successor was partially expanded, it starts over with its cheaper path cost
+                partial.pop(successor, None)
+                frontier.update(successor, f)
+            elif stats is not None:
+                stats.duplicates += 1
+
+        if next_F != inf:
+            # Some successors are not pushed yet, so the state goes back to the frontier with the next F(n)
+            partial[state] = F
+            frontier.push(state, next_F)
+        else:
             explored.add(state)
 
-            # and loop over all the next states
-            for action in problem.get_actions(state):
-                successor = problem.get_successor(state, action)
-                # Append the next states to the frontier to get explored and ordered prior to it's cumulative path cost
-                # new_cost = cost[state] + problem.get_cost(state, action)
-                new_cost = cost[state]
-                if successor not in explored or cost[successor] > new_cost:
-                    cost[successor] = new_cost
-                    idx += 1
-                    heapq.heappush(frontier, (new_cost+heuristic(problem, successor),
-                                   (idx, successor), path + [action]))
+    # If there is no solution, return None
+    return None
+
+
+@search_statistics
+def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, stats: SearchStats = None) -> Solution:
+    # A priority queue to store the next states to explore ordered by h(n).
+    # States with the same h(n) are retrieved in the order they were enqueued (first in first out)
+    frontier = HeapFrontier()
+    frontier.push(initial_state, heuristic(problem, initial_state))
+    nodes = {initial_state: (initial_state, None, None)}    # The search node of every generated state
+    explored = set()            # An empty set to mark/store the visited nodes
+
+    while frontier:  # while there are more nodes to explore, do:
+        # Choose the node in the frontier with the least h(n)
+        state = frontier.pop()
+        if stats is not None: stats.expand(state, len(frontier) + 1)
+        # If you reached the goal, then return the path.
+        if problem.is_goal(state):
+            return _reconstruct_path(nodes[state])
+        # Otherwise, add the current state to the explored set
+        explored.add(state)
+        node = nodes[state]
+
+        # and loop over all the next states
+        for action, successor, _ in problem.expand(state):
+            if stats is not None: stats.generated += 1
+            # Since the priority h(n) does not depend on the path,
+            # a state is only added to the frontier the first time it is generated
+            if successor in explored or successor in frontier:
+                if stats is not None: stats.duplicates += 1
+                continue
+            nodes[successor] = (successor, node, action)
+            frontier.push(successor, heuristic(problem, successor))
 
     # If there is no solution, return None
     return None
+
+
+@search_statistics
+def IterativeDeepeningAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, stats: SearchStats = None) -> Solution:
+    # IDA* runs a series of depth first searches where each search only follows the nodes with f(n) = g(n) + h(n)
+    # not exceeding a threshold. The first threshold is h(initial_state) and each next threshold is the least f(n)
+    # that exceeded the previous one. It only stores the current path so its memory is linear in the solution depth,
+    # but every iteration expands again all the nodes expanded by the previous iterations.
+    # Since no explored set is stored, a successor is skipped only if it is already on the current path (to avoid cycles).
+    # The stats count the "iterations" and the expansions repeated because of the restarts
+    # ("reexpanded" = the expansions of all the iterations before the last). The frontier size is the depth of the current path.
+    threshold = heuristic(problem, initial_state)
+    solution = None
+    if stats is not None: first_expansion = last_iteration_expansion = stats.expanded
+    if problem.is_goal(initial_state):
+        solution = []
+    while solution is None and threshold != math.inf:
+        if stats is not None:
+            stats.count("iterations")
+            last_iteration_expansion = stats.expanded
+        next_threshold = math.inf
+        actions = []    # The actions of the current path
+        on_path = {initial_state}
+        # Each stack entry holds a state of the current path, its path cost and an iterator over its remaining expansions
+        stack = [(initial_state, 0, iter(problem.expand(initial_state)))]
+        if stats is not None: stats.expand(initial_state, 1)
+        while stack:
+            state, cost, remaining_expansions = stack[-1]
+            expansion = next(remaining_expansions, None)
+            if expansion is None:
+                # All the successors are done, backtrack
+                stack.pop()
+                on_path.discard(state)
+                if actions: actions.pop()
+                continue
+            action, successor, action_cost = expansion
+            if stats is not None: stats.generated += 1
+            if successor in on_path:
+                if stats is not None: stats.duplicates += 1
+                continue
+            new_cost = cost + action_cost
+            f = new_cost + heuristic(problem, successor)
+            if f > threshold:
+                # Remember the least f(n) above the threshold to use as the next threshold
+                if f < next_threshold: next_threshold = f
+                continue
+            actions.append(action)
+            if problem.is_goal(successor):
+                solution = actions
+                break
+            on_path.add(successor)
+            stack.append((successor, new_cost, iter(problem.expand(successor))))
+            if stats is not None: stats.expand(successor, len(stack))
+        threshold = next_threshold
+    if stats is not None:
+        stats.reexpanded += last_iteration_expansion - first_expansion
+    return solution
+
+
+# The default memory limit (maximum number of nodes) for SMA*
+SMA_DEFAULT_MAX_NODES = 100000
+
+# A node of the SMA* search tree
+class _SMANode:
+    __slots__ = ("state", "parent", "action", "index", "g", "f", "depth", "expansions", "next_action",
+                 "children", "forgotten", "in_queue", "checked", "version")
+
+    def __init__(self, state, parent, action, index: int, g: float, f: float, depth: int) -> None:
+        self.state, self.parent, self.action, self.index = state, parent, action, index
+        self.g, self.f, self.depth = g, f, depth
+        self.expansions = None      # The list of (action, successor, cost) of the state (computed the first time a successor is needed)
+        self.next_action = 0        # The index of the next action that was never generated
+        self.children = {}          # The children in memory by their action index
+        self.forgotten = {}         # The backed up f of the deleted children by their action index
+        self.in_queue = False
+        self.checked = False        # Whether is_goal was already called for this node
+        self.version = 0            # Incremented on every change so that the old queue entries can be ignored
+
+
+@search_statistics
+def SMAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+            max_nodes: int = SMA_DEFAULT_MAX_NODES, stats: SearchStats = None) -> Solution:
+    # Simplified Memory-bounded A* keeps at most max_nodes nodes of the search tree in memory.
+    # It expands the deepest node with the least f(n) by generating one successor at a time.
+    # When the memory is full, the shallowest leaf with the highest f(n) is deleted and its parent remembers its f(n)
+    # (the best cost that could be reached through it) so that it is generated again only when it becomes the best option.
+    # Once all the successors of a node are generated, its f(n) is backed up as the least f(n) of its successors.
+    # A path deeper than max_nodes - 1 cannot fit in memory so the successors of a node at that depth get f(n) = infinity.
+    # The solution is optimal if the optimal path fits in memory (its length is less than max_nodes).
+    # Like IDA*, the tree does not check for duplicates except for the states that are already on the path to the node.
+    # In the stats, a node is expanded when its goal check is done, the "reexpanded" nodes are the forgotten nodes
+    # that were generated again and the peak frontier size is the largest number of nodes kept in memory
+    inf = math.inf
+    counter = itertools.count()
+    best_queue, worst_queue = [], []    # Heaps of (key, sequence, version, node) ordered by the best and worst nodes
+    node_count = 1
+
+    # Register the changes of a node in the queues
+    def touch(node: _SMANode) -> None:
+        node.version += 1
+        if not node.in_queue: return
+        sequence = next(counter)
+        heapq.heappush(best_queue, (node.f, -node.depth, sequence, node.version, node))
+        if not node.children:
+            heapq.heappush(worst_queue, (-node.f, node.depth, sequence, node.version, node))
+
+    # A node stays in the queue while it can generate a successor (a new one or a forgotten one)
+    def has_successors(node: _SMANode) -> bool:
+        return node.expansions is None or node.next_action < len(node.expansions) or bool(node.forgotten)
+
+    # Once all the successors of a node were generated, its f(n) becomes the least f(n) of its successors
+    # A node without any successor left is deleted. The change is propagated to the ancestors.
+    def backup(node: _SMANode) -> None:
+        nonlocal node_count
+        while node is not None:
+            if node.expansions is None or node.next_action < len(node.expansions): return
+            best = min(min((child.f for child in node.children.values()), default=inf), min(node.forgotten.values(), default=inf))
+            if best == inf and not node.children and not node.forgotten:
+                # Dead end: remove the node from the tree
+                node.in_queue = False
+                touch(node)
+                parent = node.parent
+                if parent is None:
+                    node.f = inf
+                    return
+                del parent.children[node.index]
+                node_count -= 1
+                touch(parent)
+                node = parent
+                continue
+            if best == node.f: return
+            node.f = best
+            touch(node)
+            node = node.parent
+
+    root = _SMANode(initial_state, None, None, -1, 0, heuristic(problem, initial_state), 0)
+    root.in_queue = True
+    touch(root)
+    solution = None
+    while best_queue and root.f != inf:
+        _, _, _, version, node = heapq.heappop(best_queue)
+        if version != node.version or not node.in_queue: continue
+        # Only call is_goal the first time a node is retrieved
+        if not node.checked:
+            node.checked = True
+            if stats is not None: stats.expand(node.state, node_count)
+            if problem.is_goal(node.state):
+                solution = []
+                while node.parent is not None:
+                    solution.append(node.action)
+                    node = node.parent
+                solution.reverse()
+                break
+        if node.expansions is None:
+            node.expansions = problem.expand(node.state)
+        # Pick the next successor: a new one if any is left, otherwise the forgotten one with the least f(n)
+        if node.next_action < len(node.expansions):
+            index = node.next_action
+            node.next_action += 1
+            remembered = -inf
+        elif node.forgotten:
+            index = min(node.forgotten, key=node.forgotten.__getitem__)
+            remembered = node.forgotten.pop(index)
+            if stats is not None: stats.reexpanded += 1
+        else:
+            index = None
+        if index is not None:
+            if stats is not None: stats.generated += 1
+            action, successor, action_cost = node.expansions[index]
+            g = node.g + action_cost
+            # Skip the successors that are already on the path to the node
+            ancestor = node
+            while ancestor is not None and ancestor.state != successor:
+                ancestor = ancestor.parent
+            if ancestor is not None or node.depth + 1 >= max_nodes:
+                if stats is not None and ancestor is not None: stats.duplicates += 1
+                f = inf
+            else:
+                f = max(node.f, g + heuristic(problem, successor), remembered)
+            if f != inf:
+                # Make room for the successor by deleting the shallowest leaf with the highest f(n) (other than the node)
+                while node_count >= max_nodes and worst_queue:
+                    entry = heapq.heappop(worst_queue)
+                    leaf = entry[4]
+                    if entry[3] != leaf.version or not leaf.in_queue or leaf.children or leaf is node or leaf.parent is None:
+                        continue
+                    parent = leaf.parent
+                    del parent.children[leaf.index]
+                    parent.forgotten[leaf.index] = leaf.f
+                    leaf.in_queue = False
+                    touch(leaf)
+                    node_count -= 1
+                    parent.in_queue = True
+                    touch(parent)
+                child = _SMANode(successor, node, action, index, g, f, node.depth + 1)
+                node.children[index] = child
+                node_count += 1
+                if stats is not None and node_count > stats.peak_frontier: stats.peak_frontier = node_count
+                child.in_queue = True
+                touch(child)
+        node.in_queue = has_successors(node)
+        touch(node)
+        backup(node)
+    return solution
+
+
+# The default heuristic weights of the anytime search: the first search uses ARA_INITIAL_WEIGHT
+# and each next search decreases the weight by ARA_WEIGHT_STEP until it reaches 1
+ARA_INITIAL_WEIGHT = 3.0
+ARA_WEIGHT_STEP = 0.5
+
+# The number of expansions between two checks of the deadline (reading the clock on every expansion is relatively costly)
+_DEADLINE_CHECK_INTERVAL = 64
+
+@search_statistics
+def AnytimeAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                       deadline: float = None, initial_weight: float = ARA_INITIAL_WEIGHT, weight_step: float = ARA_WEIGHT_STEP,
+                       on_improve: Callable[[Solution, float, float], None] = None, stats: SearchStats = None) -> Solution:
+    # Anytime Repairing A* (ARA*) runs a series of weighted A* searches ordered by f(n) = g(n) + w * h(n)
+    # with a decreasing weight w. With a consistent heuristic, each search returns a solution whose cost
+    # is at most w times the optimal cost, and the first searches (with the large weights) are fast.
+    # Instead of starting each search from scratch, ARA* reuses the previous search:
+    # the states whose path cost decreased after they were expanded (inconsistent states) are kept aside
+    # and added back to the frontier of the next search, so each state is expanded at most once per search.
+    # The search returns the best solution found before the deadline (an absolute time as returned by time.time()).
+    # The first solution is always searched till the end (even after the deadline) so that the agent always has a plan.
+    # Every time the solution or its bound improves, on_improve (if given) is called with the solution, its cost and
+    # its suboptimality bound: min(w, cost / min(g(n) + h(n))) over the states left in the frontier and the
+    # inconsistent states, where w is the weight of the last search that was not interrupted by the deadline.
+    # A bound of 1 means that the solution is optimal.
+    # The stats count the weighted A* "searches" and the states expanded again in a later search ("reexpanded").
+    # The weight has to decrease after each search (so the searches end at w = 1) and can not start below 1.
+    if initial_weight < 1:
+        raise ValueError(f"The initial weight of ARA* must be at least 1, got {initial_weight}")
+    if weight_step <= 0:
+        raise ValueError(f"The weight step of ARA* must be positive, got {weight_step}")
+    inf = math.inf
+    h_values = {}
+    def h(state: S) -> float:
+        value = h_values.get(state)
+        if value is None:
+            value = h_values[state] = heuristic(problem, state)
+        return value
+
+    nodes = {initial_state: (initial_state, None, None)}    # The search node of every generated state
+    cost = {initial_state: 0}   # A map to store the minimum path cost so far
+    goals = set()               # The goal states found so far
+    best_goal, best_cost = None, inf
+    weight = max(initial_weight, 1)
+    frontier = HeapFrontier()
+    frontier.push(initial_state, weight * h(initial_state))
+    inconsistent = set()        # The states whose path cost decreased after they were expanded in the current search
+    expanded = set() if stats is not None else None  # The states expanded by any search (only kept for the stats)
+
+    # Runs a weighted A* search until no state in the frontier can lead to a cheaper goal than the best goal found so far
+    # Returns False if the deadline is reached before the search ends
+    def improve_path(check_deadline: bool) -> bool:
+        nonlocal best_goal, best_cost
+        explored = set()        # The states expanded in the current search
+        expansions = 0
+        if stats is not None: stats.count("searches")
+        while frontier and frontier.peek_priority() < best_cost:
+            if check_deadline:
+                expansions += 1
+                if expansions % _DEADLINE_CHECK_INTERVAL == 0 and time.time() >= deadline: return False
+            state = frontier.pop()
+            if stats is not None:
+                stats.expand(state, len(frontier) + 1)
+                if state in expanded: stats.reexpanded += 1
+                expanded.add(state)
+            if state in goals or problem.is_goal(state):
+                goals.add(state)
+                if cost[state] < best_cost:
+                    best_goal, best_cost = state, cost[state]
+                continue
+            explored.add(state)
+            node = nodes[state]
+            for action, successor, action_cost in problem.expand(state):
+                if stats is not None: stats.generated += 1
+                new_cost = cost[state] + action_cost
+                if successor not in cost or new_cost < cost[successor]:
+                    cost[successor] = new_cost
+                    nodes[successor] = (successor, node, action)
+                    # A state that was already expanded in this search is only revisited in the next search
+                    if successor in explored:
+                        inconsistent.add(successor)
+                    else:
+                        frontier.push(successor, new_cost + weight * h(successor))
+                elif stats is not None:
+                    stats.duplicates += 1
+        return True
+
+    completed_weight = weight   # The weight of the last search that was not interrupted by the deadline
+    reported = (inf, inf)       # The cost and bound of the last report
+    def report() -> None:
+        nonlocal reported
+        if on_improve is None: return
+        lower_bound = min((cost[state] + h(state) for state in itertools.chain(frontier, inconsistent)), default=inf)
+        bound = max(min(completed_weight, best_cost / lower_bound) if lower_bound > 0 else completed_weight, 1)
+        # Only report when the solution or its bound improved
+        if (best_cost, bound) < reported:
+            reported = (best_cost, bound)
+            on_improve(_reconstruct_path(nodes[best_goal]), best_cost, bound)
+
+    # The first search always runs till the end
+    improve_path(False)
+    if best_goal is None: return None
+    report()
+    while weight > 1 and (deadline is None or time.time() < deadline):
+        weight = max(weight - weight_step, 1)
+        # Move the inconsistent states to the frontier and reorder the frontier using the new weight
+        states = list(itertools.chain(frontier, inconsistent))
+        frontier = HeapFrontier()
+        for state in states:
+            frontier.push(state, cost[state] + weight * h(state))
+        inconsistent.clear()
+        if improve_path(deadline is not None):
+            completed_weight = weight
+        report()
+        if completed_weight != weight: break
+    return _reconstruct_path(nodes[best_goal])
@@ -0,0 +1,103 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict
+import functools, time
+
+from problem import HeuristicFunction, Problem, S
+
+# SearchStats collects statistics about the work done by a search function
+# Every search function accepts an optional keyword argument "stats". If it is None (the default), the search does
+# no extra work except checking it. Otherwise, the search fills it with:
+#   expanded:       the number of expanded states (the states whose goal check was done)
+#   generated:      the number of generated successors
+#   duplicates:     the number of generated successors (or popped nodes) that were dropped because the state was
+#                   already explored or already reached with a path that is at least as cheap
+#   reexpanded:     the number of expansions of states that were already expanded before (by the searches that reopen states)
+#   peak_frontier:  the largest number of nodes in the frontier
+#   heuristic_calls and heuristic_time (in seconds): the number of heuristic evaluations and their total run time
+#   total_time:     the run time of the search function (in seconds)
+#   counters:       algorithm specific counters (such as the number of iterations of IDA*)
+# If trace_size is positive, the trace keeps the last trace_size expanded states in the order of their expansion.
+# The same object can be passed to many searches and the values are accumulated (use reset to clear them).
+@dataclass
+class SearchStats:
+    expanded: int = 0
+    generated: int = 0
+    duplicates: int = 0
+    reexpanded: int = 0
+    peak_frontier: int = 0
+    heuristic_calls: int = 0
+    heuristic_time: float = 0
+    total_time: float = 0
+    counters: Dict[str, float] = field(default_factory=dict)
+    trace_size: int = 0
+    trace: Deque[Any] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.trace = deque(maxlen=self.trace_size)
+
+    # Records the expansion of a state while the frontier holds the given number of nodes
+    def expand(self, state: Any, frontier_size: int = 0) -> None:
+        self.expanded += 1
+        if frontier_size > self.peak_frontier:
+            self.peak_frontier = frontier_size
+        if self.trace_size:
+            self.trace.append(state)
+
+    # Adds the given amount to an algorithm specific counter
+    def count(self, name: str, amount: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Returns a heuristic that calls the given one and records the number of calls and their run time
+    def count_heuristic(self, heuristic: HeuristicFunction) -> HeuristicFunction:
+        clock = time.perf_counter
+        def counted_heuristic(problem: Problem, state: S) -> float:
+            start = clock()
+            value = heuristic(problem, state)
+            self.heuristic_time += clock() - start
+            self.heuristic_calls += 1
+            return value
+        return counted_heuristic
+
+    def reset(self) -> None:
+        self.__init__(trace_size=self.trace_size)
+
+    # Returns the statistics as a dictionary (without the trace) which can be saved as JSON
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "expanded": self.expanded, "generated": self.generated, "duplicates": self.duplicates,
+            "reexpanded": self.reexpanded, "peak_frontier": self.peak_frontier,
+            "heuristic_calls": self.heuristic_calls, "heuristic_time": self.heuristic_time,
+            "total_time": self.total_time, **self.counters
+        }
+
+    def __str__(self) -> str:
+        lines = [
+            f"Expanded: {self.expanded} (reexpanded: {self.reexpanded}), Generated: {self.generated}, Duplicates: {self.duplicates}",
+            f"Peak frontier size: {self.peak_frontier}",
+            f"Heuristic calls: {self.heuristic_calls} ({self.heuristic_time:.3f} seconds)",
+            f"Total search time: {self.total_time:.3f} seconds",
+        ]
+        if self.counters:
+            lines.append(", ".join(f"{name}: {value}" for name, value in self.counters.items()))
+        return "\n".join(lines)
+
+# A decorator for the search functions that accept the "stats" keyword argument
+# If stats are requested, it measures the total run time of the search and wraps the heuristic (the first argument
+# after the initial state, as in every informed search function) to count its calls.
+# Without stats, the search function is called directly.
+def search_statistics(search_fn: Callable) -> Callable:
+    @functools.wraps(search_fn)
+    def search(problem, initial_state, *args, stats: SearchStats = None, **kwargs):
+        if stats is None:
+            return search_fn(problem, initial_state, *args, **kwargs)
+        if args and callable(args[0]):
+            args = (stats.count_heuristic(args[0]),) + args[1:]
+        elif callable(kwargs.get("heuristic")):
+            kwargs["heuristic"] = stats.count_heuristic(kwargs["heuristic"])
+        start = time.perf_counter()
+        try:
+            return search_fn(problem, initial_state, *args, stats=stats, **kwargs)
+        finally:
+            stats.total_time += time.perf_counter() - start
+    return search
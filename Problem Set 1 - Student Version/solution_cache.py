@@ -0,0 +1,195 @@
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import functools, hashlib, inspect, json, os, types
+
+from problem import A, HeuristicFunction, Problem, S, Solution
+
+# This file implements a solution cache which keeps the solutions found by the search agents on disk
+# so that solving the same level again (with the same search function and heuristic) does not search again.
+# The solutions of a level file are saved next to it (e.g. dungeons/dungeon1.solutions) with the hash of the file content.
+# If the level file changes, the saved solutions are ignored and replaced on the next save.
+# Inside the file, the solutions are grouped by an entry key built from:
+#   - the class of the problem (since the states are stored by their fingerprint, see Problem.fingerprint),
+#   - the identity of the search function and of the heuristic (see callable_identity).
+# Every solution is stored as the list of actions from a start state (or None if no solution was found)
+# and it is replayed on the problem when loaded, so a saved solution that is not valid anymore is never used.
+# The file is saved as JSON (and checked when loaded) so a file placed next to a level can not run any code when it is loaded.
+# So the states and the actions are stored as simple values (see _state_key and _action_key).
+
+# The file format version, it should be increased whenever the saved content changes
+_FILE_VERSION = 2
+
+# The types of the values stored in the file for the states and the actions
+_SIMPLE_TYPES = (int, float, str)
+
+# Returns the value stored for the fingerprint of a state (the fingerprints are usually ints or strings)
+def _state_key(fingerprint: Hashable) -> Any:
+    return fingerprint if isinstance(fingerprint, _SIMPLE_TYPES) and not isinstance(fingerprint, bool) else repr(fingerprint)
+
+# Returns the value stored for an action: the name of the enum members (Direction) and of the graph nodes,
+# the action itself if it is already a simple value, otherwise its repr (for example, the MacroAction dataclass)
+def _action_key(action: Any) -> Any:
+    name = getattr(action, "name", None)
+    if isinstance(name, str): return name
+    if isinstance(action, _SIMPLE_TYPES) and not isinstance(action, bool): return action
+    return repr(action)
+
+# Returns True if the content read from a file has the structure written by SolutionCache.save:
+#   {"version": int, "level_hash": str, "entries": {entry key: [[state key, [action key, ...] or null], ...]}}
+def _is_valid_content(data: Any) -> bool:
+    if not isinstance(data, dict) or not isinstance(data.get("level_hash"), str): return False
+    entries = data.get("entries")
+    if not isinstance(entries, dict): return False
+    for solutions in entries.values():
+        if not isinstance(solutions, list): return False
+        for item in solutions:
+            if not isinstance(item, list) or len(item) != 2 or not isinstance(item[0], _SIMPLE_TYPES): return False
+            actions = item[1]
+            if actions is not None and (not isinstance(actions, list) or not all(isinstance(action, _SIMPLE_TYPES) for action in actions)):
+                return False
+    return True
+
+# Adds the code of a function (and of the functions defined inside it) to the hash
+# Changing the body of the function changes the hash, so the solutions found by an old version are not reused
+def _hash_code(code: types.CodeType, digest) -> None:
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _hash_code(const, digest)
+        elif isinstance(const, frozenset):
+            # The iteration order of a frozenset of strings changes between runs so we sort it first
+            digest.update(repr(sorted(map(repr, const))).encode())
+        else:
+            digest.update(repr(const).encode())
+
+# Adds the identity of a callable to the hash: its module and qualified name, its code and the simple values it captured
+# The decorators that use functools.wraps (such as search_statistics and HeuristicCache) are unwrapped first.
+# The captured values are included since the agents may use lambdas such as:
+#       lambda problem, state, heuristic, **options: SMAStar(problem, state, heuristic, max_nodes, **options)
+def _hash_callable(function: Any, digest, depth: int = 0) -> None:
+    if isinstance(function, functools.partial):
+        _hash_callable(function.func, digest, depth)
+        digest.update(repr((function.args, sorted(function.keywords.items()))).encode())
+        return
+    function = inspect.unwrap(function)
+    function = getattr(function, "__func__", function) # For bound methods
+    digest.update(f"{getattr(function, '__module__', '')}.{getattr(function, '__qualname__', type(function).__qualname__)}".encode())
+    code = getattr(function, "__code__", None)
+    if code is None: return
+    _hash_code(code, digest)
+    for cell in function.__closure__ or ():
+        try:
+            value = cell.cell_contents
+        except ValueError: # The cell is empty
+            continue
+        if callable(value) and depth < 4:
+            _hash_callable(value, digest, depth + 1)
+        elif isinstance(value, (int, float, str, bool, type(None))):
+            digest.update(repr(value).encode())
+
+# Returns a string that identifies a callable (the search function or the heuristic)
+def callable_identity(function: Optional[Callable]) -> str:
+    if function is None: return "none"
+    digest = hashlib.sha1()
+    _hash_callable(function, digest)
+    return digest.hexdigest()
+
+# SolutionCache stores the solutions of one level file
+# The solutions are looked up by the problem, the start state, the search function and the heuristic
+# Every stored solution is saved to the file immediately (unless the path is None)
+class SolutionCache:
+    def __init__(self, path: Optional[str], level_hash: str = "",
+                 entries: Dict[str, Dict[Hashable, Optional[List[Any]]]] = None) -> None:
+        self.path = path
+        self.level_hash = level_hash
+        self.entries = entries if entries is not None else {}
+        self.hits = 0
+        self.misses = 0
+
+    # Returns the key of the solutions found by the given search function and heuristic for the problem type
+    @staticmethod
+    def entry_key(problem: Problem, search_fn: Callable, heuristic: HeuristicFunction = None) -> str:
+        problem_type = type(problem)
+        return f"{problem_type.__module__}.{problem_type.__qualname__}:{callable_identity(search_fn)}:{callable_identity(heuristic)}"
+
+    # Returns (True, solution) if a solution from the given state was saved and it is still valid for the problem
+    # Otherwise, it returns (False, None). Note that the saved solution can be None if the problem was found unsolvable.
+    def lookup(self, problem: Problem[S, A], state: S, search_fn: Callable,
+               heuristic: HeuristicFunction = None) -> Tuple[bool, Solution]:
+        solutions = self.entries.get(self.entry_key(problem, search_fn, heuristic))
+        key = _state_key(problem.fingerprint(state))
+        if solutions is None or key not in solutions:
+            self.misses += 1
+            return False, None
+        solution = self.replay(problem, state, solutions[key])
+        if solution is None and solutions[key] is not None:
+            # The saved actions cannot be applied to the problem anymore so the solution is dropped
+            del solutions[key]
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, solution
+
+    # Stores the solution found from the given state then saves the cache to its file
+    def store(self, problem: Problem[S, A], state: S, search_fn: Callable, solution: Solution,
+              heuristic: HeuristicFunction = None) -> None:
+        solutions = self.entries.setdefault(self.entry_key(problem, search_fn, heuristic), {})
+        solutions[_state_key(problem.fingerprint(state))] = None if solution is None else [_action_key(action) for action in solution]
+        if self.path is not None: self.save(self.path)
+
+    # Applies the saved actions from the given state and returns them as the actions of the problem
+    # (every saved action is matched with the possible action in the state that has the same key, see _action_key)
+    # Returns None if an action is not possible in the state it is applied to
+    # (is_goal is not called since the autograder and the play scripts count its calls as explored nodes)
+    @staticmethod
+    def replay(problem: Problem[S, A], state: S, actions: Optional[List[Any]]) -> Solution:
+        if actions is None: return None
+        solution = []
+        for saved_action in actions:
+            action = next((action for action in problem.get_actions(state) if _action_key(action) == saved_action), None)
+            if action is None: return None
+            solution.append(action)
+            state = problem.get_successor(state, action)
+        return solution
+
+    # The solutions of each entry are saved as a list of [state key, actions] pairs since the state keys can be ints
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump({
+                "version": _FILE_VERSION,
+                "level_hash": self.level_hash,
+                "entries": {key: [[state, actions] for state, actions in solutions.items()] for key, solutions in self.entries.items()},
+            }, f)
+
+    # Load a cache from file, returns None if the file does not exist, if its content is not valid
+    # or if it does not match the given level hash
+    @staticmethod
+    def load(path: str, level_hash: str = "") -> 'SolutionCache':
+        if not os.path.isfile(path): return None
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not _is_valid_content(data) or data.get("version") != _FILE_VERSION or data.get("level_hash") != level_hash:
+            return None
+        return SolutionCache(path, level_hash, {key: dict(solutions) for key, solutions in data["entries"].items()})
+
+    def __str__(self) -> str:
+        return f"Solution cache: {self.hits} hits, {self.misses} misses, {sum(map(len, self.entries.values()))} saved solutions"
+
+# Returns the path where the solutions of a level file are saved (dungeons/dungeon1.txt -> dungeons/dungeon1.solutions)
+def solutions_path(level_path: str) -> str:
+    return os.path.splitext(level_path)[0] + ".solutions"
+
+# Load the solutions saved for the level file if its content did not change since they were saved,
+# otherwise return an empty cache which will be saved next to the level file when a solution is stored
+def load_solution_cache(level_path: str, save: bool = True) -> SolutionCache:
+    with open(level_path, 'rb') as f:
+        level_hash = hashlib.sha1(f.read()).hexdigest()
+    path = solutions_path(level_path)
+    cache = SolutionCache.load(path, level_hash)
+    if cache is None:
+        cache = SolutionCache(path, level_hash)
+    if not save: cache.path = None
+    return cache